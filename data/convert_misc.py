@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+'''
+生成 misc_memory 镜像 (bias + fp32 scale), 供 +MISC_HEX 在仿真时直接加载, 无需修改 RTL 重新编译
+
+使用说明:
+    python3 convert_misc.py <bias 文件> <scale> <输出文件> [--bias-row 0] [--scale-row 1]
+    bias 文件为十进制 int32 (空白分隔, N 个), scale 可写浮点数 (0.0011538403) 或位模式 (0x3A973C75)
+    输出文件以 .bin 结尾时生成二进制镜像, 否则生成 $readmemh 文本
+'''
+
+import argparse
+
+import numpy as np
+
+from convert_input import image_to_hex_lines
+from golden import fp32_to_bits
+from ub_image import save_image, MEMORY_KINDS
+
+# misc_memory 的一行 2048 bit = 4 channel x 16 col x 32 bit
+CHANNEL_COLS = 16
+MAX_CHANNELS = 4
+WORD_BYTES = 4
+LINE_BYTES = MAX_CHANNELS * CHANNEL_COLS * WORD_BYTES
+MISC_DEPTH = MEMORY_KINDS['misc'][2]
+
+def channels_for_n(n: int) -> int:
+    """N 对应 ub_rd_bias_size_in / ins_VPU_en_size 可选的 channel 数: 1, 2 或 4"""
+    if n <= CHANNEL_COLS:
+        return 1
+    if n <= 2 * CHANNEL_COLS:
+        return 2
+    return MAX_CHANNELS
+
+def pack_bias_lines(bias, channels=None):
+    """
+    将长度为 N 的 int32 bias 打包为 misc_memory 行, 返回 (tiles, 256) 的 uint8 数组 (左侧为 MSB)
+
+    映射逻辑 (与 ub_rd_bias_data_out_temp 的读出一致):
+    - 共 C 个 channel 时, channel c 读 [(C-1-c)*512 +: 512], C 由 ub_rd_bias_size_in 决定
+    - channel 内第 j 列的 bias 位于 [j*32 +: 32], 对应输出列 n = c*16 + j
+    - N > 64 时按 64 列切块, 每块占一行
+    """
+    bias = np.asarray(bias, dtype=np.int64).reshape(-1)
+    if channels is None:
+        channels = channels_for_n(len(bias))
+    tile_cols = channels * CHANNEL_COLS
+    bias = np.pad(bias, (0, -len(bias) % tile_cols))
+
+    words = np.zeros((len(bias) // tile_cols, MAX_CHANNELS * CHANNEL_COLS), dtype='<u4')
+    # 小端视角下第 w 个 32bit 字 = [w*32 +: 32], channel c 的第 j 列: w = (C-1-c)*16 + j
+    tiles = (bias & 0xFFFFFFFF).astype('<u4').reshape(-1, channels, CHANNEL_COLS)[:, ::-1, :]
+    words[:, :channels * CHANNEL_COLS] = tiles.reshape(len(words), -1)
+    return np.ascontiguousarray(words.view(np.uint8)[:, ::-1])
+
+def pack_scale_line(scale):
+    """scale 行: fp32 位模式位于 [31:0], 其余为 0"""
+    line = np.zeros((1, LINE_BYTES), dtype=np.uint8)
+    line[0, -WORD_BYTES:] = np.frombuffer(fp32_to_bits(scale).to_bytes(WORD_BYTES, 'big'), dtype=np.uint8)
+    return line
+
+def pack_misc_memory(bias=None, scale=None, bias_row=0, scale_row=None, channels=None, lines=MISC_DEPTH):
+    """
+    组装完整的 misc_memory 镜像 (默认 16 行): bias 从 bias_row 开始, 每 64 列占一行,
+    scale 默认紧跟在 bias 之后; 与当前 RTL 默认内容一致时 bias_row=0, scale_row=1
+    """
+    image = np.zeros((lines, LINE_BYTES), dtype=np.uint8)
+    next_row = bias_row
+    if bias is not None:
+        bias_lines = pack_bias_lines(bias, channels)
+        image[bias_row:bias_row + len(bias_lines)] = bias_lines
+        next_row = bias_row + len(bias_lines)
+    if scale is not None:
+        if scale_row is None:
+            scale_row = next_row
+        image[scale_row] = pack_scale_line(scale)[0]
+    return image
+
+def parse_scale(text: str):
+    """scale 参数: 0x 开头为 fp32 位模式, 0b 开头为二进制位模式, 否则为浮点数"""
+    text = text.strip().replace('_', '')
+    if text.lower().startswith('0x'):
+        return int(text, 16)
+    if text.lower().startswith('0b') or text.startswith("32'b"):
+        return int(text.split('b', 1)[1], 2)
+    return float(text)
+
+def read_bias(input_file):
+    with open(input_file, 'r') as f:
+        return np.array([int(item) for item in f.read().split()], dtype=np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description="生成 misc_memory (bias / scale) 镜像")
+    parser.add_argument('bias_file')
+    parser.add_argument('scale')
+    parser.add_argument('output_file')
+    parser.add_argument('--bias-row', type=int, default=0)
+    parser.add_argument('--scale-row', type=int, default=None)
+    args = parser.parse_args()
+
+    bias = read_bias(args.bias_file)
+    image = pack_misc_memory(bias, parse_scale(args.scale), args.bias_row, args.scale_row)
+    print(f"成功读取 bias: {len(bias)} 个")
+
+    if args.output_file.endswith('.bin'):
+        save_image(args.output_file, image, 'misc', rows=1, cols=len(bias), arrays=channels_for_n(len(bias)))
+    else:
+        with open(args.output_file, 'w') as f:
+            f.write("\n".join(image_to_hex_lines(image)) + "\n")
+    print(f"成功生成文件: {args.output_file} ({len(image)} 行, 每行 2048 bits)")
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,97 @@
-import sys
-import os
-from typing import List
-
-def convert_file_to_readmemh(input_file: str, output_file: str) -> None:
-    # 1. 读取并解析输入文件
-    if not os.path.exists(input_file):
-        print(f"错误：找不到文件 {input_file}")
-        return
-
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-
-    data_matrix = []
-    for line in lines:
-        numbers = line.strip().split()
-        if not numbers: continue
-        
-        int_numbers = []
-        for num_str in numbers:
-            num = int(num_str)
-            # 处理 8-bit 补码
-            if num < 0:
-                num_8bit = (1 << 8) + num
-            else:
-                num_8bit = num
-            int_numbers.append(num_8bit)
-        data_matrix.append(int_numbers)
-    
-    print(f"成功读取输入文件：{len(data_matrix)}行，每行{len(data_matrix[0])}个数")
-
-    # 2. 生成原始的 Hex 行数据 (按 position 循环)
-    # 此时生成的 output_lines 共有 256 行
-    raw_output_lines = []
-    for position in range(256):
-        position_numbers = []
-        for row in range(64):
-            position_numbers.append(data_matrix[row][position])
-
-        hex_line = []
-        for i in range(0, 64, 4):
-            group = position_numbers[i:i+4]
-            value_32bit = 0
-            for j, num in enumerate(group):
-                value_32bit |= (num << (24 - j * 8))
-            hex_str = format(value_32bit, '08x')
-            hex_line.append(hex_str)
-        raw_output_lines.append(''.join(hex_line))
-
-    # 3. 新增逻辑：以每 16 行为一组，组内行顺序倒置
-    # 256 行会被分成 16 组（256/16 = 16）
-    final_output_lines = []
-    group_size = 16
-    
-    for i in range(0, len(raw_output_lines), group_size):
-        # 获取当前组 (16行)
-        current_group = raw_output_lines[i : i + group_size]
-        # 使用 [::-1] 将组内列表倒置并添加到最终结果中
-        final_output_lines.extend(current_group[::-1])
-
-    # 4. 写入输出文件
-    with open(output_file, 'w') as f:
-        for line in final_output_lines:
-            f.write(line + '\n')
-    
-    print(f"成功写入输出文件：{len(final_output_lines)}行")
-    print(f"处理逻辑：每{group_size}行一组进行倒置处理完成。")
-
-def main(): 
-    input_file = 'weight_dec.txt'
-    output_file = 'weight_hex.txt'
-    
-    convert_file_to_readmemh(input_file, output_file)
-    print("转换完成！")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import sys
+import os
+
+import numpy as np
+
+from convert_input import read_matrix, pad_to_multiple, image_to_hex_lines
+from ub_image import save_image
+
+# weight_memory 的一行 512 bit = 4 个 16x16 阵列 x 16 列 x 8 bit
+ARRAY_COLS = 16
+MAX_ARRAYS = 4
+LINE_BYTES = MAX_ARRAYS * ARRAY_COLS
+GROUP_SIZE = 16     # 每 16 个 position 预加载进一个 16 行的阵列
+
+def arrays_for_n(n: int) -> int:
+    """N 对应 ub_rd_weight_size_in / ins_sa_en_size 可选的阵列数: 1, 2 或 4"""
+    if n <= ARRAY_COLS:
+        return 1
+    if n <= 2 * ARRAY_COLS:
+        return 2
+    return MAX_ARRAYS
+
+def weight_addr_stride(n: int) -> int:
+    """相邻两个 position 的 ub_rd_weight_addr_in 间隔 (= 阵列数)"""
+    return arrays_for_n(n)
+
+def pack_weight_memory(matrix, arrays=None):
+    """
+    将 N x K 的 int8 权重矩阵打包为 weight_memory 镜像, 返回 (lines, 64) 的 uint8 数组,
+    每行字节按 $readmemh 的顺序 (左侧为 MSB) 排列
+
+    映射逻辑 (与 unified_buffer 中 ub_rd_weight_data_out_temp 的读出一致):
+    - 每个 position(k) 占一个 A*128 bit 的槽位, 槽内 N 方向第 0 列在最高位,
+      阵列 0 读 [A*128-1 -: 128], 阵列 1 读其下方 128 bit, 以此类推 (A 为阵列数 1/2/4)
+    - 一行 512 bit 放 4/A 个槽位, 槽位 s 位于 [s*A*128 +: A*128],
+      由 ub_rd_weight_addr_in[1:0] (A=1) / [1] (A=2) 选中, 即第 l 个槽位的地址为 l*A
+    - 以每 16 个 position 为一组, 组内顺序倒置 (先加载的行会被推到阵列最底部)
+    - N > 64 时按 64 列切块, 每块依次占用 K 个槽位
+    N 补齐到 16*A (N > 64 时为 64) 的整数倍, K 补齐到 16 的整数倍
+    """
+    matrix = np.asarray(matrix)
+    if arrays is None:
+        arrays = arrays_for_n(matrix.shape[0])
+    if arrays not in (1, 2, MAX_ARRAYS):
+        raise ValueError(f"arrays must be 1, 2 or 4, got {arrays}")
+
+    slot_bytes = arrays * ARRAY_COLS
+    slots_per_line = LINE_BYTES // slot_bytes
+    matrix = pad_to_multiple(matrix, slot_bytes, GROUP_SIZE)
+    rows, cols = matrix.shape
+    tiles = rows // slot_bytes
+    data = (matrix & 0xFF).astype(np.uint8)
+
+    # [N 块, N 块内列, position] -> [N 块, position 组, 组内 position(倒置), N 块内列]
+    data = data.reshape(tiles, slot_bytes, cols).transpose(0, 2, 1)
+    data = data.reshape(tiles, cols // GROUP_SIZE, GROUP_SIZE, slot_bytes)[:, :, ::-1, :]
+    slots = data.reshape(-1, slot_bytes)
+
+    # 同一行中高地址槽位位于高位
+    lines = slots.reshape(-1, slots_per_line, slot_bytes)[:, ::-1, :]
+    return np.ascontiguousarray(lines).reshape(-1, LINE_BYTES)
+
+def convert_file_to_readmemh(input_file: str, output_file: str) -> None:
+    # 1. 读取并解析输入文件, 每行为一个输出通道 (N 行 x K 个 position)
+    if not os.path.exists(input_file):
+        print(f"错误：找不到文件 {input_file}")
+        return
+
+    data_matrix = read_matrix(input_file)
+    print(f"成功读取输入文件：{data_matrix.shape[0]}行，每行{data_matrix.shape[1]}个数")
+
+    # 2. 按 position 生成槽位并以每 16 行为一组倒置
+    image = pack_weight_memory(data_matrix)
+
+    # 3. 写入输出文件, .bin 后缀时直接写二进制镜像, 不经过文本
+    if output_file.endswith('.bin'):
+        save_image(output_file, image, 'weight', rows=data_matrix.shape[0], cols=data_matrix.shape[1],
+                   arrays=arrays_for_n(data_matrix.shape[0]))
+        print(f"成功写入镜像：{output_file}，{image.shape[0]}行")
+        return
+
+    final_output_lines = image_to_hex_lines(image)
+    with open(output_file, 'w') as f:
+        f.write("\n".join(final_output_lines) + "\n")
+
+    print(f"成功写入输出文件：{len(final_output_lines)}行")
+    print(f"处理逻辑：每{GROUP_SIZE}行一组进行倒置处理完成。")
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else 'weight_dec.txt'
+    output_file = sys.argv[2] if len(sys.argv) > 2 else 'weight_hex.txt'
+
+    convert_file_to_readmemh(input_file, output_file)
+    print("转换完成！")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 import os
+import struct
+
+import numpy as np
+
+# vpe_dequanter.mult 中乘积位宽: PSUM_WIDTH(32) + 尾数(24)
+PSUM_WIDTH = 32
+PROD_WIDTH = PSUM_WIDTH + 24
+INT8_MAX = 127
+INT8_MIN = -128
 
 def get_matrix(input_file: str):
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return []
-    
+
     with open(input_file, 'r') as f:
         lines = f.readlines()
 
@@ -14,40 +23,172 @@ def get_matrix(input_file: str):
         if not numbers: continue
         int_numbers = [int(num_str) for num_str in numbers]
         data_matrix.append(int_numbers)
-    
+
     print(f"Loaded {input_file}: {len(data_matrix)} rows x {len(data_matrix[0])} cols")
     return data_matrix
 
+def fp32_to_bits(scale) -> int:
+    """
+    将 scale 转为 IEEE 754 fp32 位模式 (与 misc_memory 中存放的 32bit 一致)
+    若传入的已是 int, 则视为位模式本身
+    """
+    if isinstance(scale, (int, np.integer)):
+        return int(scale) & 0xFFFFFFFF
+    return struct.unpack('<I', struct.pack('<f', float(scale)))[0]
+
+def int32_wrap(x):
+    """按 32 位补码回绕, 对应 RTL 中 int32 加法器的溢出行为"""
+    return np.asarray(x, dtype=np.int64).astype(np.int32)
+
+def int8_gemm(A, B_T):
+    """
+    A (m x k) * B_T (n x k) 的转置 -> (m x n) 的 int32 累加结果
+    int8 x int8 的乘积不超过 2^14, 只要 k * 2^14 < 2^53, float64 的 BLAS 矩阵乘就是精确的,
+    之后再按 32 位回绕, 与 PE 阵列 / psum cache 的累加结果逐位一致
+    """
+    A = np.asarray(A)
+    B_T = np.asarray(B_T)
+    k = A.shape[1]
+    if k * (1 << 14) < (1 << 53):
+        acc = A.astype(np.float64) @ B_T.astype(np.float64).T
+        return int32_wrap(acc.astype(np.int64))
+    return int32_wrap(A.astype(np.int64) @ B_T.astype(np.int64).T)
+
+def requant(acc, scale):
+    """
+    与 vpe_dequanter.mult 逐位一致的 int32 -> int8 重量化:
+    1. fp32 scale 拆为 sign / exp / 24bit 尾数 (exp == 0 时尾数视为 0)
+    2. |acc| * 尾数, 右移 150 - exp 位
+    3. 只加一位舍入位 product[shift-1] (幅值上的四舍五入, 而非 Python round() 的银行家舍入)
+    4. 非对称饱和: 负数幅值 > 128 -> -128, 正数幅值 > 127 -> 127
+    """
+    bits = fp32_to_bits(scale)
+    fp_sign = (bits >> 31) & 0x1
+    fp_exp = (bits >> 23) & 0xFF
+    acc = np.asarray(acc, dtype=np.int64)
+    if fp_exp == 0:
+        return np.zeros(acc.shape, dtype=np.int8)
+    fp_mant = (1 << 23) | (bits & 0x7FFFFF)
+
+    int_sign = acc < 0
+    product = np.abs(acc).astype(np.uint64) * np.uint64(fp_mant)
+
+    shift = 150 - fp_exp
+    if shift < 0:
+        result_abs = np.full(acc.shape, (1 << PROD_WIDTH) - 1, dtype=np.uint64)
+    elif shift >= PROD_WIDTH:
+        result_abs = np.zeros(acc.shape, dtype=np.uint64)
+    elif shift == 0:
+        result_abs = product
+    else:
+        rounding_bit = (product >> np.uint64(shift - 1)) & np.uint64(1)
+        result_abs = (product >> np.uint64(shift)) + rounding_bit
+
+    result_abs = np.minimum(result_abs, np.uint64(1 << 8)).astype(np.int64)
+    final_sign = int_sign ^ bool(fp_sign)
+    out = np.where(final_sign,
+                   -np.minimum(result_abs, -INT8_MIN),
+                   np.minimum(result_abs, INT8_MAX))
+    out[acc == 0] = 0
+    return out.astype(np.int8)
+
+def clip(acc):
+    """dequant 关闭时 vpe_dequanter.clip 的饱和截断"""
+    return np.clip(np.asarray(acc, dtype=np.int64), INT8_MIN, INT8_MAX).astype(np.int8)
+
+def vpu_postprocess(acc, bias=None, relu=False, scale=None):
+    """
+    按 vpe 流水线顺序处理 int32 部分和: bias -> relu -> dequant(scale) / clip
+    bias 为长度 n 的 int32 向量, scale 为 None 时对应 dequant_enable = 0
+    """
+    out = np.asarray(acc, dtype=np.int32)
+    if bias is not None:
+        out = int32_wrap(out.astype(np.int64) + np.asarray(bias, dtype=np.int64))
+    if relu:
+        out = np.maximum(out, 0).astype(np.int32)
+    if scale is None:
+        return clip(out)
+    return requant(out, scale)
+
 def matrix_multiply_and_scale(A, B_T, scale: float):
     """
     1. A (m x k) * B_T (n x k) 的转置 -> (m x n)
     2. Result * scale
-    3. Round to nearest integer & Clamp to int8 range [-128, 127]
+    3. 按 vpe_dequanter 的规则舍入并截断到 int8 范围 [-128, 127]
     """
-    m = len(A)
-    k = len(A[0])
-    n = len(B_T)
-    
-    result = [[0 for _ in range(n)] for _ in range(m)]
-    
-    for i in range(m):
-        for j in range(n):
-            # 1. 矩阵乘法累加 (通常使用更高的精度，如 int32)
-            acc = 0
-            for l in range(k):
-                acc += A[i][l] * B_T[j][l]
-            
-            # 2. 缩放
-            scaled_val = acc * scale
-            
-            # 3. 四舍五入并截断到 int8 范围
-            # 使用 round() 进行最近舍入，并使用 min/max 限制范围
-            final_val = int(round(scaled_val))
-            final_val = max(-128, min(127, final_val))
-            
-            result[i][j] = final_val
-            
-    return result
+    return requant(int8_gemm(A, B_T), scale)
+
+def partial_sums(A, B_T, tile: int = 16):
+    """
+    将 k 维按 tile(=16, 即脉动阵列行数) 切块, 一次算出每个 Step 的部分和:
+    返回 (partial, cumulative), 形状均为 (steps, m, n) 的 int32
+    partial[s]    : 第 s 块 16 列的乘加结果
+    cumulative[s] : 第 s 步之后 vpe_psum_cache 中保存的累加值 (32 位回绕)
+    k 不是 tile 整数倍时末尾补 0
+    """
+    A = np.asarray(A)
+    B_T = np.asarray(B_T)
+    m, k = A.shape
+    n = B_T.shape[0]
+    steps = -(-k // tile)
+    pad = steps * tile - k
+    if pad:
+        A = np.pad(A, ((0, 0), (0, pad)))
+        B_T = np.pad(B_T, ((0, 0), (0, pad)))
+
+    # (steps, m, tile) @ (steps, tile, n) -> (steps, m, n)
+    a_tiles = A.reshape(m, steps, tile).transpose(1, 0, 2).astype(np.float64)
+    b_tiles = B_T.reshape(n, steps, tile).transpose(1, 2, 0).astype(np.float64)
+    partial = np.matmul(a_tiles, b_tiles).astype(np.int64)
+    cumulative = np.cumsum(partial, axis=0)
+    return int32_wrap(partial), int32_wrap(cumulative)
+
+# 部分和文件格式 (小端):
+#   header : magic 'PSUM', version(u16), tile(u16), steps(u32), m(u32), n(u32), reserved(u32)
+#   index  : 每个 Step 一项 k_start(u32), k_end(u32), partial_offset(u64), cumulative_offset(u64)
+#   data   : partial[steps][m][n] int32, cumulative[steps][m][n] int32
+PSUM_MAGIC = b'PSUM'
+PSUM_VERSION = 1
+PSUM_HEADER = struct.Struct('<4sHHIIII')
+PSUM_INDEX = struct.Struct('<IIQQ')
+
+def save_partial_sums(partial, cumulative, output_file, k: int = None, tile: int = 16):
+    """k 为实际的 K (缺省为 steps * tile), 最后一个 Step 的 k_end 不超过 k - 1"""
+    steps, m, n = partial.shape
+    if k is None:
+        k = steps * tile
+    step_bytes = m * n * 4
+    data_base = PSUM_HEADER.size + steps * PSUM_INDEX.size
+    cumulative_base = data_base + steps * step_bytes
+
+    with open(output_file, 'wb') as f:
+        f.write(PSUM_HEADER.pack(PSUM_MAGIC, PSUM_VERSION, tile, steps, m, n, 0))
+        for s in range(steps):
+            f.write(PSUM_INDEX.pack(s * tile, min((s + 1) * tile, k) - 1,
+                                    data_base + s * step_bytes,
+                                    cumulative_base + s * step_bytes))
+        f.write(np.ascontiguousarray(partial, dtype='<i4').tobytes())
+        f.write(np.ascontiguousarray(cumulative, dtype='<i4').tobytes())
+    print(f"Partial sums ({steps} steps, {m} x {n}) saved to {output_file}")
+
+def load_partial_sums_header(input_file):
+    """读出 header 与索引表, 返回 (header dict, index list)"""
+    with open(input_file, 'rb') as f:
+        magic, version, tile, steps, m, n, _ = PSUM_HEADER.unpack(f.read(PSUM_HEADER.size))
+        if magic != PSUM_MAGIC or version != PSUM_VERSION:
+            raise ValueError(f"{input_file} is not a PSUM v{PSUM_VERSION} file")
+        index = [PSUM_INDEX.unpack(f.read(PSUM_INDEX.size)) for _ in range(steps)]
+    header = {"tile": tile, "steps": steps, "m": m, "n": n}
+    return header, index
+
+def load_partial_step(input_file, step: int, cumulative: bool = False):
+    """只按索引读取单个 Step 的 (m x n) 部分和, 不解析整个文件"""
+    header, index = load_partial_sums_header(input_file)
+    _, _, partial_offset, cumulative_offset = index[step]
+    offset = cumulative_offset if cumulative else partial_offset
+    count = header["m"] * header["n"]
+    data = np.fromfile(input_file, dtype='<i4', count=count, offset=offset)
+    return data.reshape(header["m"], header["n"])
 
 def save_matrix(matrix, output_file):
     with open(output_file, 'w') as f:
@@ -60,14 +201,15 @@ def save_matrix(matrix, output_file):
 # --- 主程序 ---
 SCALE_FACTOR = 0.0011538403  # 示例 fp32 scale 数
 
-w_test = get_matrix("weight_dec.txt") # 64 x 256
-a_test = get_matrix("input_dec.txt")  # 16 x 256
-
-if w_test and a_test:
-    print(f"Calculating A * W^T with scale {SCALE_FACTOR}...")
-    
-    # 执行带缩放和量化的运算
-    res_int8 = matrix_multiply_and_scale(a_test, w_test, SCALE_FACTOR)
-    
-    print(f"Result matrix size: {len(res_int8)} row x {len(res_int8[0])} col")
-    save_matrix(res_int8, "output_int8.txt")
\ No newline at end of file
+if __name__ == "__main__":
+    w_test = get_matrix("weight_dec.txt") # 64 x 256
+    a_test = get_matrix("input_dec.txt")  # 16 x 256
+
+    if w_test and a_test:
+        print(f"Calculating A * W^T with scale {SCALE_FACTOR}...")
+
+        # 执行带缩放和量化的运算
+        res_int8 = matrix_multiply_and_scale(a_test, w_test, SCALE_FACTOR)
+
+        print(f"Result matrix size: {len(res_int8)} row x {len(res_int8[0])} col")
+        save_matrix(res_int8, "output_int8.txt")
@@ -1,117 +1,20 @@
 import os
+import sys
 import random
 import struct
 
-def generate_hex_file_input(input_filename, output_filename):
-    # 矩阵维度定义
-    ROWS = 16
-    COLS = 256
-    
-    # 1. 读取并解析数据
-    try:
-        with open(input_filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-            clean_data = []
-            for item in content.split():
-                if item.isdigit() or (item.startswith('-') and item[1:].isdigit()):
-                    clean_data.append(int(item))
-                elif '[' in item: 
-                    continue
-    except FileNotFoundError:
-        print(f"错误: 找不到文件 {input_filename}")
-        return
-
-    if len(clean_data) < ROWS * COLS:
-        print(f"警告: 数据量不足。期望 {ROWS*COLS} 个数字，实际读取到 {len(clean_data)} 个。")
-        clean_data += [0] * (ROWS * COLS - len(clean_data))
-    
-    matrix = [clean_data[i*COLS : (i+1)*COLS] for i in range(ROWS)]
-    print(f"成功读取矩阵: {len(matrix)} 行, {len(matrix[0])} 列")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from golden import matrix_multiply_and_scale, partial_sums, save_partial_sums  # 与 RTL 逐位一致的 golden 计算
+from convert_input import generate_hex_file
+from convert_weight import convert_file_to_readmemh
 
-    hex_lines = []
-    num_col_blocks = COLS // 16 
-    num_row_blocks = ROWS // 4  
-    
-    for c_blk in range(num_col_blocks):
-        col_start = c_blk * 16
-        for r_blk in range(num_row_blocks):
-            row_start = r_blk * 4
-            line_hex_str = ""
-            for r_offset in range(3, -1, -1): 
-                curr_row = row_start + r_offset
-                for c_offset in range(16):
-                    curr_col = col_start + c_offset
-                    val = matrix[curr_row][curr_col]
-                    line_hex_str += f"{val & 0xFF:02x}"
-            hex_lines.append(line_hex_str)
-
-    with open(output_filename, 'w') as f:
-        for line in hex_lines:
-            f.write(line + "\n")
-    print(f"成功生成文件: {output_filename}")
+def generate_hex_file_input(input_filename, output_filename):
+    # 矩阵维度由输入文件决定, 打包逻辑见 convert_input.pack_input_memory
+    generate_hex_file(input_filename, output_filename)
 
 def generate_hex_file_weight(input_file: str, output_file: str) -> None:
-    # 1. 读取并解析输入文件
-    if not os.path.exists(input_file):
-        print(f"错误：找不到文件 {input_file}")
-        return
-
-    with open(input_file, 'r') as f:
-        lines = f.readlines()
-
-    data_matrix = []
-    for line in lines:
-        numbers = line.strip().split()
-        if not numbers: continue
-        
-        int_numbers = []
-        for num_str in numbers:
-            num = int(num_str)
-            # 处理 8-bit 补码
-            if num < 0:
-                num_8bit = (1 << 8) + num
-            else:
-                num_8bit = num
-            int_numbers.append(num_8bit)
-        data_matrix.append(int_numbers)
-    
-    print(f"成功读取输入文件：{len(data_matrix)}行，每行{len(data_matrix[0])}个数")
-
-    # 2. 生成原始的 Hex 行数据 (按 position 循环)
-    # 此时生成的 output_lines 共有 256 行
-    raw_output_lines = []
-    for position in range(256):
-        position_numbers = []
-        for row in range(64):
-            position_numbers.append(data_matrix[row][position])
-
-        hex_line = []
-        for i in range(0, 64, 4):
-            group = position_numbers[i:i+4]
-            value_32bit = 0
-            for j, num in enumerate(group):
-                value_32bit |= (num << (24 - j * 8))
-            hex_str = format(value_32bit, '08x')
-            hex_line.append(hex_str)
-        raw_output_lines.append(''.join(hex_line))
-
-    # 3. 新增逻辑：以每 16 行为一组，组内行顺序倒置
-    # 256 行会被分成 16 组（256/16 = 16）
-    final_output_lines = []
-    group_size = 16
-    
-    for i in range(0, len(raw_output_lines), group_size):
-        # 获取当前组 (16行)
-        current_group = raw_output_lines[i : i + group_size]
-        # 使用 [::-1] 将组内列表倒置并添加到最终结果中
-        final_output_lines.extend(current_group[::-1])
-
-    # 4. 写入输出文件
-    with open(output_file, 'w') as f:
-        for line in final_output_lines:
-            f.write(line + '\n')
-    
-    print(f"成功写入输出文件：{len(final_output_lines)}行")
+    # 打包逻辑 (含每 16 行一组倒置) 见 convert_weight.pack_weight_memory
+    convert_file_to_readmemh(input_file, output_file)
 
 def get_matrix(input_file: str):
     if not os.path.exists(input_file): return []
@@ -124,49 +27,12 @@ def get_matrix(input_file: str):
         data_matrix.append([int(num_str) for num_str in numbers])
     return data_matrix
 
-def matrix_multiply_and_scale(A, B_T, scale: float):
-    m, k, n = len(A), len(A[0]), len(B_T)
-    result = [[0 for _ in range(n)] for _ in range(m)]
-    for i in range(m):
-        for j in range(n):
-            acc = sum(A[i][l] * B_T[j][l] for l in range(k))
-            final_val = max(-128, min(127, int(round(acc * scale))))
-            result[i][j] = final_val
-    return result
-
 def save_matrix(matrix, output_file):
     with open(output_file, 'w') as f:
         for row in matrix:
             f.write(" ".join(map(str, row)) + "\n")
     print(f"结果已保存至 {output_file}")
 
-# --- 新增函数：计算并保存16个中间步骤的结果 ---
-def save_intermediate_steps(A, B_T, output_file):
-    """
-    将 256 维的计算拆分为 16 个 Step，每个 Step 计算 16 列的乘加结果。
-    每个 Step 输出一个 16x64 的矩阵（Partial Sums）。
-    """
-    m = len(A)      # 16
-    k = len(A[0])   # 256
-    n = len(B_T)    # 64
-    num_steps = k // 16 # 16 次
-    
-    with open(output_file, 'w') as f:
-        for step in range(num_steps):
-            f.write(f"--- Step {step} (Input/Weight Cols {step*16} to {step*16+15}) ---\n")
-            col_start = step * 16
-            col_end = col_start + 16
-            
-            for i in range(m):
-                row_partials = []
-                for j in range(n):
-                    # 计算当前 16 列对应的部分和
-                    p_sum = sum(A[i][l] * B_T[j][l] for l in range(col_start, col_end))
-                    row_partials.append(str(p_sum))
-                f.write(" ".join(row_partials) + "\n")
-            f.write("\n")
-    print(f"中间过程已保存至 {output_file}")
-
 def float_to_fp32_binary(num: float):
     """
     将浮点数转换为 IEEE 754 标准的 32位二进制字符串
@@ -256,5 +122,6 @@ if w_test and a_test:
     res_int8 = matrix_multiply_and_scale(a_test, w_test, SCALE_FACTOR)
     save_matrix(res_int8, f"output_golden_{test_name}.txt")
     
-    # 2. 调用新增功能：保存 16 次矩阵乘法的中间部分和
-    save_intermediate_steps(a_test, w_test, f"intermediate_results_{test_name}.txt")
\ No newline at end of file
+    # 2. 保存每个 Step (16 列) 的部分和及 psum cache 中的累加值
+    partial, cumulative = partial_sums(a_test, w_test)
+    save_partial_sums(partial, cumulative, f"intermediate_results_{test_name}.bin", k=len(a_test[0]))
\ No newline at end of file
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+'''
+UB 存储镜像的二进制格式 (与 $readmemh 文本格式互转)
+
+文件布局 (小端):
+    header (64 Byte): magic 'UBIM', version(u16), kind(u16), line_bytes(u32), lines(u32),
+                      rows(u32), cols(u32), arrays(u16), reserved, 其余补 0
+    data            : lines x line_bytes, 每行按小端存放, 即第 i 个字节对应 RTL 中的 [8i+7:8i]
+
+按小端存放后, 128 bit 切片 / 32 bit bias 等字段都可以直接作为 np.memmap 的视图访问,
+不需要任何拷贝或文本解析
+
+使用说明:
+    python3 ub_image.py to-hex   <镜像.bin> <输出.txt>
+    python3 ub_image.py from-hex <input|weight|misc> <输入.txt> <镜像.bin>
+    python3 ub_image.py info     <镜像.bin>
+'''
+
+import argparse
+import struct
+
+import numpy as np
+
+UBIM_MAGIC = b'UBIM'
+UBIM_VERSION = 1
+HEADER_SIZE = 64
+HEADER = struct.Struct('<4sHHIIIIHH')
+
+# 各存储阵列: kind 编号, 每行字节数, 深度 (与 unified_buffer.sv 一致)
+MEMORY_KINDS = {
+    'input':  (0, 64, 256),     # input_memory  : 256 x 512bit
+    'weight': (1, 64, 1024),    # weight_memory : 1024 x 512bit
+    'misc':   (2, 256, 16),     # misc_memory   : 16 x 2048bit
+}
+KIND_NAMES = {code: name for name, (code, _, _) in MEMORY_KINDS.items()}
+
+# AXI 写入: 各存储在 UB 内部的字地址基址, AXI 地址 = TPU_BASE_ADDR + (内部字地址 << 3)
+TPU_BASE_ADDR = 0x40000000
+AXI_BASES = {'weight': 0x0000, 'input': 0x2000, 'misc': 0x2800}
+INPUT_BANK_BASES = (0x2000, 0x3000)     # input_memory 的两个乒乓 bank
+
+# to-hex 时每次转换的行数, 控制大镜像转换时的内存占用
+HEX_CHUNK_LINES = 4096
+
+def save_image(output_file, image, kind, rows=0, cols=0, arrays=0):
+    """
+    保存镜像, image 为 (lines, line_bytes) 的 uint8 数组, 字节顺序与 $readmemh 相同 (左侧为 MSB),
+    即 pack_input_memory / pack_weight_memory 的输出; rows / cols / arrays 记录原矩阵形状与布局
+    """
+    code, line_bytes, depth = MEMORY_KINDS[kind]
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim != 2 or image.shape[1] != line_bytes:
+        raise ValueError(f"{kind} image must be (lines, {line_bytes}) uint8, got {image.shape}")
+    if image.shape[0] > depth:
+        print(f"警告: {kind} 镜像共 {image.shape[0]} 行, 超出存储深度 {depth}")
+
+    header = HEADER.pack(UBIM_MAGIC, UBIM_VERSION, code, line_bytes, image.shape[0],
+                         rows, cols, arrays, 0)
+    with open(output_file, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        f.write(np.ascontiguousarray(image[:, ::-1]).tobytes())
+
+def read_header(input_file):
+    with open(input_file, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    magic, version, code, line_bytes, lines, rows, cols, arrays, _ = HEADER.unpack(raw[:HEADER.size])
+    if magic != UBIM_MAGIC or version != UBIM_VERSION:
+        raise ValueError(f"{input_file} is not a UBIM v{UBIM_VERSION} image")
+    return {
+        "kind": KIND_NAMES[code],
+        "line_bytes": line_bytes,
+        "lines": lines,
+        "rows": rows,
+        "cols": cols,
+        "arrays": arrays,
+    }
+
+def open_image(input_file, mode='r'):
+    """
+    以 np.memmap 打开镜像, 不拷贝数据; 返回 (header, (lines, line_bytes) 的小端 uint8 视图)
+    例: bias = open_image('misc.bin')[1][0].view('<i4')
+    """
+    header = read_header(input_file)
+    data = np.memmap(input_file, dtype=np.uint8, mode=mode, offset=HEADER_SIZE,
+                     shape=(header["lines"], header["line_bytes"]))
+    return header, data
+
+def image_to_readmemh(input_file, output_file):
+    """二进制镜像 -> $readmemh 文本, 分块转换"""
+    header, data = open_image(input_file)
+    line_chars = header["line_bytes"] * 2
+    with open(output_file, 'w') as f:
+        for start in range(0, header["lines"], HEX_CHUNK_LINES):
+            hex_str = np.ascontiguousarray(data[start:start + HEX_CHUNK_LINES, ::-1]).tobytes().hex()
+            f.write("\n".join(hex_str[i:i + line_chars] for i in range(0, len(hex_str), line_chars)))
+            f.write("\n")
+    return header
+
+def readmemh_to_image(kind, input_file, output_file):
+    """
+    $readmemh 文本 -> 二进制镜像 (用于转换已有的 *_hex.txt)
+    支持 // 注释与 @addr 跳转: 之后的行从该地址起放置, 未给出的行为 0
+    """
+    _, line_bytes, _ = MEMORY_KINDS[kind]
+    addrs, values = [], []
+    addr = 0
+    with open(input_file, 'r') as f:
+        for line in f:
+            for token in line.split('//', 1)[0].split():
+                if token.startswith('@'):
+                    addr = int(token[1:], 16)
+                    continue
+                addrs.append(addr)
+                values.append(token.replace('_', '').rjust(line_bytes * 2, '0'))
+                addr += 1
+    data = np.frombuffer(bytes.fromhex("".join(values)), dtype=np.uint8).reshape(-1, line_bytes)
+    image = np.zeros((max(addrs, default=-1) + 1, line_bytes), dtype=np.uint8)
+    image[addrs] = data
+    save_image(output_file, image, kind)
+    return image
+
+def axi_write_beats(image, kind, width=512, start_line=0, bank=0):
+    """
+    镜像 -> 宽写入的拍: 返回 (addrs, beats), addrs 为每拍的 AXI 地址 (uint64, n),
+    beats 为 (n, width / 64) 的 uint64, 第 l 列为该拍 axi_wdata[l*64 +: 64];
+    image 同 save_image 的输入, 从存储第 start_line 行起写入, width 为 tpu 的 AXI_WR_WIDTH
+    512 位时每行一拍, misc (2048 bit) 每行 4 拍; input 镜像由 bank 选择写入的乒乓 bank
+    """
+    _, line_bytes, depth = MEMORY_KINDS[kind]
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim != 2 or image.shape[1] != line_bytes:
+        raise ValueError(f"{kind} image must be (lines, {line_bytes}) uint8, got {image.shape}")
+    if width % 64 or (line_bytes * 8) % width:
+        raise ValueError(f"width {width} must be a multiple of 64 dividing the {line_bytes * 8}-bit line")
+    if start_line + image.shape[0] > depth:
+        raise ValueError(f"{image.shape[0]} {kind} lines do not fit in {depth} lines from line {start_line}")
+    lanes = width // 64
+    beats = np.ascontiguousarray(image[:, ::-1]).view('<u8').reshape(-1, lanes)
+    words = np.arange(len(beats), dtype=np.uint64) * np.uint64(lanes)
+    base = INPUT_BANK_BASES[bank] if kind == 'input' else AXI_BASES[kind]
+    first = np.uint64(base + start_line * (line_bytes // 8))
+    addrs = np.uint64(TPU_BASE_ADDR) + ((first + words) << np.uint64(3))
+    return addrs, beats.astype(np.uint64)
+
+def main():
+    parser = argparse.ArgumentParser(description="UB 二进制镜像工具")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p = sub.add_parser('to-hex')
+    p.add_argument('image')
+    p.add_argument('output')
+
+    p = sub.add_parser('from-hex')
+    p.add_argument('kind', choices=sorted(MEMORY_KINDS))
+    p.add_argument('input')
+    p.add_argument('image')
+
+    p = sub.add_parser('info')
+    p.add_argument('image')
+
+    args = parser.parse_args()
+    if args.cmd == 'to-hex':
+        header = image_to_readmemh(args.image, args.output)
+        print(f"成功生成文件: {args.output} ({header['lines']} 行)")
+    elif args.cmd == 'from-hex':
+        image = readmemh_to_image(args.kind, args.input, args.image)
+        print(f"成功生成镜像: {args.image} ({image.shape[0]} 行)")
+    else:
+        print(read_header(args.image))
+
+if __name__ == "__main__":
+    main()
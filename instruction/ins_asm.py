@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+'''
+批量指令汇编器: 字段表只编译一次, 整个程序按列向量化解析, 不再逐行逐字段调用 parse_value
+
+使用说明:
+    python3 ins_asm.py <输入文档> <输出文件> [--format bin|hex|raw|axi]
+    输入与 ins_convert.py 相同 (excel 指令部分粘贴出的 16 列文本, # 或 // 开头的行为注释)
+    --format 缺省时按输出文件后缀选择: .bin -> raw, .hex -> hex, .axi -> axi, 其余 -> bin
+    --loop 把地址按固定步长递增、其余字段相同的连续指令压缩为循环指令
+
+循环指令 (第 54 位为 1, control_unit 中不占额外的拍):
+    源文本中写作一行 "LOOP <条数> <input 步长> <VPU 步长> <weight 步长> [<窗口>]", 数值为十进制或 0x 十六进制,
+    步长可为负, 窗口缺省为 1; 连续发出 <条数> 条指令 (1 ~ 1024), 每条为 <窗口> 拍 (1 ~ 16) 之前发出的指令
+    在 input_rd_addr / VPU_wr_addr / weight_rd_addr 上加对应的步长, 即以最近 <窗口> 条指令为循环体
+
+输出格式:
+    bin : 每行 54 位二进制字符串, 供 $readmemb (与 ins_convert.py 输出一致, 即 ins.txt); 含循环指令时每行 55 位
+    hex : 每行 14 位十六进制, 供 $readmemh (+INS_HEX)
+    raw : 每条指令一个小端 uint64, 无文件头
+    axi : 每行 "<axi_addr> <axi_wdata>", 按顺序 axi_write 即可将程序写入 instruction_cache
+'''
+
+import argparse
+import re
+import sys
+
+import numpy as np
+
+from ins_convert import InstructionConverter
+
+OP_LEN = 54             # 普通指令的位宽 (ins_convert.py / control_unit 的 decode)
+INS_LEN = 55            # instruction_cache 的行宽, 第 54 位为循环指令标志
+INS_HEX_DIGITS = (INS_LEN + 3) // 4
+ICACHE_DEPTH = 1024
+
+# 循环指令: [9:0] / [19:10] / [31:20] 为三个地址字段 (即字段表的前 3 个字段) 的步长,
+# [41:32] 为发出条数 - 1, [45:42] 为窗口 - 1 (control_unit 保存最近 LOOP_WINDOW 拍发出的指令)
+LOOP_FLAG = 1 << OP_LEN
+LOOP_MAX = 1024
+LOOP_WINDOW = 16
+LOOP_COUNT_START, LOOP_COUNT_BITS = 32, 10
+LOOP_WINDOW_START, LOOP_WINDOW_BITS = 42, 4
+LOOP_FIELD_NAMES = ("input_rd_addr", "VPU_wr_addr", "weight_rd_addr")
+LOOP_FIELDS = len(LOOP_FIELD_NAMES)
+LOOP_KEYWORD = "LOOP"
+OP_MASK = (1 << OP_LEN) - 1
+ADDR_MASK = (1 << LOOP_COUNT_START) - 1
+
+# 流水线时序 (拍, 与 RTL 一致): ins_perf 的静态分析、ins_gemm 的调度与 sim/tpu_tlm.py 的事务级模型共用
+ARRAY_ROWS = 16             # 阵列行 / 列数
+INPUT_DELAY = 2             # sa_switch_weight 后第 2 拍起送入的输入使用新权重
+ARRAY_LATENCY = 16          # 输入送入到第 0 列结果进入 psum cache
+DRAIN_LATENCY = ARRAY_LATENCY + ARRAY_ROWS - 1     # 输入送入到第 15 列结果进入 psum cache
+PIPE_LATENCY = 2            # psum cache 输出 -> vpu_out 写回 (relu 后 / dequant 后各一级 pipe_register)
+STATUS_LATENCY = 1          # finish -> status_reg 的 FINISH 寄存器
+
+# AXI 地址: axi_addr = TPU_BASE_ADDR + (内部地址 << 3), instruction_cache 内部地址 0x2A00 + 行号
+TPU_BASE_ADDR = 0x40000000
+ICACHE_BASE = 0x2A00
+
+class FieldTable:
+    """由 InstructionConverter.fields 编译出的向量化字段表"""
+    def __init__(self, fields=None, total_bits=INS_LEN):
+        if fields is None:
+            fields = InstructionConverter(total_bits).fields
+        self.fields = fields
+        self.total_bits = total_bits
+        self.names = [field["name"] for field in fields]
+        self.ranges = [field["range"] for field in fields]
+        self.start = np.array([field["start"] for field in fields], dtype=np.uint64)
+        self.width = np.array([field["width"] for field in fields], dtype=np.uint64)
+        self.mask = (np.uint64(1) << self.width) - np.uint64(1)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def encode(self, values):
+        """(n, 字段数) 的字段值 -> (n,) 的 uint64 指令; 超出位宽的值截断"""
+        values = np.asarray(values, dtype=np.uint64) & self.mask
+        return np.bitwise_or.reduce(values << self.start, axis=1)
+
+    def decode(self, words):
+        """(n,) 的 uint64 指令 -> (n, 字段数) 的字段值"""
+        words = np.asarray(words, dtype=np.uint64).reshape(-1, 1)
+        return (words >> self.start) & self.mask
+
+FIELD_TABLE = FieldTable()
+
+# 与 control_unit.sv 中的 ins_* 信号一一对应, 顺序同 InstructionConverter.fields
+FIELD_NAMES = [
+    "input_rd_addr",        # [9:0]
+    "VPU_wr_addr",          # [19:10]
+    "weight_rd_addr",       # [31:20]
+    "bias_rd_addr",         # [35:32]
+    "scale_rd_addr",        # [39:36]
+    "sa_en_size",           # [41:40]
+    "VPU_en_size",          # [43:42]
+    "sa_weight_valid",      # [44]
+    "sa_switch_weight",     # [45]
+    "sa_input_valid",       # [46]
+    "vpu_mode_select",      # [48:47]
+    "vpu_psum_clear",       # [49]
+    "vpu_bias_en",          # [50]
+    "vpu_relu_en",          # [51]
+    "vpu_dequant_en",       # [52]
+    "finish",               # [53]
+]
+FIELD_INDEX = {name: i for i, name in enumerate(FIELD_NAMES)}
+
+def encode_loop(count, strides=(0, 0, 0), window=1, table=FIELD_TABLE):
+    """
+    循环指令字: 发出 count 条指令, 每条为 window 拍之前发出的指令加上步长,
+    strides 依次为 input_rd_addr / VPU_wr_addr / weight_rd_addr 的步长 (可为负)
+    """
+    if not 1 <= count <= LOOP_MAX:
+        raise ValueError(f"loop count {count} out of range 1..{LOOP_MAX}")
+    if not 1 <= window <= LOOP_WINDOW:
+        raise ValueError(f"loop window {window} out of range 1..{LOOP_WINDOW}")
+    word = LOOP_FLAG | ((count - 1) << LOOP_COUNT_START) | ((window - 1) << LOOP_WINDOW_START)
+    for start, mask, stride in zip(table.start[:LOOP_FIELDS].tolist(), table.mask[:LOOP_FIELDS].tolist(), strides):
+        word |= (int(stride) & mask) << start
+    return word
+
+def decode_loop(word, table=FIELD_TABLE):
+    """循环指令字 -> (条数, 三个步长, 窗口), 步长按字段位宽还原为有符号数"""
+    word = int(word)
+    count = ((word >> LOOP_COUNT_START) & ((1 << LOOP_COUNT_BITS) - 1)) + 1
+    window = ((word >> LOOP_WINDOW_START) & ((1 << LOOP_WINDOW_BITS) - 1)) + 1
+    strides = []
+    for start, width in zip(table.start[:LOOP_FIELDS].tolist(), table.width[:LOOP_FIELDS].tolist()):
+        value = (word >> start) & ((1 << width) - 1)
+        strides.append(value - (1 << width) if value >> (width - 1) else value)
+    return count, tuple(strides), window
+
+def is_loop(words):
+    """(n,) 的指令字 -> 是否为循环指令的 bool 数组"""
+    return ((np.asarray(words, dtype=np.uint64) >> np.uint64(OP_LEN)) & np.uint64(1)) == 1
+
+def expand_loops(words, table=FIELD_TABLE):
+    """
+    按 control_unit 的发射顺序展开循环指令, 返回 (issued, pcs): 逐条发出的 54 位指令与其所在的 PC
+    第 0 条照原样保留 (只在 PC 回绕后执行); 第 1 条之前发出的均视为 NOP (复位时 control_unit 的历史为 NOP)
+    不含循环指令时 issued 即 words, pcs 即 0 ~ n-1
+    """
+    words = np.asarray(words, dtype=np.uint64)
+    op_mask = np.uint64(OP_MASK)
+    loops = np.flatnonzero(is_loop(words)[1:]) + 1
+    if not len(loops):
+        return words & op_mask, np.arange(len(words))
+    starts, masks = table.start[:LOOP_FIELDS], table.mask[:LOOP_FIELDS]
+    issued, pcs = [words[:1] & op_mask], [np.zeros(1, dtype=np.int64)]
+    history = np.zeros(LOOP_WINDOW, dtype=np.uint64)
+    pc = 1
+    for loop_pc in loops.tolist():
+        if loop_pc > pc:
+            issued.append(words[pc:loop_pc] & op_mask)
+            pcs.append(np.arange(pc, loop_pc))
+            history = np.concatenate((history, issued[-1]))[-LOOP_WINDOW:]
+        count, _, window = decode_loop(words[loop_pc])
+        # 第 k 条 (k 从 0 起) 为循环体第 k % window 条加上 k // window + 1 倍的步长
+        k = np.arange(count)
+        source = history[LOOP_WINDOW - window:][k % window]
+        step = (words[loop_pc] >> starts) & masks
+        addr = ((((source[:, None] >> starts) & masks) + (k // window + 1).astype(np.uint64)[:, None] * step)
+                & masks) << starts
+        block = (source & ~np.uint64(ADDR_MASK)) | np.bitwise_or.reduce(addr, axis=1)
+        issued.append(block)
+        pcs.append(np.full(count, loop_pc))
+        history = np.concatenate((history, block))[-LOOP_WINDOW:]
+        pc = loop_pc + 1
+    issued.append(words[pc:] & op_mask)
+    pcs.append(np.arange(pc, len(words)))
+    return np.concatenate(issued), np.concatenate(pcs)
+
+def cycle_fields(words, table=FIELD_TABLE):
+    """
+    按拍展开的字段 {字段名: (拍数,) int64}: 第 c 项为使能后第 c 拍执行的指令 (循环指令已展开), 到第一条 finish 为止;
+    第 0 拍 icache 读使能尚未置位, 为 NOP; words 不足 ICACHE_DEPTH 条时其后为 0, PC 回绕后执行第 0 条.
+    没有 finish 时抛出 TimeoutError
+    """
+    words = np.asarray(words, dtype=np.uint64)[:ICACHE_DEPTH]
+    memory = np.zeros(ICACHE_DEPTH, dtype=np.uint64)
+    memory[:len(words)] = words
+    issued, _ = expand_loops(memory, table)
+    values = table.decode(issued).astype(np.int64)
+    finish = values[:, FIELD_INDEX["finish"]]
+    later = np.flatnonzero(finish[1:])
+    if len(later):
+        end = int(later[0]) + 2
+    elif finish[0]:
+        end = len(finish) + 1
+    else:
+        raise TimeoutError("no ins_finish: the PC keeps incrementing and wraps, the program never ends")
+    values = values[np.arange(end) % len(finish)]
+    values[0] = 0
+    return {name: values[:, i] for name, i in FIELD_INDEX.items()}
+
+def compress_loops(words, table=FIELD_TABLE):
+    """
+    expand_loops 的逆: 与 window 拍之前的指令只差固定地址步长的连续指令 (至少 2 条) 替换为一条循环指令,
+    每个位置取能覆盖最多条指令的窗口 (相同时取较小的), 每条至多 LOOP_MAX 条;
+    第 0 条保持不变, 已含的循环指令先展开. 发出的指令流与原程序逐拍相同
+    """
+    issued, _ = expand_loops(words, table)
+    n = len(issued)
+    if n < 2:
+        return issued.copy()
+    starts, masks = table.start[:LOOP_FIELDS], table.mask[:LOOP_FIELDS]
+    # 第 0 拍及之前发出的均为 NOP
+    seq = np.concatenate((np.zeros(LOOP_WINDOW + 1, dtype=np.uint64), issued[1:]))
+    fields = (seq[:, None] >> starts) & masks
+    ctrl = seq & ~np.uint64(ADDR_MASK)
+    index = np.arange(n)
+    cur = slice(LOOP_WINDOW, LOOP_WINDOW + n)
+
+    # span[w - 1, i] / stride[w - 1, i]: 以窗口 w 从第 i 拍起可由一条循环指令发出的条数与步长
+    span = np.zeros((LOOP_WINDOW, n), dtype=np.int64)
+    stride = np.zeros((LOOP_WINDOW, n), dtype=np.uint64)
+    for w in range(1, LOOP_WINDOW + 1):
+        prev = slice(LOOP_WINDOW - w, LOOP_WINDOW - w + n)
+        stride[w - 1] = np.bitwise_or.reduce(((fields[cur] - fields[prev]) & masks) << starts, axis=1)
+        same = ctrl[cur] == ctrl[prev]
+        cont = np.zeros(n, dtype=bool)
+        cont[:-1] = same[:-1] & same[1:] & (stride[w - 1, 1:] == stride[w - 1, :-1])
+        run_end = np.minimum.accumulate(np.where(cont, n, index)[::-1])[::-1]
+        span[w - 1] = np.where(same, run_end - index + 1, 0)
+    span = np.minimum(span, LOOP_MAX)
+    best = span.argmax(axis=0)
+    best_span = span[best, index].tolist()
+    best_stride = stride[best, index].tolist()
+    best = best.tolist()
+
+    out = [int(issued[0])]
+    i = 1
+    while i < n:
+        if best_span[i] >= 2:
+            out.append(LOOP_FLAG | ((best_span[i] - 1) << LOOP_COUNT_START) | (best[i] << LOOP_WINDOW_START)
+                       | best_stride[i])
+            i += best_span[i]
+        else:
+            out.append(int(issued[i]))
+            i += 1
+    return np.array(out, dtype=np.uint64)
+
+# 字符查找表: 0-9 / a-f / A-F 为对应数值, '_' 为分隔符 (跳过), 空白为 -3, 其余非法字符为 -1
+_BAD, _SKIP, _SPACE = -1, -2, -3
+_DIGIT_LUT = np.full(256, _BAD, dtype=np.int8)
+_DIGIT_LUT[ord('0'):ord('9') + 1] = np.arange(10)
+_DIGIT_LUT[ord('a'):ord('f') + 1] = np.arange(10, 16)
+_DIGIT_LUT[ord('A'):ord('F') + 1] = np.arange(10, 16)
+_DIGIT_LUT[ord('_')] = _SKIP
+for _c in b' \t\r\n\v\f':
+    _DIGIT_LUT[_c] = _SPACE
+
+class AssembleError(ValueError):
+    """带行号的汇编错误列表"""
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(f"行 {line_num}: {msg}" for line_num, msg in errors))
+
+def parse_program(text):
+    """
+    一次性解析整个程序文本 (bytes), 不逐行 split, 不逐字段调用 int():
+    0x 开头的字段为十六进制, 其余为二进制 (与 InstructionConverter.parse_value 一致)
+    空行与 # / // 开头的注释行被跳过
+    返回 dict: line_nums (每条指令的源行号), counts (每行字段数), values / bad (按字段展开),
+               tok_start / tok_end (字段在 text 中的位置, 用于报错)
+    """
+    buf = np.frombuffer(text, dtype=np.uint8)
+    digit = _DIGIT_LUT[buf]
+    is_space = digit == _SPACE
+    # 换行符本身计入下一行, 不影响结果 (换行符是空白)
+    line_id = np.cumsum(buf == ord('\n'), dtype=np.int32)
+
+    # 注释行: 每行第一个非空白字符为 '#' 或 "//"
+    nonspace = np.flatnonzero(~is_space)
+    nonspace_line = line_id[nonspace]
+    first_mask = np.ones(len(nonspace), dtype=bool)
+    first_mask[1:] = nonspace_line[1:] != nonspace_line[:-1]
+    first = nonspace[first_mask]
+    lines_with_text = nonspace_line[first_mask]
+    second = np.minimum(first + 1, len(buf) - 1)
+    comment = (buf[first] == ord('#')) | ((buf[first] == ord('/')) & (buf[second] == ord('/')))
+    if comment.any():
+        comment_line = np.zeros(int(line_id[-1]) + 1, dtype=bool)
+        comment_line[lines_with_text[comment]] = True
+        is_space |= comment_line[line_id]
+    code_lines = lines_with_text[~comment]
+
+    # 字段边界
+    in_token = ~is_space
+    edges = np.diff(np.concatenate(([0], in_token.view(np.int8), [0])))
+    tok_start = np.flatnonzero(edges == 1)
+    tok_end = np.flatnonzero(edges == -1)
+    first_tok = np.searchsorted(line_id[tok_start], code_lines)
+    counts = np.diff(np.append(first_tok, len(tok_start)))
+
+    # 0x 前缀
+    tok_len = tok_end - tok_start
+    nxt = np.minimum(tok_start + 1, len(buf) - 1)
+    is_hex = (tok_len >= 2) & (buf[tok_start] == ord('0')) & ((buf[nxt] | 0x20) == ord('x'))
+
+    # 只保留字段内的字符: d 为压缩后的数组, seg 为每个字段在其中的起点
+    char_idx = np.flatnonzero(in_token)
+    seg = np.cumsum(tok_len) - tok_len
+    d = digit[char_idx].astype(np.int16)
+    tok_of_char = np.repeat(np.arange(len(tok_start)), tok_len)
+    d[seg[is_hex]] = _SKIP
+    d[seg[is_hex] + 1] = _SKIP
+
+    base_bits = np.where(is_hex, 4, 1).astype(np.int16)[tok_of_char]
+    valid = d >= 0
+    bad_char = (d == _BAD) | (valid & (d >= (1 << base_bits)))
+
+    # 每个数字距字段末尾的位置 (只计有效数字), 由此得到移位量
+    csum = np.cumsum(valid, dtype=np.int32)
+    total = np.add.reduceat(valid, seg, dtype=np.int32) if len(seg) else np.zeros(0, dtype=np.int32)
+    before = csum[seg] - valid[seg]
+    pos_from_end = (total + before)[tok_of_char] - csum
+    shift = pos_from_end * base_bits
+    # 超出 64 bit 的字段 / 含非法字符的字段 / 没有任何数字的字段 (如单独的 "0x") 均无法解析
+    bad_char |= valid & (shift >= 64)
+    bad = np.logical_or.reduceat(bad_char, seg) if len(seg) else np.zeros(0, dtype=bool)
+    bad |= total == 0
+
+    keep = valid & (shift < 64)
+    contrib = np.where(keep, d, 0).astype(np.uint64) << np.where(keep, shift, 0).astype(np.uint64)
+    values = np.add.reduceat(contrib, seg) if len(seg) else np.zeros(0, dtype=np.uint64)
+
+    return {
+        "line_nums": code_lines + 1,
+        "counts": counts,
+        "values": values.astype(np.uint64),
+        "bad": bad,
+        "tok_start": tok_start,
+        "tok_end": tok_end,
+    }
+
+_LOOP_LINE = re.compile(rb'^[ \t]*(' + LOOP_KEYWORD.encode() + rb')\b([^\n]*)', re.IGNORECASE | re.MULTILINE)
+
+def split_loops(text, table=FIELD_TABLE):
+    """
+    把源文本 (bytes) 中的 LOOP 行改为注释行 (行号不变), 其余行仍由 parse_program 向量化解析
+    返回 (text, loops, errors): loops 为 [(行号, 循环指令字), ...], errors 为 [(行号, 说明), ...]
+    """
+    if not _LOOP_LINE.search(text):
+        return text, [], []
+    buf = bytearray(text)
+    loops, errors = [], []
+    line_num, pos = 1, 0
+    for m in _LOOP_LINE.finditer(text):
+        line_num += text.count(b'\n', pos, m.start())
+        pos = m.start()
+        buf[m.start(1)] = ord('#')
+        tokens = m.group(2).decode('utf-8', 'replace').split()
+        if len(tokens) not in (1 + LOOP_FIELDS, 2 + LOOP_FIELDS):
+            errors.append((line_num, f"{LOOP_KEYWORD} 需要条数、{LOOP_FIELDS} 个步长与可选的窗口，实际 {len(tokens)} 个数"))
+            continue
+        try:
+            values = [int(token, 0) for token in tokens]
+        except ValueError:
+            errors.append((line_num, f"{LOOP_KEYWORD} 的参数 '{' '.join(tokens)}' 无法解析"))
+            continue
+        count, strides, window = values[0], values[1:1 + LOOP_FIELDS], (values[1 + LOOP_FIELDS:] or [1])[0]
+        bad = [f"{LOOP_FIELD_NAMES[i]} 步长 {s} 超出 {int(table.width[i])} 位" for i, s in enumerate(strides)
+               if not -int(table.mask[i]) <= s <= int(table.mask[i])]
+        if not 1 <= count <= LOOP_MAX:
+            bad.insert(0, f"条数 {count} 不在 1 ~ {LOOP_MAX}")
+        if not 1 <= window <= LOOP_WINDOW:
+            bad.append(f"窗口 {window} 不在 1 ~ {LOOP_WINDOW}")
+        if bad:
+            errors.append((line_num, f"{LOOP_KEYWORD}: " + ", ".join(bad)))
+            continue
+        loops.append((line_num, encode_loop(count, strides, window, table)))
+    return bytes(buf), loops, errors
+
+def merge_loops(words, line_nums, loops):
+    """按源行号把 split_loops 取出的循环指令插回程序, 返回 (words, line_nums)"""
+    if not loops:
+        return words, line_nums
+    lines = np.concatenate((line_nums, [line for line, _ in loops]))
+    order = np.argsort(lines, kind='stable')
+    return np.concatenate((words, np.array([word for _, word in loops], dtype=np.uint64)))[order], lines[order]
+
+def assemble_text(text, table=FIELD_TABLE, strict=True):
+    """
+    指令文本 (str / bytes) -> (n,) 的 uint64 指令
+    字段数不符 / 非法字符总是报错; 字段值超出位宽时 strict=True 报错, 否则截断并给出警告
+    """
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    text, loops, loop_errors = split_loops(text, table)
+    parsed = parse_program(text)
+    line_nums, counts = parsed["line_nums"], parsed["counts"]
+    nfields = len(table)
+
+    wrong = np.flatnonzero(counts != nfields)
+    if len(wrong) or loop_errors:
+        raise AssembleError(sorted(loop_errors + [(int(line_nums[i]), f"字段数量不正确 - 期望 {nfields} 个，"
+                                                                      f"实际 {int(counts[i])} 个") for i in wrong]))
+
+    values = parsed["values"].reshape(-1, nfields)
+    bad = parsed["bad"].reshape(-1, nfields)
+    overflow = (values > table.mask) & ~bad
+
+    def token(i, j):
+        k = i * nfields + j
+        return text[parsed["tok_start"][k]:parsed["tok_end"][k]].decode('utf-8', 'replace')
+
+    errors = [(int(line_nums[i]), f"字段{j}({table.ranges[j]}) '{token(i, j)}' 无法解析")
+              for i, j in zip(*np.nonzero(bad))]
+    warnings = [(int(line_nums[i]), f"字段{j}({table.ranges[j]}) 的值 0x{int(values[i, j]):x} "
+                                    f"超出 {int(table.width[j])} 位范围")
+                for i, j in zip(*np.nonzero(overflow))]
+    if strict:
+        errors.extend(warnings)
+    if errors:
+        raise AssembleError(sorted(errors))
+    for line_num, msg in warnings:
+        print(f"警告: 行 {line_num}: {msg}，已截断")
+    return merge_loops(table.encode(values), line_nums, loops)[0]
+
+def assemble_rows(rows, table=FIELD_TABLE, strict=True):
+    """字段文本的列表 (每条指令一个 list) -> (n,) 的 uint64 指令"""
+    return assemble_text("\n".join(" ".join(row) for row in rows), table, strict)
+
+def assemble_file(input_file, table=FIELD_TABLE, strict=True):
+    with open(input_file, 'rb') as f:
+        return assemble_text(f.read(), table, strict)
+
+def to_readmemb_lines(words, total_bits=None):
+    """uint64 指令 -> 二进制文本行: 缺省不含循环指令时为 54 位 (同 ins_convert.py), 否则为 55 位"""
+    if total_bits is None:
+        total_bits = INS_LEN if is_loop(words).any() else OP_LEN
+    bits = np.unpackbits(np.asarray(words, dtype='>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    chars = (bits[:, 64 - total_bits:] + ord('0')).astype(np.uint8).tobytes().decode('ascii')
+    return [chars[i:i + total_bits] for i in range(0, len(chars), total_bits)]
+
+def to_readmemh_lines(words, digits=INS_HEX_DIGITS):
+    """uint64 指令 -> 十六进制文本行 (54 bit 共 14 位)"""
+    hex_str = np.asarray(words, dtype='>u8').tobytes().hex()
+    return [hex_str[i + 16 - digits:i + 16] for i in range(0, len(hex_str), 16)]
+
+def to_raw_bytes(words):
+    return np.asarray(words, dtype='<u8').tobytes()
+
+def axi_write_words(words, start_row=0):
+    """
+    返回 (n, 2) 的 uint64 数组: 每行为 (axi_addr, axi_wdata), 第 i 条指令写入 icache 第 start_row + i 行
+    """
+    words = np.asarray(words, dtype=np.uint64)
+    if start_row + len(words) > ICACHE_DEPTH:
+        raise ValueError(f"program of {len(words)} instructions does not fit in icache from row {start_row}")
+    rows = np.arange(start_row, start_row + len(words), dtype=np.uint64)
+    addrs = np.uint64(TPU_BASE_ADDR) + ((np.uint64(ICACHE_BASE) + rows) << np.uint64(3))
+    return np.stack([addrs, words], axis=1)
+
+def link_programs(programs):
+    """
+    把若干程序依次放入同一个 icache 镜像, 返回 (words, entries), entries[k] 为第 k 个程序第 0 条所在的行,
+    即作业队列 (status_reg 的 ADDR_REG_QUEUE) 的入口 PC; 程序中没有绝对地址 (循环指令只引用此前发出的指令),
+    从任意行开始执行时发出的指令流不变
+    """
+    programs = [np.asarray(p, dtype=np.uint64) for p in programs]
+    sizes = [len(p) for p in programs]
+    if sum(sizes) > ICACHE_DEPTH:
+        raise ValueError(f"programs of {sizes} instructions do not fit in the {ICACHE_DEPTH}-entry icache")
+    entries = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(int).tolist() if programs else []
+    words = np.concatenate(programs) if programs else np.zeros(0, dtype=np.uint64)
+    return words, entries
+
+def load_words(input_file):
+    """读取 ins.txt ($readmemb 文本) / $readmemh 文本 / raw 二进制, 返回 uint64 指令"""
+    if input_file.endswith('.bin'):
+        return np.fromfile(input_file, dtype='<u8')
+    with open(input_file, 'r') as f:
+        lines = [line.split('//', 1)[0].strip() for line in f]
+    lines = [line for line in lines if line]
+    base = 2 if all(len(line) in (OP_LEN, INS_LEN) and set(line) <= {'0', '1'} for line in lines) else 16
+    return np.array([int(line, base) for line in lines], dtype=np.uint64)
+
+def write_output(words, output_file, fmt):
+    if fmt == 'raw':
+        with open(output_file, 'wb') as f:
+            f.write(to_raw_bytes(words))
+        return
+    if fmt == 'bin':
+        lines = to_readmemb_lines(words)
+    elif fmt == 'hex':
+        lines = to_readmemh_lines(words)
+    else:
+        lines = [f"0x{int(addr):016x} 0x{int(data):016x}" for addr, data in axi_write_words(words)]
+    with open(output_file, 'w') as f:
+        f.write("\n".join(lines) + "\n" if lines else "")
+
+def format_for(output_file):
+    for suffix, fmt in (('.bin', 'raw'), ('.hex', 'hex'), ('.axi', 'axi')):
+        if output_file.endswith(suffix):
+            return fmt
+    return 'bin'
+
+def main():
+    parser = argparse.ArgumentParser(description="54 位指令批量汇编器")
+    parser.add_argument('input_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--format', choices=['bin', 'hex', 'raw', 'axi'], default=None)
+    parser.add_argument('--truncate', action='store_true', help="字段超出位宽时截断并警告 (ins_convert.py 的行为)")
+    parser.add_argument('--loop', action='store_true', help="把地址等步长递增的连续指令压缩为循环指令")
+    args = parser.parse_args()
+
+    try:
+        words = assemble_file(args.input_file, strict=not args.truncate)
+    except AssembleError as e:
+        print(f"汇编失败:\n{e}")
+        sys.exit(1)
+    except FileNotFoundError as e:
+        print(f"错误: 找不到文件 {e.filename}")
+        sys.exit(1)
+
+    count = len(words)
+    if args.loop:
+        words = compress_loops(words)
+    fmt = args.format or format_for(args.output_file)
+    write_output(words, args.output_file, fmt)
+    print(f"成功汇编 {len(words)} 条指令 -> {args.output_file} ({fmt})"
+          + (f", 循环压缩前 {count} 条" if args.loop else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+'''
+指令静态检查: 单遍向量化扫描整个程序, 在 RTL 仿真前拒绝非法程序
+
+使用说明:
+    python3 ins_check.py <指令文件> [<指令文件> ...] [--quiet]
+    指令文件可以是 ins_origin.txt 格式的源文本, ins.txt ($readmemb), $readmemh 文本或 .bin
+    存在 error 时返回码为 1
+
+检查项 (error):
+    FIELD_OVERFLOW : 源文本中字段值超出位宽 (如 VPU写回地址 超出 10 位 ins_VPU_wr_addr)
+    NO_FINISH      : 程序中没有 ins_finish, PC 会一直递增并回绕
+    TOO_LONG       : 第一条 finish 之前的指令数超出 instruction_cache 深度
+    EARLY_SWITCH   : sa_switch_weight 之前 (自上一次翻转起) 预加载的权重不足 16 行
+    SA_DISABLED    : 权重 / 输入有效或翻转时 sa_en_size 为 0, 阵列处于复位, 数据丢失
+检查项 (warning):
+    WEIGHT_ALIGN   : weight 读地址不是阵列数的整数倍, 低位被 unified_buffer 忽略
+    VPU_ALIGN      : VPU 写回地址的低位被忽略 (x4 时 [1:0], x2 时 [0]), 多条写回落在同一位置会相互覆盖
+    DEAD_CODE      : 第一条 finish 之后的指令不会被执行
+    LOOP_RESERVED  : 循环指令中条数 / 窗口 / 步长以外的位不为 0, control_unit 忽略这些位
+    LOOP_AT_ZERO   : 第 0 条为循环指令, 只在 PC 回绕后执行
+含循环指令的程序按 control_unit 的发射顺序展开后检查, 报告的 PC 为循环指令所在的 PC
+'''
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from ins_asm import (FIELD_TABLE, ICACHE_DEPTH, LOOP_FLAG, LOOP_KEYWORD, LOOP_WINDOW_START, LOOP_WINDOW_BITS, AssembleError,
+                     parse_program, split_loops, merge_loops, load_words, expand_loops, is_loop)
+from ins_disasm import FIELD_NAMES, SIZE_ARRAYS, decode
+
+# 每次翻转前需要预加载的权重行数 (= 脉动阵列行数)
+ARRAY_ROWS = 16
+
+Issue = namedtuple('Issue', ['level', 'pc', 'line', 'code', 'msg'])
+
+# 循环指令中有定义的位: 标志, 窗口, 条数与三个步长
+LOOP_DEFINED = LOOP_FLAG | (((1 << LOOP_WINDOW_BITS) - 1) << LOOP_WINDOW_START) | ((1 << LOOP_WINDOW_START) - 1)
+
+def _issues(level, code, cycles, pcs, line_nums, msg_fn):
+    """cycles 为展开后的拍, 由 pcs 映射到所在的 PC 与源行号; 同一条循环指令只报告第一次"""
+    issues, seen = [], set()
+    for c in cycles:
+        pc = int(pcs[c])
+        if pc not in seen:
+            seen.add(pc)
+            issues.append(Issue(level, pc, int(line_nums[pc]), code, msg_fn(c)))
+    return issues
+
+def check_words(words, line_nums=None):
+    """检查已编码的指令, line_nums 为每条指令对应的源行号 (缺省为 PC + 1)"""
+    words = np.asarray(words, dtype=np.uint64)
+    n = len(words)
+    if line_nums is None:
+        line_nums = np.arange(1, n + 1)
+    issued, pcs = expand_loops(words)
+    fields = decode(issued)
+    issues = []
+
+    loops = np.flatnonzero(is_loop(words))
+    reserved = loops[(words[loops] & ~np.uint64(LOOP_DEFINED)) != 0]
+    issues += [Issue('warning', int(pc), int(line_nums[pc]), 'LOOP_RESERVED',
+                     f"循环指令的保留位 0x{int(words[pc]) & ~LOOP_DEFINED:X} 不为 0, 被 control_unit 忽略")
+               for pc in reserved]
+    if len(loops) and loops[0] == 0:
+        issues.append(Issue('warning', 0, int(line_nums[0]), 'LOOP_AT_ZERO', "第 0 条为循环指令, 只在 PC 回绕后执行"))
+
+    finish = np.flatnonzero(fields["finish"])
+    if len(finish) == 0:
+        issues.append(Issue('error', n, 0, 'NO_FINISH', "程序中没有 ins_finish, PC 会一直递增并回绕到 0"))
+        end = n
+        cycles = len(issued)
+    else:
+        end = int(pcs[finish[0]]) + 1
+        cycles = int(finish[0]) + 1
+        if end < n:
+            issues.append(Issue('warning', end, int(line_nums[end]), 'DEAD_CODE',
+                                f"第一条 finish (PC {end - 1}) 之后的 {n - end} 条指令不会被执行"))
+    if end > ICACHE_DEPTH:
+        issues.append(Issue('error', ICACHE_DEPTH, 0, 'TOO_LONG',
+                            f"执行到 finish 需要 {end} 条指令, 超出 instruction_cache 深度 {ICACHE_DEPTH}"))
+
+    f = {name: value[:cycles] for name, value in fields.items()}
+
+    # 阵列未使能时的权重 / 输入 / 翻转
+    used = (f["sa_weight_valid"] | f["sa_input_valid"] | f["sa_switch_weight"]).astype(bool)
+    issues += _issues('error', 'SA_DISABLED', np.flatnonzero(used & (f["sa_en_size"] == 0)), pcs, line_nums,
+                      lambda c: "sa_weight_valid / sa_input_valid / sa_switch_weight 有效但 sa_en_size 为 0")
+
+    # 翻转前的预加载行数: 自上一次翻转之后 (含本条) 的 sa_weight_valid 个数
+    switch = np.flatnonzero(f["sa_switch_weight"])
+    loaded = np.cumsum(f["sa_weight_valid"])
+    since = loaded[switch] - np.concatenate(([0], loaded[switch[:-1]]))
+    early = switch[since < ARRAY_ROWS]
+    count = dict(zip(switch.tolist(), since.tolist()))
+    issues += _issues('error', 'EARLY_SWITCH', early, pcs, line_nums,
+                      lambda c: f"sa_switch_weight 之前仅预加载了 {count[c]} 行权重 (需要 {ARRAY_ROWS} 行)")
+
+    # weight 读地址对齐
+    arrays = f["sa_arrays"]
+    misaligned = (f["sa_weight_valid"] == 1) & (arrays > 0) & (f["weight_rd_addr"] % np.maximum(arrays, 1) != 0)
+    issues += _issues('warning', 'WEIGHT_ALIGN', np.flatnonzero(misaligned), pcs, line_nums,
+                      lambda c: f"weight_rd_addr 0x{int(f['weight_rd_addr'][c]):03X} 不是阵列数 "
+                                 f"{int(arrays[c])} 的整数倍, 低位被忽略")
+
+    # VPU 写回地址对齐
+    wb_arrays = np.array([SIZE_ARRAYS[s] for s in range(4)])[f["VPU_en_size"]]
+    ignored = f["VPU_wr_addr"] & np.maximum(wb_arrays - 1, 0)
+    issues += _issues('warning', 'VPU_ALIGN', np.flatnonzero((f["ub_wr_VPU_en"] == 1) & (ignored != 0)), pcs, line_nums,
+                      lambda c: f"VPU_wr_addr 0x{int(f['VPU_wr_addr'][c]):03X} 写回 x{int(wb_arrays[c])} 时低位被忽略, "
+                                 f"实际写入 input_memory 第 {int(f['VPU_wr_addr'][c]) >> 2} 行")
+
+    return sorted(issues, key=lambda issue: (issue.pc, issue.code))
+
+def check_source(text, table=FIELD_TABLE):
+    """检查 ins_origin.txt 格式的源文本: 先检查字段位宽, 再按截断后的编码做其余检查"""
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    text, loops, loop_errors = split_loops(text, table)
+    parsed = parse_program(text)
+    line_nums, counts = parsed["line_nums"], parsed["counts"]
+    nfields = len(table)
+
+    wrong = np.flatnonzero(counts != nfields)
+    if len(wrong) or loop_errors:
+        return sorted([Issue('error', 0, line_num, 'SYNTAX', msg) for line_num, msg in loop_errors]
+                      + [Issue('error', int(i), int(line_nums[i]), 'SYNTAX',
+                               f"字段数量不正确 - 期望 {nfields} 个，实际 {int(counts[i])} 个") for i in wrong],
+                      key=lambda issue: issue.line)
+    values = parsed["values"].reshape(-1, nfields)
+    bad = parsed["bad"].reshape(-1, nfields)
+    issues = [Issue('error', int(i), int(line_nums[i]), 'SYNTAX', f"字段 {FIELD_NAMES[j]} 无法解析")
+              for i, j in zip(*np.nonzero(bad))]
+
+    overflow = (values > table.mask) & ~bad
+    issues += [Issue('error', int(i), int(line_nums[i]), 'FIELD_OVERFLOW',
+                     f"{FIELD_NAMES[j]} 的值 0x{int(values[i, j]):X} 超出 {int(table.width[j])} 位范围 "
+                     f"(最大 0x{int(table.mask[j]):X})")
+               for i, j in zip(*np.nonzero(overflow))]
+    words, line_nums = merge_loops(table.encode(values), line_nums, loops)
+    return sorted(issues + check_words(words, line_nums), key=lambda issue: (issue.pc, issue.code))
+
+def is_source(text):
+    """第一条非注释行为 16 个字段或 LOOP 行时视为 ins_origin.txt 格式的源文本"""
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith(b'#') and not line.startswith(b'//'):
+            return len(line.split()) == len(FIELD_TABLE) or line.split()[0].upper() == LOOP_KEYWORD.encode()
+    return False
+
+def check_file(input_file):
+    if input_file.endswith('.bin'):
+        return check_words(load_words(input_file))
+    with open(input_file, 'rb') as f:
+        text = f.read()
+    if is_source(text):
+        return check_source(text)
+    return check_words(load_words(input_file))
+
+def main():
+    parser = argparse.ArgumentParser(description="54 位指令静态检查")
+    parser.add_argument('input_files', nargs='+')
+    parser.add_argument('--quiet', action='store_true', help="只输出 error")
+    args = parser.parse_args()
+
+    failed = False
+    for input_file in args.input_files:
+        start = time.time()
+        try:
+            issues = check_file(input_file)
+        except (AssembleError, ValueError) as e:
+            issues = [Issue('error', 0, 0, 'SYNTAX', str(e))]
+        elapsed = (time.time() - start) * 1000
+
+        errors = [issue for issue in issues if issue.level == 'error']
+        failed |= bool(errors)
+        for issue in issues:
+            if args.quiet and issue.level != 'error':
+                continue
+            where = f"行 {issue.line} (PC {issue.pc})" if issue.line else f"PC {issue.pc}"
+            print(f"{input_file}: {where}: {issue.level}: [{issue.code}] {issue.msg}")
+        print(f"{input_file}: {len(errors)} error(s), {len(issues) - len(errors)} warning(s), {elapsed:.1f} ms")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
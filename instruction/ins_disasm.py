@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+'''
+指令反汇编: 按 control_unit.sv 的 decode 逻辑将 54 位指令还原为字段, 循环指令还原为 LOOP 行
+
+使用说明:
+    python3 ins_disasm.py <指令文件> [输出文件] [--verbose]
+    指令文件可以是 ins.txt ($readmemb), $readmemh 文本或 ins_asm.py 生成的 .bin
+    缺省输出与 ins_origin.txt 相同格式 (可直接再用 ins_convert.py / ins_asm.py 汇编),
+    --verbose 时每条指令输出一行可读的控制信号说明
+'''
+
+import argparse
+
+import numpy as np
+
+from ins_asm import (FIELD_TABLE, FIELD_NAMES, FIELD_INDEX, OP_LEN, ICACHE_DEPTH, LOOP_KEYWORD, load_words, is_loop,
+                     decode_loop)
+
+# finish_flag 置位后 control_unit 看到的指令
+FINISH_INSTRUCTION = 0x20_0000_0000_0000
+
+# ins_sa_en_size / ins_VPU_en_size -> 使能的阵列 (channel) 数
+SIZE_ARRAYS = {0: 0, 1: 1, 2: 2, 3: 4}
+VPU_MODES = {0: "hold", 1: "acc", 2: "load", 3: "out"}
+
+def decode(words):
+    """
+    (n,) 的 uint64 指令 -> dict: 字段名 -> (n,) 的 int64 数组, 以及 control_unit 中的派生信号
+    循环指令的 "loop" 为 1, 其字段无意义; 按拍分析前先用 ins_asm.expand_loops 展开
+    """
+    words = np.asarray(words, dtype=np.uint64)
+    values = FIELD_TABLE.decode(words & np.uint64((1 << OP_LEN) - 1)).astype(np.int64)
+    fields = {name: values[:, i] for i, name in enumerate(FIELD_NAMES)}
+    fields["loop"] = is_loop(words).astype(np.int64)
+
+    # control_unit 中的组合逻辑
+    sa_size = fields["sa_en_size"]
+    fields["sa_arrays"] = np.array([SIZE_ARRAYS[s] for s in range(4)])[sa_size]
+    fields["ub_rd_weight_size"] = np.where(fields["sa_weight_valid"] == 1, sa_size, 0)
+    fields["ub_wr_VPU_en"] = (fields["VPU_en_size"] != 0).astype(np.int64)
+    fields["sa_shift_en"] = (sa_size != 0).astype(np.int64)
+    return fields
+
+def source_lines(words, table=FIELD_TABLE):
+    """
+    反汇编为 ins_origin.txt 格式: 地址类字段为 0x 大写十六进制, 其余为定宽二进制, 以 tab 分隔;
+    循环指令为 "LOOP 条数 步长... [窗口]" (十进制, 窗口为 1 时省略)
+    """
+    values = table.decode(words)
+    formats = []
+    for field in table.fields:
+        width = field["width"]
+        if field["binary_digits"] is None:
+            formats.append(lambda v, d=(width + 3) // 4: f"0x{v:0{d}X}")
+        else:
+            formats.append(lambda v, w=width: f"{v:0{w}b}")
+    lines = ["\t".join(fmt(int(v)) for fmt, v in zip(formats, row)) for row in values]
+    for pc in np.flatnonzero(is_loop(words)).tolist():
+        count, strides, window = decode_loop(words[pc], table)
+        lines[pc] = "\t".join([LOOP_KEYWORD, str(count)] + [str(s) for s in strides]
+                              + ([str(window)] if window > 1 else []))
+    return lines
+
+def describe(fields, i):
+    """单条指令的可读说明, 只列出起作用的控制信号"""
+    if fields["loop"][i]:
+        count, strides, window = decode_loop(fields["word"][i])
+        steps = ", ".join(f"{name} {s:+d}" for name, s in zip(("IN", "WB", "W"), strides) if s)
+        body = "上一条" if window == 1 else f"最近 {window} 条"
+        return f"LOOP x{count}: 重复{body}" + (f" ({steps})" if steps else "")
+    parts = []
+    sa = int(fields["sa_arrays"][i])
+    if sa:
+        parts.append(f"SA x{sa}")
+    if fields["sa_weight_valid"][i]:
+        parts.append(f"W@0x{int(fields['weight_rd_addr'][i]):03X}")
+    if fields["sa_switch_weight"][i]:
+        parts.append("SWITCH")
+    if fields["sa_input_valid"][i]:
+        parts.append(f"IN@0x{int(fields['input_rd_addr'][i]):03X}")
+    mode = int(fields["vpu_mode_select"][i])
+    if mode:
+        parts.append(f"VPU {VPU_MODES[mode]}")
+    if fields["vpu_psum_clear"][i]:
+        parts.append("CLEAR")
+    if fields["ub_wr_VPU_en"][i]:
+        parts.append(f"WB@0x{int(fields['VPU_wr_addr'][i]):03X} x{SIZE_ARRAYS[int(fields['VPU_en_size'][i])]}")
+    if fields["vpu_bias_en"][i]:
+        parts.append(f"BIAS@{int(fields['bias_rd_addr'][i])}")
+    if fields["vpu_relu_en"][i]:
+        parts.append("RELU")
+    if fields["vpu_dequant_en"][i]:
+        parts.append(f"DEQUANT scale@{int(fields['scale_rd_addr'][i])}")
+    if fields["finish"][i]:
+        parts.append("FINISH")
+    return " | ".join(parts) if parts else "NOP"
+
+def verbose_lines(words):
+    fields = decode(words)
+    fields["word"] = np.asarray(words, dtype=np.uint64)
+    return [f"{pc:04d}: {describe(fields, pc)}" for pc in range(len(fields["finish"]))]
+
+def main():
+    parser = argparse.ArgumentParser(description="54 位指令反汇编")
+    parser.add_argument('input_file')
+    parser.add_argument('output_file', nargs='?')
+    parser.add_argument('--verbose', action='store_true', help="输出可读的控制信号说明")
+    args = parser.parse_args()
+
+    words = load_words(args.input_file)
+    if len(words) > ICACHE_DEPTH:
+        print(f"警告: 共 {len(words)} 条指令, 超出 instruction_cache 深度 {ICACHE_DEPTH}")
+    lines = verbose_lines(words) if args.verbose else source_lines(words)
+
+    if args.output_file:
+        with open(args.output_file, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"成功反汇编 {len(lines)} 条指令 -> {args.output_file}")
+    else:
+        print("\n".join(lines))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+'''
+GEMM 编译器: 按层的形状 (M x K) * (N x K)^T 生成 control_unit 指令流与配套的 UB 镜像
+
+使用说明:
+    python3 ins_gemm.py <输出目录> --m 16 --k 256 --n 64 [--input input_dec.txt] [--weight weight_dec.txt]
+                        [--bias bias_dec.txt] [--scale 0x3A973C75] [--relu] [--no-bias] [--no-dequant]
+                        [--in-base 0] [--w-base 0] [--out-base <自动>] [--bias-row 0] [--scale-row <自动>]
+                        [--k-split 1] [--psum-base 0] [--loop]
+    未给出矩阵文件时以 --seed 生成随机 int8 数据; 输出目录中生成:
+        ins_origin.txt / ins.txt                        指令 (源文本 / $readmemb)
+        input_hex.txt / weight_hex.txt / misc_hex.txt   UB 镜像
+        output_golden.txt / expect_imem.txt / regress.json  golden 结果, 供 sim/regress.py 比对
+
+调度 (均由 RTL 时序推出, 指令 i 在使能后第 i 拍执行, 第 0 条指令不会被执行):
+    - 一次 pass 计算 16 行 (psum cache 深度) x 至多 64 列 (4 个阵列): M 按 16 切块, N 按 16*A 切块
+    - K 按 16 切块, 每块 16 拍连续加载权重, 第 16 拍同时 sa_switch_weight;
+      该块的 16 行输入在首次加载后的第 17 ~ 32 拍送入, 与下一块的权重加载重叠, 阵列不停顿
+    - 最后一行输入送入后 31 拍, 第 15 列的结果才进入 psum cache, 故第 32 拍切换到 MODE_OUTPUT,
+      之后 16 拍逐行输出, bias/relu 与输出同拍, dequant 晚 1 拍, 写回再晚 1 拍
+    - psum cache 在输出期间不接收累加, 且需要 psum_clear, 相邻 pass 之间至少间隔 33 拍
+    - --k-split S 时 K 块分为 S 段, 段在最外层循环, 第 p 个 (N 块, M 块) 的 psum 暂存在 psum 区第 psum_base + 16p 行起:
+      非最后一段在输出的 16 拍保持 MODE_OUTPUT, 把 psum 存回 psum 区, 不做 bias / dequant / 写回;
+      非第一段以 MODE_LOAD 代替 psum_clear, 之后 16 拍从 psum 区加载 (地址为 VPU_wr_addr), 阵列相应晚 16 拍开始
+    - --loop 时按拍生成的指令流经 ins_asm.compress_loops 压缩为循环指令 (发出的指令逐拍不变),
+      K 块之间以 16 拍为窗口重复, instruction_cache 的深度只限制压缩后的指令数
+'''
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+from convert_input import pack_input_memory, image_to_hex_lines
+from convert_weight import pack_weight_memory, arrays_for_n
+from convert_misc import pack_misc_memory, parse_scale, MISC_DEPTH
+from golden import int8_gemm, vpu_postprocess, SCALE_FACTOR, save_matrix
+from ins_asm import (FIELD_TABLE, ICACHE_DEPTH, INPUT_DELAY, ARRAY_LATENCY, DRAIN_LATENCY, PIPE_LATENCY,
+                     to_readmemb_lines, compress_loops)
+from ins_disasm import FIELD_INDEX, source_lines
+
+TILE = 16               # 阵列行 / 列数, 也是 psum cache 的深度
+MAX_ARRAYS = 4
+INPUT_LINES = 256       # input_memory 深度 (每行 4 个 128 bit 地址)
+WEIGHT_LINES = 1024     # weight_memory 深度
+PSUM_LINES = 256        # psum 区深度 (每行为 psum cache 的一项)
+
+# 调度用的时序 (由 ins_asm 中与 RTL 一致的流水线时序导出)
+INPUT_START = TILE - 1 + INPUT_DELAY    # K 块首次加载权重后第 17 拍开始送入输入 (第 15 拍翻转)
+DRAIN_DELAY = DRAIN_LATENCY + 1         # 最后一行输入送入到切换 MODE_OUTPUT (第 15 列结果到达的下一拍)
+
+SIZE_CODE = {1: 0b01, 2: 0b10, 4: 0b11}
+MODE_ACCU, MODE_LOAD, MODE_OUTPUT = 0b01, 0b10, 0b11
+
+def plan_layout(m, k, n, in_base=0, w_base=0, out_base=None, bias_row=0, scale_row=None, k_split=1, psum_base=0):
+    """
+    计算切块与 UB 地址分配, 返回 dict
+    in_base / out_base 为 input_memory 的 128 bit 地址, w_base 为 weight 地址, 均需 4 对齐 (即从整行开始)
+    k_split 为 K 方向的分段数, 各段之间 psum 暂存在 psum 区第 psum_base 行起
+    """
+    arrays = arrays_for_n(n)
+    mp = -(-m // TILE) * TILE
+    kp = -(-k // TILE) * TILE
+    tile_n = arrays * TILE
+    nt = -(-n // tile_n)
+    layout = {
+        "m": m, "k": k, "n": n, "mp": mp, "kp": kp, "arrays": arrays,
+        "m_tiles": mp // TILE, "k_tiles": kp // TILE, "n_tiles": nt,
+        "in_base": in_base, "w_base": w_base, "bias_row": bias_row,
+        "k_split": k_split, "psum_base": psum_base,
+    }
+    in_lines = kp // TILE * mp // 4
+    layout["in_lines"] = in_lines
+    if out_base is None:
+        out_base = in_base + in_lines * 4
+    layout["out_base"] = out_base
+    # 每个输出行 (m) 占 A 个 128 bit 地址
+    layout["out_lines"] = -(-nt * mp * arrays // 4)
+    layout["w_lines"] = -(-nt * kp * arrays // 4)
+    layout["scale_row"] = bias_row + nt if scale_row is None else scale_row
+
+    for name in ("in_base", "w_base", "out_base"):
+        if layout[name] % 4:
+            raise ValueError(f"{name} must be a multiple of 4 (start of a 512-bit line), got {layout[name]}")
+    in_first, out_first = in_base // 4, out_base // 4
+    if in_first + in_lines > INPUT_LINES or out_first + layout["out_lines"] > INPUT_LINES:
+        raise ValueError("input / output do not fit in input_memory")
+    if in_first < out_first + layout["out_lines"] and out_first < in_first + in_lines:
+        raise ValueError("output region overlaps the input region")
+    if w_base // 4 + layout["w_lines"] > WEIGHT_LINES:
+        raise ValueError("weights do not fit in weight_memory")
+    if bias_row + nt > MISC_DEPTH or layout["scale_row"] >= MISC_DEPTH or \
+            bias_row <= layout["scale_row"] < bias_row + nt:
+        raise ValueError("bias / scale rows do not fit in misc_memory")
+    if not 1 <= k_split <= layout["k_tiles"]:
+        raise ValueError(f"k_split must be in 1..{layout['k_tiles']} (number of K tiles), got {k_split}")
+    if k_split > 1 and not 0 <= psum_base <= PSUM_LINES - nt * layout["m_tiles"] * TILE:
+        raise ValueError(f"{nt * layout['m_tiles']} passes x {TILE} psum rows from {psum_base} "
+                         f"do not fit in the psum region ({PSUM_LINES} rows)")
+    return layout
+
+class ProgramBuilder:
+    """按拍填写各字段, 同一拍同一字段被赋不同值时报错, 最后按字段表编码"""
+    def __init__(self):
+        self.values = {}
+
+    def set(self, cycle, field, value):
+        slot = self.values.setdefault(cycle, {})
+        idx = FIELD_INDEX[field]
+        if slot.get(idx, value) != value:
+            raise RuntimeError(f"cycle {cycle}: {field} set to both {slot[idx]} and {value}")
+        slot[idx] = value
+
+    def set_range(self, start, stop, field, value):
+        for cycle in range(start, stop):
+            self.set(cycle, field, value)
+
+    def encode(self, length):
+        table = np.zeros((length, len(FIELD_TABLE)), dtype=np.uint64)
+        for cycle, slot in self.values.items():
+            for idx, value in slot.items():
+                table[cycle, idx] = value
+        return FIELD_TABLE.encode(table)
+
+def compile_gemm(layout, bias=True, relu=False, dequant=True, loop=False):
+    """
+    生成指令流, 返回 (words, stats); words[0] 为 NOP (PC 0 不会被执行), loop 时压缩为循环指令
+    循环顺序: K 段 -> N 块 -> M 块 -> 段内的 K 块, 每个 (K 段, N 块, M 块) 为一次 pass
+    """
+    arrays, mp, kp = layout["arrays"], layout["mp"], layout["kp"]
+    size = SIZE_CODE[arrays]
+    prog = ProgramBuilder()
+    segments = np.array_split(np.arange(layout["k_tiles"]), layout["k_split"])
+
+    cycle = 1               # 当前 pass 首次加载权重的拍
+    clear = 1               # 当前 pass 的 psum_clear (或进入 MODE_LOAD) 所在拍
+    written = 0             # 上一个 pass 最后一次使用 VPU_wr_addr 写回 input 的拍
+    drains = []
+    for s, k_tiles in enumerate(segments):
+        for nt in range(layout["n_tiles"]):
+            for mt in range(layout["m_tiles"]):
+                psum_row = layout["psum_base"] + (nt * layout["m_tiles"] + mt) * TILE
+                if s == 0:
+                    prog.set(clear, "vpu_psum_clear", 1)
+                else:
+                    # 加载上一段存回的 psum: 进入 MODE_LOAD 后第 1 ~ 16 拍逐项加载, 须在上一个 pass 写回之后
+                    load = max(clear, written)
+                    prog.set(load, "vpu_mode_select", MODE_LOAD)
+                    for r in range(TILE):
+                        prog.set(load + 1 + r, "VPU_wr_addr", psum_row + r)
+                    cycle = load + TILE + 1 - ARRAY_LATENCY - INPUT_START
+
+                for i, kt in enumerate(k_tiles):
+                    load = cycle + i * TILE
+                    for r in range(TILE):
+                        slot = nt * kp + kt * TILE + r
+                        prog.set(load + r, "sa_weight_valid", 1)
+                        prog.set(load + r, "weight_rd_addr", layout["w_base"] + slot * arrays)
+                        prog.set(load + INPUT_START + r, "sa_input_valid", 1)
+                        prog.set(load + INPUT_START + r, "input_rd_addr",
+                                 layout["in_base"] + kt * mp + mt * TILE + r)
+                    prog.set(load + TILE - 1, "sa_switch_weight", 1)
+
+                last_input = cycle + len(k_tiles) * TILE + INPUT_START - 1
+                prog.set_range(cycle, last_input + DRAIN_DELAY, "sa_en_size", size)
+
+                # 输出: 切换 MODE_OUTPUT 后第 1 ~ 16 拍逐行输出, 再晚 2 拍写回
+                drain = last_input + DRAIN_DELAY
+                drains.append(drain)
+                prog.set(drain, "vpu_mode_select", MODE_OUTPUT)
+                stream = drain + 1
+                if s < len(segments) - 1:
+                    # 非最后一段: 逐项输出期间保持 MODE_OUTPUT, 第 r 项存回 psum 区, 不写回 input
+                    for r in range(TILE):
+                        prog.set(stream + r, "vpu_mode_select", MODE_OUTPUT)
+                        prog.set(stream + r, "VPU_wr_addr", psum_row + r)
+                    written = 0
+                else:
+                    for r in range(TILE):
+                        prog.set(stream + r, "bias_rd_addr", layout["bias_row"] + nt)
+                        prog.set(stream + r, "vpu_bias_en", int(bias))
+                        prog.set(stream + r, "vpu_relu_en", int(relu))
+                        prog.set(stream + r + 1, "scale_rd_addr", layout["scale_row"])
+                        prog.set(stream + r + 1, "vpu_dequant_en", int(dequant))
+                    # VPU_en_size 同时决定 bias 读出宽度, 输出期间即需有效, 最初两拍的写回会被随后覆盖
+                    row_addr = [layout["out_base"] + (nt * mp + mt * TILE + r) * arrays for r in range(TILE)]
+                    for c in range(stream, stream + TILE + PIPE_LATENCY):
+                        r = max(c - stream - PIPE_LATENCY, 0)
+                        prog.set(c, "VPU_en_size", size)
+                        prog.set(c, "VPU_wr_addr", row_addr[r])
+                    written = stream + TILE + PIPE_LATENCY - 1
+
+                # 下一个 pass: psum_clear 须在输出结束之后, 且早于第 0 列收到第一个有效结果 (输入送入后 16 拍)
+                clear = stream + TILE
+                cycle = clear + 1 - ARRAY_LATENCY - INPUT_START
+
+    last_write = drains[-1] + TILE + PIPE_LATENCY
+    finish = last_write + 1
+    length = finish + 1
+
+    # 除切换 MODE_OUTPUT / MODE_LOAD 与存回的拍外, vpu_mode_select 保持 MODE_ACCU (输出 / 加载期间须非 0)
+    for c in range(1, finish):
+        if prog.values.get(c, {}).get(FIELD_INDEX["vpu_mode_select"]) is None:
+            prog.set(c, "vpu_mode_select", MODE_ACCU)
+    prog.set(finish, "finish", 1)
+
+    words = prog.encode(length)
+    if loop:
+        words = compress_loops(words)
+    if len(words) > ICACHE_DEPTH:
+        raise ValueError(f"program needs {len(words)} instructions, instruction_cache holds {ICACHE_DEPTH}")
+
+    passes = layout["n_tiles"] * layout["m_tiles"]
+    input_cycles = passes * layout["k_tiles"] * TILE
+    stats = {
+        "instructions": len(words),
+        "cycles": length,
+        "passes": passes * len(segments),
+        "psum_spills": passes * (len(segments) - 1),
+        "input_cycles": input_cycles,
+        "input_utilization": input_cycles / (length - 1),
+        "pe_utilization": layout["m"] * layout["k"] * layout["n"] / ((length - 1) * arrays * TILE * TILE),
+    }
+    return words, stats
+
+def pack_images(a, w, layout, bias=None, scale=None):
+    """
+    按 layout 打包三块存储的镜像 ((lines, bytes) 的 uint8, 左侧为 MSB), 各自从 base 所在行开始
+    input 的 M 补齐到 16 的整数倍, 使每个 M 块在每个 K 块内连续
+    """
+    input_image = pack_input_memory(a, row_multiple=TILE)
+    weight_image = pack_weight_memory(w, layout["arrays"])
+    input_image = np.concatenate([np.zeros((layout["in_base"] // 4, input_image.shape[1]), np.uint8), input_image])
+    weight_image = np.concatenate([np.zeros((layout["w_base"] // 4, weight_image.shape[1]), np.uint8),
+                                   weight_image])
+    misc_image = pack_misc_memory(bias, scale, layout["bias_row"], layout["scale_row"], layout["arrays"])
+    return input_image, weight_image, misc_image
+
+def golden_output(a, w, layout, bias=None, relu=False, scale=None):
+    """
+    按补齐后的 M 计算 golden, 返回 (Mp, N) 的 int8 结果
+    补齐的行输入为 0, 但同样经过 bias / relu / dequant, 且 x1 / x2 时与有效行写在同一个 512 bit 行中
+    """
+    padded = np.zeros((layout["mp"], a.shape[1]), dtype=np.int64)
+    padded[:a.shape[0]] = a
+    return vpu_postprocess(int8_gemm(padded, w), bias, relu, scale)
+
+def output_slots(layout):
+    """输出矩阵每个元素在 input_memory 中的 (行, 行内 bit 偏移), 形状均为 (Mp, N 块数 * 16A)"""
+    arrays, mp = layout["arrays"], layout["mp"]
+    per_line = 4 // arrays
+    nt, m, c, j = np.meshgrid(np.arange(layout["n_tiles"]), np.arange(mp), np.arange(arrays), np.arange(TILE),
+                              indexing='ij')
+    r = nt * mp + m
+    line = layout["out_base"] // 4 + r // per_line
+    # VPU 写回: 第 c 个 channel 位于槽内 [(A-1-c)*128 +: 128], 列 j 位于 [j*8 +: 8]
+    offset = (r % per_line) * arrays * 128 + (arrays - 1 - c) * 128 + j * 8
+    order = (1, 0, 2, 3)    # -> (m, N 块, channel, 列)
+    return line.transpose(order).reshape(mp, -1), offset.transpose(order).reshape(mp, -1)
+
+def output_lines(result, layout):
+    """golden int8 结果 -> {input_memory 行号: 512 bit 值}, 只包含输出区域"""
+    line, offset = output_slots(layout)
+    padded = np.zeros(line.shape, dtype=np.int64)
+    padded[:result.shape[0], :result.shape[1]] = result
+    rows = {}
+    for l, o, v in zip(line.ravel(), offset.ravel(), padded.ravel()):
+        rows[int(l)] = rows.get(int(l), 0) | ((int(v) & 0xFF) << int(o))
+    return rows
+
+def unpack_output(memory_rows, layout):
+    """{行号: 512 bit 值} (如 regress.read_memh 读出的 dump) -> (M, N) 的 int8 结果"""
+    line, offset = output_slots(layout)
+    values = np.array([(memory_rows.get(int(l), 0) >> int(o)) & 0xFF for l, o in zip(line.ravel(), offset.ravel())],
+                      dtype=np.uint8).view(np.int8).reshape(line.shape)
+    return values[:layout["m"], :layout["n"]]
+
+def write_hex(image, output_file):
+    with open(output_file, 'w') as f:
+        f.write("\n".join(image_to_hex_lines(image)) + "\n")
+
+def read_matrix_file(path):
+    with open(path, 'r') as f:
+        rows = [[int(x) for x in line.split()] for line in f if line.strip()]
+    return np.array(rows, dtype=np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description="GEMM 指令 / UB 镜像编译器")
+    parser.add_argument('output_dir')
+    parser.add_argument('--m', type=int)
+    parser.add_argument('--k', type=int)
+    parser.add_argument('--n', type=int)
+    parser.add_argument('--input', help="M x K 十进制 int8 矩阵")
+    parser.add_argument('--weight', help="N x K 十进制 int8 矩阵")
+    parser.add_argument('--bias', help="N 个十进制 int32")
+    parser.add_argument('--scale', default=None, help=f"fp32 scale, 缺省为 {SCALE_FACTOR}")
+    parser.add_argument('--seed', type=int, default=0, help="未给出矩阵时随机数据的种子")
+    parser.add_argument('--relu', action='store_true')
+    parser.add_argument('--no-bias', action='store_true')
+    parser.add_argument('--no-dequant', action='store_true')
+    parser.add_argument('--in-base', type=int, default=0)
+    parser.add_argument('--w-base', type=int, default=0)
+    parser.add_argument('--out-base', type=int, default=None)
+    parser.add_argument('--bias-row', type=int, default=0)
+    parser.add_argument('--scale-row', type=int, default=None)
+    parser.add_argument('--k-split', type=int, default=1, help="K 方向分段数, 段间 psum 经 psum 区存回 / 加载")
+    parser.add_argument('--psum-base', type=int, default=0, help="psum 区的起始行")
+    parser.add_argument('--loop', action='store_true', help="压缩为循环指令")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    a = read_matrix_file(args.input) if args.input else rng.integers(-128, 128, (args.m, args.k))
+    w = read_matrix_file(args.weight) if args.weight else rng.integers(-128, 128, (args.n, a.shape[1]))
+    m, k = a.shape
+    n = w.shape[0]
+    if w.shape[1] != k:
+        raise SystemExit(f"K mismatch: input {a.shape}, weight {w.shape}")
+    use_bias = not args.no_bias
+    bias = None
+    if use_bias:
+        bias = read_matrix_file(args.bias).reshape(-1) if args.bias else rng.integers(-4096, 4096, n)
+    scale = parse_scale(args.scale) if args.scale else SCALE_FACTOR
+    if args.no_dequant:
+        scale_out = None
+    else:
+        scale_out = scale
+
+    layout = plan_layout(m, k, n, args.in_base, args.w_base, args.out_base, args.bias_row, args.scale_row,
+                         args.k_split, args.psum_base)
+    words, stats = compile_gemm(layout, bias=use_bias, relu=args.relu, dequant=not args.no_dequant, loop=args.loop)
+    input_image, weight_image, misc_image = pack_images(a, w, layout, bias, scale)
+    padded_result = golden_output(a, w, layout, bias, args.relu, scale_out)
+    result = padded_result[:m]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    out = lambda name: os.path.join(args.output_dir, name)
+    with open(out('ins_origin.txt'), 'w') as f:
+        f.write("\n".join(source_lines(words)) + "\n")
+    with open(out('ins.txt'), 'w') as f:
+        f.write("\n".join(to_readmemb_lines(words)) + "\n")
+    write_hex(input_image, out('input_hex.txt'))
+    write_hex(weight_image, out('weight_hex.txt'))
+    write_hex(misc_image, out('misc_hex.txt'))
+    save_matrix(result, out('output_golden.txt'))
+    with open(out('expect_imem.txt'), 'w') as f:
+        f.write(f"// GEMM M={m} K={k} N={n}: 输出区域 input_memory[{layout['out_base'] // 4}:]\n")
+        for line, value in sorted(output_lines(padded_result, layout).items()):
+            f.write(f"@{line:x}\n{value:0128x}\n")
+    with open(out('regress.json'), 'w') as f:
+        json.dump({"cases": [{
+            "name": os.path.basename(os.path.normpath(args.output_dir)),
+            "input": "input_hex.txt", "weight": "weight_hex.txt", "misc": "misc_hex.txt",
+            "ins": "ins.txt", "expect": "expect_imem.txt",
+        }]}, f, indent=4)
+        f.write("\n")
+
+    print(f"GEMM M={m} K={k} N={n}: {layout['m_tiles']} x {layout['k_tiles']} x {layout['n_tiles']} 块 "
+          f"(M x K x N), {layout['arrays']} 个阵列")
+    print(f"指令数: {stats['instructions']} ({stats['cycles']} 拍), pass 数: {stats['passes']} (psum 存回 {stats['psum_spills']} 次), "
+          f"输入流利用率: {stats['input_utilization']:.1%}, PE 利用率: {stats['pe_utilization']:.1%}")
+    print(f"输出位于 input_memory 第 {layout['out_base'] // 4} ~ "
+          f"{layout['out_base'] // 4 + layout['out_lines'] - 1} 行, 已写入 {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+'''
+指令静态性能分析: 不做仿真, 由指令流直接算出总拍数、各阵列 MAC 利用率、空泡拍数与分阶段统计
+
+使用说明:
+    python3 ins_perf.py <指令文件> [<指令文件> ...] [--json] [--timeline]
+    指令文件可以是 ins.txt ($readmemb), $readmemh 文本, .bin 或 ins_origin.txt 格式的源文本 (先汇编); --json 输出可供调度搜索读取的结果,
+    --timeline 按阶段列出连续的拍段
+    在脚本中可直接调用 analyze_words(words) (单个程序约几百微秒), 例如对 ins_gemm.compile_gemm 的输出打分
+
+时序 (与 RTL / sim/tpu_model.py 一致, 指令流没有跳转):
+    - 使能后第 0 拍 icache 读使能尚未置位 (NOP), 第 c 拍执行第 c 条指令, 总拍数 = 第一条 finish 的 PC + 1;
+      finish 在下一拍写入 status_reg, AXI 读 FINISH 寄存器再晚 1 拍返回
+      (含循环指令时先按发射顺序展开, 以上 "第 c 条" 均指展开后的指令)
+    - sa_switch_weight 在第 s 拍时, 新权重沿 col_new_weight 斜向生效, 第 s + 2 拍起送入的输入使用新权重
+    - rearranger 把第 r 行输入延迟 r 拍, 输入送入后第 16 拍第 0 列结果进入 psum cache, 第 15 列再晚 15 拍
+    - psum cache 深度 BATCH_SIZE = 16, 每次 MODE_OUTPUT 逐项输出 16 拍, 经两级 pipe_register 后写回
+
+阶段 (每拍只归入一个, 按以下优先级):
+    startup    第 0 拍 (icache 读使能)
+    compute    有 sa_input_valid, 阵列在做 MAC
+    preload    只加载权重 (没有与计算重叠的预加载)
+    array      最后一行输入仍在阵列中斜向传播 (rearranger 斜移 + 阵列排空, 至多 31 拍)
+    vpu        psum cache 逐项输出 / pipe_register / 写回
+    idle       其余的拍
+'''
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from ins_asm import (ARRAY_ROWS, INPUT_DELAY, DRAIN_LATENCY, PIPE_LATENCY, STATUS_LATENCY, assemble_text,
+                     load_words, cycle_fields)
+from ins_check import is_source
+from ins_disasm import SIZE_ARRAYS
+
+ARRAYS = 4
+MACS_PER_ROW = ARRAY_ROWS * ARRAY_ROWS     # 一行输入在一个阵列中的乘加次数
+BATCH_SIZE = 16                             # psum cache 深度
+
+MODE_ACCU, MODE_LOAD, MODE_OUTPUT = 1, 2, 3
+PHASES = ["startup", "compute", "preload", "array", "vpu", "idle"]
+
+SIZES = np.array([SIZE_ARRAYS[s] for s in range(4)])
+
+def psum_drains(mode_select, psum_clear):
+    """
+    vpe_psum_cache 的输出 / 加载序列: 返回 (draining, reads)
+    draining 为 psum cache 处于 MODE_LOAD / MODE_OUTPUT 的拍, reads 为 MODE_OUTPUT 逐项输出的拍
+    """
+    n = len(mode_select)
+    clear = psum_clear == 1
+    clears = np.flatnonzero(clear)
+    enter = np.flatnonzero(((mode_select == MODE_LOAD) | (mode_select == MODE_OUTPUT)) & ~clear)
+    steps = np.flatnonzero((mode_select != 0) & ~clear)
+    draining = np.zeros(n, dtype=bool)
+    reads = []
+
+    pos = 0
+    while True:
+        k = np.searchsorted(enter, pos)
+        if k == len(enter):
+            break
+        e = int(enter[k])
+        limit = clears[np.searchsorted(clears, e + 1):][:1]
+        limit = int(limit[0]) if len(limit) else n
+        seq = steps[np.searchsorted(steps, e + 1):][:BATCH_SIZE]
+        seq = seq[seq < limit]
+        if mode_select[e] == MODE_OUTPUT:
+            reads.append(seq)
+        last = int(seq[-1]) if len(seq) == BATCH_SIZE else limit
+        draining[e:last + 1] = True
+        pos = last + 1
+
+    reads = np.concatenate(reads).astype(np.int64) if reads else np.zeros(0, dtype=np.int64)
+    return draining, reads
+
+def analyze_words(words):
+    """静态分析已编码的指令, 返回 dict (可直接 json.dump)"""
+    f = cycle_fields(words)
+    n = len(f["finish"])
+    cycle = np.arange(n)
+    arrays = SIZES[f["sa_en_size"]]
+    in_valid = f["sa_input_valid"] == 1
+    w_valid = f["sa_weight_valid"] == 1
+    inputs = np.flatnonzero(in_valid)
+
+    # 权重块: 每行输入使用第 t - 2 拍及之前最近一次翻转的权重, 之前没有翻转的输入乘的是复位后的 0
+    switches = np.flatnonzero(f["sa_switch_weight"])
+    has_tile = np.searchsorted(switches, inputs - INPUT_DELAY, side='right') > 0
+
+    # 每个阵列的有效 MAC: 阵列使能且已有权重块的输入行
+    enabled = cycle_arrays(arrays)
+    rows = (enabled[:, inputs] & has_tile).sum(axis=1)
+    macs = rows * MACS_PER_ROW
+    bubbles = enabled.sum(axis=1) - enabled[:, inputs].sum(axis=1)
+
+    # psum cache 的逐项输出
+    draining, reads = psum_drains(f["vpu_mode_select"], f["vpu_psum_clear"])
+
+    # 每拍的阶段
+    issued = np.concatenate(([0], np.cumsum(in_valid)))
+    in_array = issued[cycle] > issued[np.maximum(cycle - DRAIN_LATENCY, 0)]     # 前 31 拍内送入过输入
+    pipe = np.zeros(n, dtype=bool)
+    for lag in range(1, PIPE_LATENCY + 1):
+        pipe[reads[reads + lag < n] + lag] = True
+    vpu = draining | pipe | (f["VPU_en_size"] != 0)
+
+    phase = np.full(n, len(PHASES) - 1, dtype=np.int64)
+    for i, busy in reversed(list(enumerate([cycle == 0, in_valid, w_valid, in_array, vpu]))):
+        phase[busy] = i
+    counts = np.bincount(phase, minlength=len(PHASES))
+
+    peak = n * ARRAYS * MACS_PER_ROW
+    return {
+        "cycles": n,
+        "finish_visible": n + STATUS_LATENCY,
+        "input_rows": len(inputs),
+        "rows_without_tile": int((~has_tile).sum()),
+        "weight_tiles": len(switches),
+        "weight_loads": int(w_valid.sum()),
+        "overlapped_preload": int((w_valid & in_valid).sum()),
+        "exposed_preload": int((w_valid & ~in_valid).sum()),
+        "psum_drains": len(reads) // BATCH_SIZE,
+        "writebacks": int((f["VPU_en_size"] != 0).sum()),
+        "mac_ops": int(macs.sum()),
+        "utilization": float(macs.sum() / peak),
+        "array_macs": macs.tolist(),
+        "array_utilization": (macs / (n * MACS_PER_ROW)).tolist(),
+        "array_enabled": enabled.sum(axis=1).tolist(),
+        "array_bubbles": bubbles.tolist(),
+        "phases": dict(zip(PHASES, counts.tolist())),
+        "phase": phase,
+    }
+
+def cycle_arrays(arrays):
+    """(ARRAYS, n): 第 a 个阵列在第 c 拍是否使能 (sa_en_size 对应的阵列数 > a)"""
+    return np.arange(ARRAYS)[:, None] < arrays[None, :]
+
+def timeline(phase):
+    """连续相同阶段的拍段: [(阶段, 起始拍, 结束拍), ...]"""
+    change = np.flatnonzero(np.diff(phase)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change - 1, [len(phase) - 1]))
+    return [(PHASES[phase[s]], int(s), int(e)) for s, e in zip(starts, ends)]
+
+def report_lines(r):
+    n = r["cycles"]
+    lines = [
+        f"总拍数 {n} (finish 在第 {r['finish_visible']} 拍对 AXI 可见), 输入 {r['input_rows']} 行, "
+        f"权重块 {r['weight_tiles']} 个, psum 输出 {r['psum_drains']} 次, 写回 {r['writebacks']} 拍",
+        f"MAC 利用率 {r['utilization'] * 100:.1f}% ({r['mac_ops']} / {n * ARRAYS * MACS_PER_ROW})",
+    ]
+    for a in range(ARRAYS):
+        lines.append(f"  阵列 {a}: 利用率 {r['array_utilization'][a] * 100:5.1f}%, 使能 {r['array_enabled'][a]} 拍, "
+                     f"空泡 {r['array_bubbles'][a]} 拍")
+    lines.append("阶段: " + ", ".join(f"{name} {count} ({count * 100 / n:.1f}%)"
+                                     for name, count in r["phases"].items()))
+    lines.append(f"权重加载 {r['weight_loads']} 拍 (与计算重叠 {r['overlapped_preload']}, "
+                 f"未重叠 {r['exposed_preload']})")
+    if r["rows_without_tile"]:
+        lines.append(f"警告: {r['rows_without_tile']} 行输入之前没有 sa_switch_weight, 权重为 0")
+    return lines
+
+def load_program(input_file):
+    """读取指令文件, ins_origin.txt 格式的源文本 (判断方式同 ins_check) 先经汇编器编码"""
+    if not input_file.endswith('.bin'):
+        with open(input_file, 'rb') as f:
+            text = f.read()
+        if is_source(text):
+            return assemble_text(text)
+    return load_words(input_file)
+
+def main():
+    parser = argparse.ArgumentParser(description="54 位指令静态性能分析")
+    parser.add_argument('input_files', nargs='+')
+    parser.add_argument('--json', action='store_true', help="以 json 输出")
+    parser.add_argument('--timeline', action='store_true', help="列出各阶段的拍段")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for input_file in args.input_files:
+        try:
+            words = load_program(input_file)
+            start = time.time()
+            r = analyze_words(words)
+        except (OSError, ValueError) as e:
+            print(f"{input_file}: error: {e}", file=sys.stderr)
+            failed = True
+            continue
+        elapsed = (time.time() - start) * 1e6
+        phase = r.pop("phase")
+        if args.json:
+            if args.timeline:
+                r["timeline"] = timeline(phase)
+            results[input_file] = r
+            continue
+        print(f"{input_file}: ({elapsed:.0f} us)")
+        for line in report_lines(r):
+            print("  " + line)
+        if args.timeline:
+            for name, s, e in timeline(phase):
+                print(f"    {s:5d} - {e:5d}  {name:<8} {e - s + 1} 拍")
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
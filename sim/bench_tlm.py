@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''
+事务级模型的速度基准: 用 ins_gemm 编译带循环指令的长 GEMM 程序, 分别在逐拍模型与 tpu_tlm.py 上运行,
+核对 input_memory / psum_memory 逐位一致并记录加速比
+
+使用说明:
+    python3 bench_tlm.py [--case M K N K_SPLIT ...] [--repeat 5] [--seed 0] [--out bench.json]
+    缺省的三组为 input_memory 能容纳的最长一类 GEMM (单个程序约 1.2k ~ 2.3k 拍);
+    cold 为新程序首次运行 (含按拍展开与静态分析), warm 为同一程序换数据重复运行 (复用缓存的分析结果),
+    均包含模型构造与加载镜像, 各模型取 --repeat 次中最快的一次; --out 时把结果写成 JSON (缺省不写文件)
+'''
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import tpu_tlm
+from tpu_model import TPUModel
+from tpu_tlm import TransactionModel
+from ins_gemm import plan_layout, compile_gemm, pack_images
+
+DEFAULT_CASES = [(32, 256, 128, 1), (32, 256, 256, 1), (16, 256, 256, 4)]
+
+def build_case(m, k, n, k_split, rng):
+    """随机数据的 GEMM -> (指令字, 统计, 三个存储镜像)"""
+    layout = plan_layout(m, k, n, k_split=k_split)
+    a = rng.integers(-128, 128, (m, k))
+    w = rng.integers(-128, 128, (n, k))
+    bias = rng.integers(-4096, 4096, n)
+    words, stats = compile_gemm(layout, bias=True, relu=True, dequant=False, loop=True)
+    return words, stats, pack_images(a, w, layout, bias)
+
+def run_once(cls, words, images):
+    """构造模型, 加载镜像与指令并运行, 返回 (模型, 秒)"""
+    start = time.perf_counter()
+    model = cls()
+    for memory, image in zip((model.input_memory, model.weight_memory, model.misc_memory), images):
+        memory[:len(image)] = image
+    model.load_instructions(words)
+    model.reset()
+    model.run()
+    return model, time.perf_counter() - start
+
+def bench_case(m, k, n, k_split, repeat, rng):
+    words, stats, images = build_case(m, k, n, k_split, rng)
+    t_cycle = t_cold = t_warm = float('inf')
+    for _ in range(repeat):
+        ref, t = run_once(TPUModel, words, images)
+        t_cycle = min(t_cycle, t)
+    for _ in range(repeat):
+        tpu_tlm.PLAN_CACHE.clear()
+        _, t = run_once(TransactionModel, words, images)
+        t_cold = min(t_cold, t)
+    for _ in range(repeat):
+        fast, t = run_once(TransactionModel, words, images)
+        t_warm = min(t_warm, t)
+    match = bool(np.array_equal(fast.input_memory, ref.input_memory)
+                 and np.array_equal(fast.psum_memory, ref.psum_memory))
+    return {
+        "case": f"{m}x{k}x{n}" + (f" k_split={k_split}" if k_split > 1 else ""),
+        "cycles": int(stats["cycles"]), "cycle_s": t_cycle, "cold_s": t_cold, "warm_s": t_warm,
+        "cold_speedup": t_cycle / t_cold, "warm_speedup": t_cycle / t_warm, "match": match,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='tpu_tlm.py 相对逐拍模型的速度基准')
+    parser.add_argument('--case', nargs=4, type=int, action='append', metavar=('M', 'K', 'N', 'K_SPLIT'),
+                        help='GEMM 尺寸与 K 方向分段数, 可重复给出 (缺省为三组长程序)')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模型的重复次数, 取最快一次')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='结果 JSON 文件')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = [bench_case(*case, max(args.repeat, 1), rng) for case in (args.case or DEFAULT_CASES)]
+
+    print(f"{'case':<22}{'cycles':>8}{'cycle ms':>11}{'cold ms':>10}{'warm ms':>10}{'cold x':>9}{'warm x':>9}  match")
+    for r in results:
+        print(f"{r['case']:<22}{r['cycles']:>8}{r['cycle_s'] * 1e3:>11.1f}{r['cold_s'] * 1e3:>10.2f}"
+              f"{r['warm_s'] * 1e3:>10.2f}{r['cold_speedup']:>9.1f}{r['warm_speedup']:>9.1f}  {r['match']}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    if not all(r['match'] for r in results):
+        print("FAIL: tpu_tlm.py 与逐拍模型的结果不一致")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+'''
+批量回归: simv 只编译一次 (+define+LOAD_TXT), 每组数据通过 plusarg 选择存储镜像并行仿真
+
+使用说明:
+    python3 regress.py [manifest.json] [--simv ./simv] [--compile] [-j 4] [--only name ...] [--model | --fast]
+                       [--out regress_out]
+    --model 时不调用 simv, 改用 tpu_model.py 的逐拍模型运行 (plusargs 被忽略)
+    --fast 时改用 tpu_tlm.py 的事务级快速模型, 超出其约定的程序报 ERROR
+
+manifest 格式 (路径相对于 manifest 文件所在目录):
+    {
+        "cases": [
+            {
+                "name":   "layer1",
+                "input":  "../data/input_hex.txt",      -> +INPUT_HEX
+                "weight": "../data/weight_hex.txt",     -> +WEIGHT_HEX
+                "misc":   "../data/misc_hex.txt",       -> +MISC_HEX
+                "ins":    "../instruction/ins.txt",     -> +INS_BIN ($readmemb), 或用 "ins_hex" -> +INS_HEX
+                "expect": "../data/layer1_imem_expect.txt",
+                "plusargs": ["+ANY_OTHER=1"]
+            }
+        ]
+    }
+    未给出的镜像使用 RTL 中的缺省文件; expect 为 $readmemh 格式, 可用 @addr 只列出需要比对的行
+    每组数据在 <--out>/<name>/ 下运行 (缺省为 sim/regress_out), 仿真结束后由 tb 的 +DUMP_IMEM 导出 input_memory 与 expect 比对
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(SIM_DIR, 'regress_out')
+DUMP_FILE = 'imem_dump.txt'
+
+# manifest 中的镜像字段 -> plusarg 名
+IMAGE_PLUSARGS = {
+    'input':   'INPUT_HEX',
+    'weight':  'WEIGHT_HEX',
+    'misc':    'MISC_HEX',
+    'ins':     'INS_BIN',
+    'ins_hex': 'INS_HEX',
+}
+
+# RTL 中的缺省镜像路径相对于 sim/, 而每组数据在 regress_out/<name>/ 下运行, 故未给出时显式传入绝对路径
+# (misc_memory 的缺省内容写在 RTL 中, 无需文件)
+DEFAULT_IMAGES = {
+    'input':  os.path.join(SIM_DIR, '..', 'data', 'input_hex.txt'),
+    'weight': os.path.join(SIM_DIR, '..', 'data', 'weight_hex.txt'),
+    'ins':    os.path.join(SIM_DIR, '..', 'instruction', 'ins.txt'),
+}
+
+def read_memh(path):
+    """
+    读取 $readmemh / $writememh 格式文件, 返回 {地址: 值}
+    支持 // 注释与 @addr 跳转, 含 x / z 的值按小写字符串保存
+    """
+    rows = {}
+    addr = 0
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('//', 1)[0]
+            for token in line.split():
+                if token.startswith('@'):
+                    addr = int(token[1:], 16)
+                    continue
+                token = token.replace('_', '').lower()
+                try:
+                    rows[addr] = int(token, 16)
+                except ValueError:
+                    rows[addr] = token
+                addr += 1
+    return rows
+
+def compare_memh(dump_file, expect_file):
+    """只比对 expect 中列出的行, 返回不一致的 (地址, 期望, 实际) 列表"""
+    actual = read_memh(dump_file)
+    mismatches = []
+    for addr, value in sorted(read_memh(expect_file).items()):
+        if actual.get(addr) != value:
+            mismatches.append((addr, value, actual.get(addr)))
+    return mismatches
+
+def load_manifest(manifest_file):
+    with open(manifest_file, 'r') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(manifest_file))
+
+    cases = []
+    for case in manifest['cases']:
+        case = dict(case)
+        for key in list(IMAGE_PLUSARGS) + ['expect']:
+            if case.get(key):
+                case[key] = os.path.normpath(os.path.join(base, case[key]))
+        for key, path in DEFAULT_IMAGES.items():
+            if not case.get(key) and not (key == 'ins' and case.get('ins_hex')):
+                case[key] = os.path.normpath(path)
+        cases.append(case)
+    return cases
+
+def case_plusargs(case, work_dir):
+    args = [f"+{plusarg}={case[key]}" for key, plusarg in IMAGE_PLUSARGS.items() if case.get(key)]
+    args.append(f"+DUMP_IMEM={os.path.join(work_dir, DUMP_FILE)}")
+    args.append("+NO_WAVE")
+    args.extend(case.get('plusargs', []))
+    return args
+
+def run_case(simv, case, timeout, out_dir=OUT_DIR):
+    """在 out_dir 下的独立目录中运行一组数据, 返回结果 dict"""
+    name = case['name']
+    work_dir = os.path.join(out_dir, name)
+    os.makedirs(work_dir, exist_ok=True)
+
+    missing = [case[key] for key in list(IMAGE_PLUSARGS) + ['expect']
+               if case.get(key) and not os.path.exists(case[key])]
+    if missing:
+        return {"name": name, "status": "ERROR", "detail": f"missing file: {', '.join(missing)}", "time": 0.0}
+
+    dump_file = os.path.join(work_dir, DUMP_FILE)
+    if os.path.exists(dump_file):
+        os.remove(dump_file)
+
+    cmd = [simv, '-l', os.path.join(work_dir, 'sim.log')] + case_plusargs(case, work_dir)
+    start = time.time()
+    try:
+        proc = subprocess.run(cmd, cwd=work_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"name": name, "status": "TIMEOUT", "detail": f"> {timeout}s", "time": time.time() - start}
+    elapsed = time.time() - start
+
+    with open(os.path.join(work_dir, 'stdout.log'), 'wb') as f:
+        f.write(proc.stdout)
+
+    if proc.returncode != 0:
+        return {"name": name, "status": "ERROR", "detail": f"simv exit code {proc.returncode}", "time": elapsed}
+    return check_dump(case, dump_file, elapsed)
+
+def run_model_case(case, max_cycles, fast=False, out_dir=OUT_DIR):
+    """用逐拍模型 (fast 时为事务级模型) 运行一组数据, 导出与 simv 相同格式的 dump 后按同样的规则比对"""
+    from tpu_model import TPUModel, run_images
+    if fast:
+        from tpu_tlm import TransactionModel
+
+    name = case['name']
+    work_dir = os.path.join(out_dir, name)
+    os.makedirs(work_dir, exist_ok=True)
+    dump_file = os.path.join(work_dir, DUMP_FILE)
+    if os.path.exists(dump_file):
+        os.remove(dump_file)
+
+    start = time.time()
+    try:
+        model, _ = run_images(case.get('input'), case.get('weight'), case.get('misc'),
+                              case.get('ins') or case.get('ins_hex'), max_cycles,
+                              TransactionModel if fast else TPUModel)
+    except (OSError, ValueError) as e:
+        return {"name": name, "status": "ERROR", "detail": str(e), "time": time.time() - start}
+    except TimeoutError as e:
+        return {"name": name, "status": "TIMEOUT", "detail": str(e), "time": time.time() - start}
+    model.dump_input_memory(dump_file)
+    return check_dump(case, dump_file, time.time() - start)
+
+def check_dump(case, dump_file, elapsed):
+    name = case['name']
+    if not os.path.exists(dump_file):
+        return {"name": name, "status": "ERROR", "detail": "no input_memory dump (finish flag not reached?)",
+                "time": elapsed}
+    if not case.get('expect'):
+        return {"name": name, "status": "DONE", "detail": "no expect file", "time": elapsed}
+
+    mismatches = compare_memh(dump_file, case['expect'])
+    if mismatches:
+        addr, expect, actual = mismatches[0]
+        fmt = lambda v: f"{v:x}" if isinstance(v, int) else str(v)
+        detail = f"{len(mismatches)} row(s) mismatch, first @{addr:x}: expect {fmt(expect)}, got {fmt(actual)}"
+        return {"name": name, "status": "FAIL", "detail": detail, "time": elapsed}
+    return {"name": name, "status": "PASS", "detail": "", "time": elapsed}
+
+def compile_simv():
+    print("--- Compiling simv (make comp) ---")
+    subprocess.run(['make', '-C', SIM_DIR, 'comp'], check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="TPU 多数据集批量回归 (simv 只编译一次)")
+    parser.add_argument('manifest', nargs='?', default=os.path.join(SIM_DIR, 'regress.json'))
+    parser.add_argument('--simv', default=os.path.join(SIM_DIR, 'simv'), help="已编译的仿真可执行文件")
+    parser.add_argument('--compile', action='store_true', help="运行前先 make comp")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--timeout', type=float, default=600.0, help="单组数据的超时时间 (秒)")
+    parser.add_argument('--only', nargs='+', help="只运行指定名字的数据组")
+    parser.add_argument('--model', action='store_true', help="用 tpu_model.py 的逐拍模型代替 simv")
+    parser.add_argument('--fast', action='store_true', help="用 tpu_tlm.py 的事务级模型代替 simv")
+    parser.add_argument('--max-cycles', type=int, default=200000, help="--model / --fast 时单组数据的最大拍数")
+    parser.add_argument('--out', default=OUT_DIR, help="各组数据的运行目录与 summary.json 的输出位置")
+    args = parser.parse_args()
+
+    simv = os.path.abspath(args.simv)
+    out_dir = os.path.abspath(args.out)
+    if args.model or args.fast:
+        run = lambda case: run_model_case(case, args.max_cycles, args.fast, out_dir)
+    else:
+        if args.compile or not os.path.exists(simv):
+            compile_simv()
+        run = lambda case: run_case(simv, case, args.timeout, out_dir)
+
+    cases = load_manifest(args.manifest)
+    if args.only:
+        cases = [case for case in cases if case['name'] in args.only]
+    print(f"--- Running {len(cases)} case(s) with {args.jobs} job(s) ---")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = list(pool.map(run, cases))
+    elapsed = time.time() - start
+
+    for r in results:
+        print(f"{r['status']:<8} {r['name']:<24} {r['time']:7.2f}s  {r['detail']}")
+    failed = [r for r in results if r['status'] not in ('PASS', 'DONE')]
+    print(f"--- {len(results) - len(failed)}/{len(results)} passed, total {elapsed:.2f}s ---")
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
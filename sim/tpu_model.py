@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+'''
+tpu.sv 的逐拍 NumPy 模型: 与 RTL 逐位一致, 每拍以数组运算更新全部 4 x 16 x 16 个 PE
+
+使用说明:
+    python3 tpu_model.py [--input input_hex.txt] [--weight weight_hex.txt] [--misc misc_hex.txt]
+                         [--ins ins.txt | --ins-hex ins_hex.txt] [--dump imem_dump.txt]
+                         [--expect expect.txt] [--max-cycles 200000]
+    未给出的镜像与 RTL (+define+LOAD_TXT) 的缺省相同; 模型从 EN 寄存器置 1 的那一拍开始运行,
+    到 finish_flag 置位为止, --dump 以 $writememh 格式导出 input_memory, 可直接与 regress.py 的 expect 比对
+
+建模范围 (AXI 接口不建模, 存储通过镜像直接加载; 运行期间的主机访问只建模写入 input bank / psum 区与
+VPU 写回 / psum 存回的冲突, 见 run_with_host_writes):
+    control_unit         PC / icache 读使能寄存器, finish 之后的 FINISH 指令,
+                         循环指令 (最近 LOOP_WINDOW 拍发出的指令与当前循环指令已发出的条数)
+    status_reg           作业队列: 作业 finish 的同拍从下一个作业的入口 PC 开始 (见 launch / run_queue);
+                         input_bank: 阵列读出与 VPU 写回使用的 input bank (REG_BANK)
+    unified_buffer       input (两个 bank: input_memory / input_memory_b1) / weight / misc 存储, 按 size 的读出与 VPU 写回;
+                         psum 区 (psum_memory): MODE_OUTPUT 逐项输出且 mode_select 为 MODE_OUTPUT 时存回,
+                         MODE_LOAD 时加载, 行地址为 VPU_wr_addr 的低 8 位;
+                         AXI 写入与 VPU 写回同拍访问同一 input bank, 或写 psum 区与 psum 存回同拍时
+                         AXI 写入被反压 (axi_wready = 0) 并计入 ub_conflicts
+    rearranger           输入与 4 个权重的 0 ~ 15 拍 FIFO (只在 load_en 时写入队尾, shift_en 时移位)
+    systolic_array       4 个 16 x 16 阵列, PE 的前 / 后台权重, col_new_weight, sa_enable 为 0 时的异步复位
+    vpu                  psum cache 状态机 (含 psum 区的加载), bias, relu, pipe_register, dequant, pipe_register
+
+每拍的顺序: 先由当前寄存器与存储算出全部组合逻辑, 再统一更新寄存器与存储 (对应同一个时钟沿)
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SIM_DIR, '..', 'data'))
+sys.path.insert(0, os.path.join(SIM_DIR, '..', 'instruction'))
+
+from golden import requant, clip
+from ins_asm import FIELD_TABLE, ICACHE_DEPTH, LOOP_FIELDS, LOOP_WINDOW, load_words, is_loop, decode_loop
+from ins_disasm import FINISH_INSTRUCTION
+from regress import DEFAULT_IMAGES, read_memh, compare_memh
+
+ARRAYS = 4
+ROWS = COLS = 16
+BATCH = 16              # psum cache 深度
+
+# 存储阵列: (深度, 每行字节数), 字节顺序与 $readmemh 文本相同 (第 0 个字节为 MSB)
+INPUT_DEPTH, INPUT_BYTES = 256, 64
+WEIGHT_DEPTH, WEIGHT_BYTES = 1024, 64
+MISC_DEPTH, MISC_BYTES = 16, 256
+PSUM_DEPTH, PSUM_BYTES = 256, 256      # psum 区: 每行为 psum cache 的一项 (4 x 16 个 int32), 布局同 x4 的 bias
+
+# 主机写入 (axi_write) 的目标为 psum 区时的 bank
+PSUM_REGION = 'psum'
+
+# ins_sa_en_size / ins_VPU_en_size -> 阵列 (channel) 数
+SIZE_ARRAYS = (0, 1, 2, 4)
+
+# 循环指令加步长的三个地址字段的位宽掩码
+LOOP_ADDR_MASK = FIELD_TABLE.mask[:LOOP_FIELDS].astype(np.int64)
+
+# vpe_psum_cache 的状态
+MODE_INVALID, MODE_ACCU, MODE_LOAD, MODE_OUTPUT = 0, 1, 2, 3
+
+# 未给出 +MISC_HEX 时 RTL 写死的 misc_memory 内容: 第 0 行为 layer1 的 bias, 第 1 行为 scale
+DEFAULT_MISC = os.path.join(SIM_DIR, '..', 'data', 'misc_hex.txt')
+
+# rearranger 第 r 行 FIFO 的长度为 r: 第 0 ~ r-2 级移位, 第 r-1 级为队尾 (第 0 行直通, 不使用)
+FIFO_ROWS = np.arange(1, ROWS)
+FIFO_TAIL = FIFO_ROWS - 1
+SHIFT_TAPS = np.arange(ROWS - 1)[None, :] < (np.arange(ROWS) - 1)[:, None]
+
+# 按 (a, j) 索引每个 vpe 的 psum cache
+VPE_ARRAY, VPE_COL = np.indices((ARRAYS, COLS))
+
+# 解析过的镜像 / 指令文件: (路径, 修改时间, 大小, 解析函数与参数) -> 数组; 回归中各用例共用的镜像只解析一次
+IMAGE_CACHE = {}
+IMAGE_CACHE_SIZE = 32
+
+def cached_parse(path, parse, *args):
+    """parse(path, *args) 的结果按文件缓存 (文件被修改后重新解析), 返回副本"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size, parse.__name__, args)
+    if key not in IMAGE_CACHE:
+        if len(IMAGE_CACHE) >= IMAGE_CACHE_SIZE:
+            IMAGE_CACHE.pop(next(iter(IMAGE_CACHE)), None)
+        IMAGE_CACHE[key] = parse(path, *args)
+    return IMAGE_CACHE[key].copy()
+
+def load_memh(path, depth, line_bytes):
+    """读取 $readmemh 文本为 (depth, line_bytes) 的 uint8 数组, 未给出的行为 0 (含 x / z 的行按 0 处理)"""
+    return cached_parse(path, parse_memh, depth, line_bytes)
+
+def parse_memh(path, depth, line_bytes):
+    image = np.zeros((depth, line_bytes), dtype=np.uint8)
+    mask = (1 << (line_bytes * 8)) - 1
+    for addr, value in read_memh(path).items():
+        if addr < depth and isinstance(value, int):
+            image[addr] = np.frombuffer((value & mask).to_bytes(line_bytes, 'big'), dtype=np.uint8)
+    return image
+
+def memh_lines(image):
+    """(lines, bytes) 的 uint8 数组 -> $writememh 格式的文本行"""
+    hex_str = np.ascontiguousarray(image).tobytes().hex()
+    width = image.shape[1] * 2
+    return [hex_str[i:i + width] for i in range(0, len(hex_str), width)]
+
+def slot_bytes(addr, arrays):
+    """
+    按 size 读写 512 bit 行时使用的字节区间 [start, start + 16 * arrays)
+    x1 时由地址 [1:0] 选 128 bit, x2 时由 [1] 选 256 bit, x4 时为整行; 区间内第 16a ~ 16a+15 字节对应第 a 个阵列
+    """
+    slot = (addr & 3) // arrays
+    return INPUT_BYTES - 16 * arrays * (slot + 1)
+
+class TPUModel:
+    """tpu.sv 的逐拍模型, 寄存器命名与 RTL 对应, 形状中的 a / i / j 分别为阵列 / 行 / 列"""
+
+    def __init__(self):
+        self.input_memory = np.zeros((INPUT_DEPTH, INPUT_BYTES), dtype=np.uint8)
+        self.input_memory_b1 = np.zeros((INPUT_DEPTH, INPUT_BYTES), dtype=np.uint8)
+        self.weight_memory = np.zeros((WEIGHT_DEPTH, WEIGHT_BYTES), dtype=np.uint8)
+        self.misc_memory = np.zeros((MISC_DEPTH, MISC_BYTES), dtype=np.uint8)
+        self.load_instructions([])
+        self.psum_memory = np.zeros((PSUM_DEPTH, PSUM_BYTES), dtype=np.uint8)
+        self.reset()
+
+    # ------------------------------------------------------------------ 加载
+    def load_images(self, input_file=None, weight_file=None, misc_file=None):
+        if input_file:
+            self.input_memory = load_memh(input_file, INPUT_DEPTH, INPUT_BYTES)
+        if weight_file:
+            self.weight_memory = load_memh(weight_file, WEIGHT_DEPTH, WEIGHT_BYTES)
+        if misc_file:
+            self.misc_memory = load_memh(misc_file, MISC_DEPTH, MISC_BYTES)
+
+    def load_instructions(self, words):
+        words = np.asarray(words, dtype=np.uint64)[:ICACHE_DEPTH]
+        self.ins_memory = np.zeros(ICACHE_DEPTH, dtype=np.uint64)
+        self.ins_memory[:len(words)] = words
+        # 预先按字段解码, 逐拍只做查表; 循环指令另存 (条数, 窗口) 与三个地址字段的步长
+        self.ins_fields = FIELD_TABLE.decode(self.ins_memory).astype(np.int64)
+        self.ins_loop = is_loop(self.ins_memory)
+        loops = np.flatnonzero(self.ins_loop).tolist()
+        loop_words = self.ins_memory[loops].tolist()
+        params = {word: decode_loop(word) for word in set(loop_words)}     # 展开的程序中循环指令字多有重复
+        self.loop_params = {pc: params[word] for pc, word in zip(loops, loop_words)}
+
+    def reset(self):
+        """rst: 清零全部寄存器, 存储内容保持 (LOAD_TXT 时存储在复位时重新加载镜像)"""
+        # control_unit / status_reg
+        self.pc = 0
+        self.icache_en = False
+        self.finish_flag = False
+        self.loop_iter = 0
+        self.history = np.zeros((LOOP_WINDOW, len(FIELD_TABLE)), dtype=np.int64)
+        self.history_ptr = 0
+        self.cycle = 0
+        self.input_bank = 0
+
+        # input bank 1 与 psum 区在复位时清零 (RTL 中不从镜像加载)
+        self.input_memory_b1[:] = 0
+        self.psum_memory[:] = 0
+
+        # AXI 写入 input_memory 的反压与冲突计数 (status_reg 的 ub_conflict)
+        self.axi_wready = True
+        self.ub_conflicts = 0
+
+        # rearranger FIFO: fifo[.., r, k] 为第 r 行的第 k 级 (k = 0 为输出端, k = r - 1 为队尾), r = 0 不使用
+        self.input_fifo = np.zeros((ROWS, ROWS), dtype=np.int32)
+        self.weight_fifo = np.zeros((ARRAYS, ROWS, ROWS), dtype=np.int32)
+
+        # tpu.sv 中打一拍的 sa_switch_weight
+        self.switch_q = False
+
+        # PE 寄存器, 形状 (a, i, j)
+        shape = (ARRAYS, ROWS, COLS)
+        self.pe_input = np.zeros(shape, dtype=np.int32)
+        self.pe_weight = np.zeros(shape, dtype=np.int32)
+        self.pe_active = np.zeros(shape, dtype=np.int32)
+        self.pe_inactive = np.zeros(shape, dtype=np.int32)
+        self.pe_psum = np.zeros(shape, dtype=np.int32)
+        self.pe_valid = np.zeros(shape, dtype=bool)
+        self.pe_switch = np.zeros(shape, dtype=bool)
+        self.pe_valid_w = np.zeros(shape, dtype=bool)
+        self.col_new_weight = np.zeros((ARRAYS, COLS), dtype=bool)
+
+        # vpe, 形状 (a, j)
+        self.psum_mode = np.full((ARRAYS, COLS), MODE_ACCU, dtype=np.int8)
+        self.psum_idx = np.zeros((ARRAYS, COLS), dtype=np.int64)
+        self.psum_cache = np.zeros((ARRAYS, COLS, BATCH), dtype=np.int32)
+        self.pipe1 = np.zeros((ARRAYS, COLS), dtype=np.int32)
+        self.pipe1_valid = np.zeros((ARRAYS, COLS), dtype=bool)
+        self.pipe2 = np.zeros((ARRAYS, COLS), dtype=np.int8)
+        self.pipe2_valid = np.zeros((ARRAYS, COLS), dtype=bool)
+
+    def bank_memory(self, bank=None):
+        """第 bank 个 input bank 的存储 (缺省为 input_bank 选中的 bank)"""
+        bank = self.input_bank if bank is None else bank
+        return self.input_memory_b1 if bank else self.input_memory
+
+    # ------------------------------------------------------------------ 组合逻辑
+    def instruction(self):
+        """当拍 control_unit 看到的指令字段"""
+        if self.finish_flag:
+            return FIELD_TABLE.decode(np.array([FINISH_INSTRUCTION], dtype=np.uint64))[0].astype(np.int64)
+        if not self.icache_en:
+            return np.zeros(len(FIELD_TABLE), dtype=np.int64)
+        if self.ins_loop[self.pc]:
+            # 循环指令: window 拍之前发出的指令在三个地址字段上加步长
+            _, _, window = self.loop_params[self.pc]
+            f = self.history[(self.history_ptr - window) % LOOP_WINDOW].copy()
+            f[:LOOP_FIELDS] = (f[:LOOP_FIELDS] + self.ins_fields[self.pc, :LOOP_FIELDS]) & LOOP_ADDR_MASK
+            return f
+        return self.ins_fields[self.pc]
+
+    def read_input(self, en, addr):
+        if not en:
+            return np.zeros(ROWS, dtype=np.int32)
+        start = slot_bytes(addr, 1)
+        return self.bank_memory()[(addr >> 2) & 0xFF, start:start + 16].view(np.int8).astype(np.int32)
+
+    def read_weight(self, en, size, addr):
+        data = np.zeros((ARRAYS, COLS), dtype=np.int32)
+        arrays = SIZE_ARRAYS[size]
+        if en and arrays:
+            start = slot_bytes(addr, arrays)
+            chunk = self.weight_memory[(addr >> 2) & 0x3FF, start:start + 16 * arrays]
+            data[:arrays] = chunk.view(np.int8).reshape(arrays, COLS)
+        return data
+
+    def read_bias(self, size, addr):
+        data = np.zeros((ARRAYS, COLS), dtype=np.int32)
+        arrays = SIZE_ARRAYS[size]
+        if arrays:
+            # 第 w 个 32 bit 字位于 [32w +: 32]; channel c 取 [(A-1-c)*512 +: 512]
+            words = self.misc_memory[addr].view('>i4')[::-1].reshape(ARRAYS, COLS)
+            data[:arrays] = words[arrays - 1::-1]
+        return data
+
+    def read_scale(self, addr):
+        return int(self.misc_memory[addr, -4:].view('>u4')[0])
+
+    def read_psum(self, addr):
+        """
+        psum 区第 addr 行 -> (a, j) 的 int32; 第 w 个 32 bit 字位于 [32w +: 32], channel c 取 [(3-c)*512 +: 512]
+        addr 为数组时返回 (.., a, j)
+        """
+        words = self.psum_memory[np.bitwise_and(addr, 0xFF)].view('>i4')[..., ::-1]
+        return words.reshape(*np.shape(addr), ARRAYS, COLS)[..., ::-1, :].astype(np.int32)
+
+    def write_psum(self, addr, data):
+        """read_psum 的逆: (.., a, j) 的 int32 写入 psum 区第 addr 行"""
+        data = np.asarray(data, dtype=np.int32)[..., ::-1, :]
+        words = data.reshape(*data.shape[:-2], ARRAYS * COLS)[..., ::-1]
+        self.psum_memory[np.bitwise_and(addr, 0xFF)] = words.astype('>i4').view(np.uint8)
+
+    # ------------------------------------------------------------------ 时钟沿
+    def step(self, axi_write=None):
+        """
+        运行一拍, 返回当拍执行的指令字段
+        axi_write 为当拍主机的写入 (64 位字地址, 值[, bank]), bank 为 0 / 1 (缺省 0) 时写 input bank,
+        字地址同 AXI (第 a 个字为第 a >> 3 行的 [(a & 7) * 64 +: 64]); bank 为 PSUM_REGION 时写 psum 区
+        (第 a 个字为第 a >> 5 行的 [(a & 31) * 64 +: 64]); 与同一 bank 上的 VPU 写回或 psum 存回同拍时
+        不写入, axi_wready 置为 False
+        """
+        f = self.instruction()
+        input_rd_addr, vpu_wr_addr, weight_rd_addr, bias_rd_addr, scale_rd_addr, sa_en_size, vpu_en_size, \
+            weight_valid, switch, input_valid, mode_select, psum_clear, bias_en, relu_en, dequant_en, finish = \
+            (int(v) for v in f)
+
+        sa_arrays = SIZE_ARRAYS[sa_en_size]
+        shift_en = sa_en_size != 0
+
+        # sa_enable 为 0 的阵列处于异步复位, 当拍寄存器即为 0
+        if sa_arrays < ARRAYS:
+            self.reset_arrays(sa_arrays)
+
+        # ---------------- UB 读出 + rearranger 输出
+        input_data = self.read_input(input_valid, input_rd_addr)
+        weight_data = self.read_weight(weight_valid, sa_en_size if weight_valid else 0, weight_rd_addr)
+
+        sa_input = self.input_fifo[:, 0].copy()
+        sa_input[0] = input_data[0] if input_valid else 0
+        sa_weight = self.weight_fifo[:, :, 0].copy()
+        sa_weight[:, 0] = weight_data[:, 0] if weight_valid else 0
+
+        # ---------------- 脉动阵列组合逻辑
+        lin = np.empty_like(self.pe_input)
+        lin[:, :, 0] = sa_input
+        lin[:, :, 1:] = self.pe_input[:, :, :-1]
+
+        lvalid = np.empty_like(self.pe_valid)
+        lvalid[:, 0, 0] = bool(input_valid)
+        lvalid[:, 0, 1:] = self.pe_valid[:, 0, :-1]
+        lvalid[:, 1:] = self.pe_valid[:, :-1]
+
+        lswitch = np.empty_like(self.pe_switch)
+        lswitch[:, 0, 0] = self.switch_q
+        lswitch[:, 0, 1:] = self.pe_switch[:, 0, :-1]
+        lswitch[:, 1:] = self.pe_switch[:, :-1]
+
+        lweight = np.empty_like(self.pe_weight)
+        lweight[:, 0] = sa_weight
+        lweight[:, 1:] = self.pe_weight[:, :-1]
+
+        lvalid_w = np.empty_like(self.pe_valid_w)
+        lvalid_w[:, 0] = True
+        lvalid_w[:, 1:] = self.pe_valid_w[:, :-1] & ~self.col_new_weight[:, None, :]
+
+        lpsum = np.zeros_like(self.pe_psum)
+        lpsum[:, 1:] = self.pe_psum[:, :-1]
+
+        sa_output = self.pe_psum[:, -1]
+        sa_valid_out = self.pe_valid[:, -1]
+
+        # ---------------- VPU 组合逻辑
+        bias = self.read_bias(vpu_en_size, bias_rd_addr) if bias_en else None
+        stream_valid, stream, next_mode, next_idx, write_mask, write_data = \
+            self.psum_cache_comb(mode_select, psum_clear, sa_valid_out, sa_output, self.read_psum(vpu_wr_addr))
+        # 所有 vpe 同拍进入 MODE_OUTPUT, 以第 0 个 vpe 的状态作为存回的条件
+        psum_store = mode_select == MODE_OUTPUT and not psum_clear and self.psum_mode[0, 0] == MODE_OUTPUT
+        relu_in = stream + bias if bias is not None else stream
+        relu_out = np.maximum(relu_in, 0) if relu_en else relu_in
+        if self.pipe1_valid.any():
+            if dequant_en:
+                dequant_out = requant(self.pipe1, self.read_scale(scale_rd_addr))
+            else:
+                dequant_out = clip(self.pipe1)
+        else:
+            dequant_out = np.zeros((ARRAYS, COLS), dtype=np.int8)
+        vpu_out = self.pipe2
+
+        # ---------------- 时钟沿: 存储
+        wr_arrays = SIZE_ARRAYS[vpu_en_size]
+        if wr_arrays:
+            start = slot_bytes(vpu_wr_addr, wr_arrays)
+            self.bank_memory()[(vpu_wr_addr >> 2) & 0xFF, start:start + 16 * wr_arrays] = \
+                np.ascontiguousarray(vpu_out[:wr_arrays, ::-1]).view(np.uint8).ravel()
+        if psum_store:
+            self.write_psum(vpu_wr_addr, stream)
+        self.axi_wready = True
+        if axi_write is not None:
+            addr, value, *bank = axi_write
+            bank = bank[0] if bank else 0
+            if bank == PSUM_REGION:
+                stall = psum_store
+                memory, row, start = self.psum_memory, (addr >> 5) & 0xFF, PSUM_BYTES - 8 * ((addr & 31) + 1)
+            else:
+                stall = wr_arrays and bank == self.input_bank
+                memory, row, start = self.bank_memory(bank), (addr >> 3) & 0xFF, INPUT_BYTES - 8 * ((addr & 7) + 1)
+            if stall:
+                self.axi_wready = False
+                self.ub_conflicts += 1
+            else:
+                memory[row, start:start + 8] = np.frombuffer(int(value).to_bytes(8, 'big'), dtype=np.uint8)
+
+        # ---------------- 时钟沿: vpe
+        self.pipe2 = np.where(self.pipe1_valid, dequant_out, 0).astype(np.int8)
+        self.pipe2_valid = self.pipe1_valid
+        self.pipe1 = np.where(stream_valid, relu_out, 0).astype(np.int32)
+        self.pipe1_valid = stream_valid
+        if psum_clear:
+            self.psum_cache[:] = 0
+        else:
+            if write_mask.any():
+                a, j = np.nonzero(write_mask)
+                self.psum_cache[a, j, self.psum_idx[a, j]] = write_data[a, j]
+        self.psum_mode = next_mode
+        self.psum_idx = next_idx
+
+        # ---------------- 时钟沿: 脉动阵列
+        self.col_new_weight[:, 1:] = self.col_new_weight[:, :-1]
+        self.col_new_weight[:, 0] = bool(switch)
+        self.pe_psum = np.where(lvalid, lin * self.pe_active + lpsum, 0)
+        self.pe_active = np.where(lswitch, self.pe_inactive, self.pe_active)
+        self.pe_inactive = np.where(lvalid_w, lweight, self.pe_inactive)
+        self.pe_weight = np.where(lvalid_w, lweight, self.pe_weight)
+        self.pe_input = np.where(lvalid, lin, 0)
+        self.pe_valid = lvalid
+        self.pe_switch = lswitch
+        self.pe_valid_w = lvalid_w
+        if sa_arrays < ARRAYS:
+            self.reset_arrays(sa_arrays)
+        self.switch_q = bool(switch)
+
+        # ---------------- 时钟沿: rearranger (队尾只在 load_en 时写入, 其余级在 shift_en 时移位)
+        if shift_en:
+            self.input_fifo[:, :-1] = np.where(SHIFT_TAPS, self.input_fifo[:, 1:], self.input_fifo[:, :-1])
+            self.weight_fifo[:, :, :-1] = np.where(SHIFT_TAPS, self.weight_fifo[:, :, 1:],
+                                                   self.weight_fifo[:, :, :-1])
+        if input_valid:
+            self.input_fifo[FIFO_ROWS, FIFO_TAIL] = input_data[1:]
+        if weight_valid:
+            self.weight_fifo[:, FIFO_ROWS, FIFO_TAIL] = weight_data[:, 1:]
+
+        # ---------------- 时钟沿: control_unit / status_reg
+        if not finish:
+            if self.icache_en and self.ins_loop[self.pc] and self.loop_iter + 1 < self.loop_params[self.pc][0]:
+                self.loop_iter += 1
+            else:
+                self.loop_iter = 0
+                self.pc = (self.pc + 1) % ICACHE_DEPTH
+            self.icache_en = True
+            self.history[self.history_ptr] = f
+            self.history_ptr = (self.history_ptr + 1) % LOOP_WINDOW
+        self.finish_flag = bool(finish)
+        self.cycle += 1
+        return f
+
+    def psum_cache_comb(self, mode_select, psum_clear, in_valid, data_in, load_in):
+        """
+        vpe_psum_cache 的 always_comb, 返回 (stream_valid, stream, mode_d, idx_d, write_en, write_data)
+        load_in 为当拍 psum 区读出的 (a, j) int32 (psum_load_in)
+        """
+        mode, idx = self.psum_mode, self.psum_idx
+        no_stream = np.zeros((ARRAYS, COLS), dtype=bool)
+        if psum_clear:
+            return (no_stream, np.zeros((ARRAYS, COLS), dtype=np.int32),
+                    np.full((ARRAYS, COLS), MODE_ACCU, dtype=np.int8), np.zeros((ARRAYS, COLS), dtype=np.int64),
+                    no_stream, None)
+
+        current = self.psum_cache[VPE_ARRAY, VPE_COL, idx]
+        bumped = (idx + 1) % BATCH
+        last = idx == BATCH - 1
+        accu = mode == MODE_ACCU
+        load = mode == MODE_LOAD
+        output = mode == MODE_OUTPUT
+        next_mode = mode.copy()
+        next_idx = idx.copy()
+        write_en = no_stream.copy()
+        write_data = np.zeros((ARRAYS, COLS), dtype=np.int32)
+        stream_valid = no_stream.copy()
+
+        if mode_select == MODE_INVALID:
+            return stream_valid, write_data, next_mode, next_idx, write_en, write_data
+
+        if mode_select in (MODE_LOAD, MODE_OUTPUT):
+            next_mode[accu] = mode_select
+            next_idx[accu] = 0
+        else:
+            write_en = accu & in_valid
+            write_data = np.where(write_en, current + data_in, 0).astype(np.int32)
+            next_idx = np.where(write_en, bumped, next_idx)
+
+        # MODE_LOAD 写入 psum_load_in, MODE_OUTPUT 逐项输出, 第 16 项后回到 MODE_ACCU
+        write_en = write_en | load
+        write_data = np.where(load, load_in, write_data).astype(np.int32)
+        stream_valid = output
+        stream = np.where(output, current, 0).astype(np.int32)
+        draining = load | output
+        next_idx = np.where(draining, bumped, next_idx)
+        next_mode = np.where(draining & last, MODE_ACCU, next_mode).astype(np.int8)
+        return stream_valid, stream, next_mode, next_idx, write_en, write_data
+
+    def reset_arrays(self, enabled):
+        """sys_rst = rst || !sa_enable[a]: 复位第 enabled 个及之后的阵列"""
+        for reg in (self.pe_input, self.pe_weight, self.pe_active, self.pe_inactive, self.pe_psum,
+                    self.pe_valid, self.pe_switch, self.pe_valid_w, self.col_new_weight):
+            reg[enabled:] = 0
+
+    # ------------------------------------------------------------------ 运行
+    def run(self, max_cycles=200000):
+        """从 EN 置 1 的那一拍运行到 finish_flag 置位, 返回运行的拍数; 超过 max_cycles 时抛出 TimeoutError"""
+        while not self.finish_flag:
+            if self.cycle >= max_cycles:
+                raise TimeoutError(f"finish not reached in {max_cycles} cycles (pc={self.pc})")
+            self.step()
+        return self.cycle
+
+    def launch(self, start_pc, bank=None):
+        """
+        status_reg 的 job_launch: 清除 finish, control_unit 从 start_pc 开始执行 (第一拍为 NOP), 其余状态保持;
+        给出 bank 时同时选择作业使用的 input bank (同队列项的 bank)
+        """
+        if bank is not None:
+            self.input_bank = bank
+        self.pc = start_pc % ICACHE_DEPTH
+        self.icache_en = False
+        self.finish_flag = False
+        self.loop_iter = 0
+        self.history[:] = 0
+        self.history_ptr = 0
+
+    def run_queue(self, jobs, max_cycles=200000):
+        """
+        按作业队列依次运行 jobs = [(入口 PC, job_id[, bank]), ...] (同 TPUDriver.submit, bank 缺省为 0),
+        每个作业在上一个 finish 的那一拍之后立即开始, 并切换到该作业的 input bank;
+        返回完成队列 [(job_id, 拍数), ...], 拍数同 ADDR_REG_DONE (从作业第一拍的 NOP 到 finish 那一拍)
+        """
+        done = []
+        for start_pc, job_id, *bank in jobs:
+            self.launch(start_pc, bank[0] if bank else 0)
+            start = self.cycle
+            self.run(max_cycles)
+            done.append((job_id, self.cycle - start))
+        return done
+
+    def run_with_host_writes(self, writes, max_cycles=200000):
+        """
+        运行到 finish, 同时从第 0 拍起每拍写一个字 (同 AXI 突发), 被反压的字下一拍重试;
+        writes 为 [(64 位字地址, 值[, bank]), ...] (同 step 的 axi_write), 返回 (finish 的拍数, 全部写完的拍数), 冲突拍数累计在 ub_conflicts
+        """
+        finish_cycle = None if not self.finish_flag else self.cycle
+        done_cycle = None if len(writes) else self.cycle
+        pos = 0
+        while finish_cycle is None or done_cycle is None:
+            if self.cycle >= max_cycles:
+                raise TimeoutError(f"finish / host writes not done in {max_cycles} cycles (pc={self.pc})")
+            self.step(writes[pos] if pos < len(writes) else None)
+            if pos < len(writes) and self.axi_wready:
+                pos += 1
+                if pos == len(writes):
+                    done_cycle = self.cycle
+            if self.finish_flag and finish_cycle is None:
+                finish_cycle = self.cycle
+        return finish_cycle, done_cycle
+
+    def dump_input_memory(self, output_file, bank=0):
+        with open(output_file, 'w') as f:
+            f.write("\n".join(memh_lines(self.bank_memory(bank))) + "\n")
+
+def run_images(input_file=None, weight_file=None, misc_file=None, ins_file=None, max_cycles=200000,
+               model_cls=TPUModel):
+    """按 regress.py 的约定加载镜像并运行, 未给出的镜像使用 RTL 缺省, 返回 (model, 拍数)"""
+    model = model_cls()
+    model.load_images(input_file or DEFAULT_IMAGES['input'], weight_file or DEFAULT_IMAGES['weight'],
+                      misc_file or DEFAULT_MISC)
+    model.load_instructions(cached_parse(ins_file or DEFAULT_IMAGES['ins'], load_words))
+    model.reset()
+    return model, model.run(max_cycles)
+
+def main():
+    parser = argparse.ArgumentParser(description="tpu.sv 逐拍 NumPy 模型")
+    parser.add_argument('--input', help="input_memory 镜像 ($readmemh)")
+    parser.add_argument('--weight', help="weight_memory 镜像 ($readmemh)")
+    parser.add_argument('--misc', help="misc_memory 镜像 ($readmemh)")
+    parser.add_argument('--ins', help="指令文件 ($readmemb / $readmemh / .bin)")
+    parser.add_argument('--ins-hex', help="$readmemh 格式的指令文件")
+    parser.add_argument('--dump', help="以 $writememh 格式导出 input_memory")
+    parser.add_argument('--expect', help="与 regress.py 相同格式的 expect 文件")
+    parser.add_argument('--max-cycles', type=int, default=200000)
+    args = parser.parse_args()
+
+    start = time.time()
+    model, cycles = run_images(args.input, args.weight, args.misc, args.ins or args.ins_hex, args.max_cycles)
+    elapsed = time.time() - start
+    print(f"finished at cycle {cycles} ({elapsed:.3f}s, {cycles / max(elapsed, 1e-9):.0f} cycles/s)")
+
+    if args.dump:
+        model.dump_input_memory(args.dump)
+    if args.expect:
+        if args.dump:
+            mismatches = compare_memh(args.dump, args.expect)
+        else:
+            # 未给出 --dump 时在临时目录中导出后比对, 不在源码目录留下文件
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                dump_file = os.path.join(tmp_dir, 'imem_dump.txt')
+                model.dump_input_memory(dump_file)
+                mismatches = compare_memh(dump_file, args.expect)
+        if mismatches:
+            addr, expect, actual = mismatches[0]
+            print(f"FAIL: {len(mismatches)} row(s) mismatch, first @{addr:x}: expect {expect:x}, got {actual:x}")
+            sys.exit(1)
+        print("PASS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+'''
+事务级快速模型: 按语义解释 54 位指令流, 不逐拍推进脉动阵列, 结果与 tpu_model.py 的逐拍模型逐位一致
+
+使用说明:
+    python3 tpu_tlm.py [--input ..] [--weight ..] [--misc ..] [--ins .. | --ins-hex ..] [--dump ..] [--expect ..] [--fallback]
+    参数与 tpu_model.py 相同; 程序超出下述约定时报错, --fallback 时改用逐拍模型运行
+    相对逐拍模型的加速比见 bench_tlm.py (make bench)
+
+解释方式 (时序常数均来自 RTL, 与 tpu_model.py 逐拍运行的结果一致):
+    - 指令流没有跳转 (循环指令按发射顺序展开), 第 c 拍执行第 c 条指令 (第 0 拍 icache 读使能尚未置位, 为 NOP), 总拍数 = 第一条 finish 的 PC + 1
+    - 每个 sa_switch_weight (第 s 拍) 构成一个权重块: PE 第 i 行取第 s - i 拍加载的权重
+    - 每行输入 (第 t 拍的 sa_input_valid) 与第 t - 2 拍及之前最近一次翻转的权重块做一次 int8 GEMV,
+      第 j 列的结果在第 t + 16 + j 拍到达 psum cache
+    - psum cache 的 ACCU / LOAD / OUTPUT 状态只取决于 mode_select 与 psum_clear, 对所有列相同;
+      累加位置由各列被接受的结果个数决定, OUTPUT 读出的值为该项自上次清零 / 加载以来被接受的结果之和,
+      上次为 LOAD 时再加上当时从 psum 区第 VPU_wr_addr 行加载的值
+    - OUTPUT 读出的拍 mode_select 为 MODE_OUTPUT 时读出值存回 psum 区; 加载与存回按时间顺序处理
+    - 读出后 bias / relu 同拍, dequant 晚 1 拍, 第 r 拍读出的结果在第 r + 2 拍按当拍的 VPU_en_size / 地址写回
+    - 写回的行被之后的输入读到时 (层间串联), 按时间顺序迭代求解, 直到写回内容不再变化
+
+约定 (超出时抛出 UnsupportedProgram):
+    - 用到的权重块: 第 s - 15 ~ s 拍均有 sa_weight_valid 且 sa_en_size 不变, 与前后的翻转至少间隔 16 拍
+    - 每行输入从送入到第 15 列结果输出 (t ~ t + 31 拍) 期间 sa_en_size 不变且不为 0
+    - 输入使用的权重块在同一个 sa_en_size 区间内翻转 (或其间 sa_en_size 为 0, 权重已复位为 0)
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from tpu_model import (TPUModel, run_images, compare_memh, ARRAYS, ROWS, COLS, BATCH, INPUT_BYTES, WEIGHT_BYTES,
+                       SIZE_ARRAYS, MODE_ACCU, MODE_LOAD, MODE_OUTPUT)
+from golden import requant, clip, int32_wrap
+from ins_asm import INPUT_DELAY, ARRAY_LATENCY, DRAIN_LATENCY, PIPE_LATENCY, cycle_fields
+
+MAX_ITERATIONS = 32         # 层间串联时的最大迭代次数
+PLAN_CACHE_SIZE = 16        # 缓存静态分析结果的程序数
+
+SIZES = np.array(SIZE_ARRAYS)
+PLAN_CACHE = {}
+
+class UnsupportedProgram(ValueError):
+    """程序超出事务级解释的约定, 需要用逐拍模型运行"""
+    def __init__(self, cycle, msg):
+        super().__init__(f"cycle {cycle}: {msg}")
+        self.cycle = cycle
+
+def runs(values):
+    """连续相同取值的区间: 返回每拍所在区间的 (起始拍, 结束拍)"""
+    change = np.flatnonzero(np.diff(values)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change - 1, [len(values) - 1]))
+    run_id = np.zeros(len(values), dtype=np.int64)
+    run_id[change] = 1
+    run_id = np.cumsum(run_id)
+    return starts[run_id], ends[run_id]
+
+def last_before(pos, cycle, q_pos, q_cycle, span):
+    """
+    写入序列 (位置 pos, 拍 cycle, 按写入顺序排列) 中, 每个查询 (q_pos, q_cycle) 对同一位置在第 q_cycle 拍之前的
+    最后一次写入的下标, 没有时为 -1; span 大于所有的拍
+    """
+    if len(pos) == 0:
+        return np.full(len(q_pos), -1, dtype=np.int64)
+    order = np.lexsort((cycle, pos))                    # 稳定排序, 同一拍的多次写入保持写入顺序
+    key = pos[order] * span + cycle[order]
+    k = np.searchsorted(key, q_pos * span + q_cycle, side='left') - 1
+    hit = k >= 0
+    hit[hit] = pos[order[k[hit]]] == q_pos[hit]
+    return np.where(hit, order[np.maximum(k, 0)], -1)
+
+def psum_timeline(ms, clear):
+    """
+    vpe_psum_cache 的状态序列 (与输入无关, 所有列相同)
+    返回 (accept, resets, reads, loads):
+        accept : 每拍是否接受阵列结果 (MODE_ACCU, mode_select 为 ACCU, 且无 psum_clear)
+        resets : 累加位置回到 0 的拍 (clear, 进入 LOAD / OUTPUT, 第 16 项读出 / 写入之后)
+        reads  : OUTPUT 的 (拍, 项) 列表; loads: LOAD 写入 psum_load_in 的 (拍, 项) 列表
+    """
+    n = len(ms)
+    mode = np.full(n, MODE_ACCU, dtype=np.int8)
+    clears = np.flatnonzero(clear)
+    enter = np.flatnonzero(((ms == MODE_LOAD) | (ms == MODE_OUTPUT)) & (clear == 0))
+    steps = np.flatnonzero((ms != 0) & (clear == 0))
+    resets = [clears]
+    reads, loads = [], []
+
+    pos = 0
+    while True:
+        k = np.searchsorted(enter, pos)
+        if k == len(enter):
+            break
+        e = int(enter[k])
+        target = loads if ms[e] == MODE_LOAD else reads
+        resets.append([e])
+        next_clear = clears[np.searchsorted(clears, e + 1):][:1]
+        limit = int(next_clear[0]) if len(next_clear) else n
+        seq = steps[np.searchsorted(steps, e + 1):][:BATCH]
+        seq = seq[seq < limit]
+        target.append(np.stack([seq, np.arange(len(seq))], axis=1))
+        if len(seq) == BATCH:
+            mode[e + 1:seq[-1] + 1] = ms[e]
+            resets.append([seq[-1]])
+            pos = int(seq[-1]) + 1
+        else:
+            mode[e + 1:limit + 1] = ms[e]
+            pos = limit + 1
+
+    accept = (mode == MODE_ACCU) & (ms == MODE_ACCU) & (clear == 0)
+    empty = np.zeros((0, 2), dtype=np.int64)
+    return (accept, np.unique(np.concatenate(resets)).astype(np.int64),
+            np.concatenate(reads) if reads else empty, np.concatenate(loads) if loads else empty)
+
+class TransactionModel(TPUModel):
+    """与 TPUModel 相同的加载 / 导出接口, run() 按事务执行"""
+
+    def run(self, max_cycles=200000):
+        # 按拍展开的字段与静态分析只取决于指令流, 同一程序换数据重复运行时复用
+        key = self.ins_memory.tobytes()
+        if key not in PLAN_CACHE:
+            if len(PLAN_CACHE) >= PLAN_CACHE_SIZE:
+                PLAN_CACHE.pop(next(iter(PLAN_CACHE)))
+            f = cycle_fields(self.ins_memory)
+            PLAN_CACHE[key] = (f, self.plan_program(f))
+        self.fields, self.plan = PLAN_CACHE[key]
+        n = len(self.fields["finish"])
+        if n > max_cycles:
+            raise TimeoutError(f"finish not reached in {max_cycles} cycles")
+
+        tiles = self.weight_tiles()
+        initial = self.bank_memory()
+        self.psum_initial = self.psum_memory.copy()
+        writes = None
+        for _ in range(MAX_ITERATIONS):
+            x = self.read_inputs(initial, writes)
+            new_writes = self.execute(x, tiles)
+            if writes is not None and np.array_equal(writes, new_writes):
+                break
+            writes = new_writes
+            if not self.plan["hazard"]:
+                break
+        else:
+            raise UnsupportedProgram(n - 1, "write-back / input read chain did not converge")
+        self.apply_writes(writes)
+
+        p = self.plan
+        self.stats = {"cycles": n, "tiles": len(p["tile_loads"]), "input_rows": len(p["inputs"]),
+                      "drains": len(p["read_cycle"]), "writes": len(p["writes"])}
+        self.cycle = n
+        self.finish_flag = True
+        return n
+
+    # ------------------------------------------------------------------ 静态分析
+    def plan_program(self, f):
+        n = len(f["finish"])
+        size = f["sa_en_size"]
+        run_start, run_end = runs(size)
+
+        # 输入行: 送入 ~ 第 15 列结果输出期间阵列不能复位或改变尺寸 (finish 之后的结果无关紧要)
+        inputs = np.flatnonzero(f["sa_input_valid"])
+        bad = (size[inputs] == 0) | (run_end[inputs] < np.minimum(inputs + DRAIN_LATENCY, n - 1))
+        if bad.any():
+            t = int(inputs[bad][0])
+            raise UnsupportedProgram(t, "sa_en_size changes or is 0 while an input row is in the array")
+
+        # 每行输入使用的权重块: 第 t - 2 拍及之前最近一次翻转; 没有翻转或之后阵列整体复位过 (sa_en_size 为 0) 时权重为 0
+        switches = np.flatnonzero(f["sa_switch_weight"])
+        tile = np.searchsorted(switches, inputs - INPUT_DELAY, side='right') - 1
+        last_off = np.maximum.accumulate(np.where(size == 0, np.arange(n), -1))
+        s_in = switches[np.maximum(tile, 0)]
+        tile[(tile < 0) | (s_in <= last_off[inputs])] = -1
+        carried = (tile >= 0) & (s_in < run_start[inputs])
+        if carried.any():
+            t = int(inputs[carried][0])
+            raise UnsupportedProgram(t, "input row uses a weight tile switched under a different sa_en_size")
+
+        used = np.unique(tile[tile >= 0])
+        for k in used:
+            s = int(switches[k])
+            if s - (ROWS - 1) < run_start[s]:
+                raise UnsupportedProgram(s, "weight tile loads are not all inside one sa_en_size run")
+            if not f["sa_weight_valid"][s - ROWS + 1:s + 1].all():
+                raise UnsupportedProgram(s, f"sa_switch_weight without {ROWS} consecutive weight loads")
+            near = switches[max(k - 1, 0):k + 2]
+            near = near[(near != s) & (np.abs(near - s) < ROWS)]
+            if len(near):
+                raise UnsupportedProgram(s, f"sa_switch_weight within {ROWS} cycles of another switch")
+
+        # 第 k 个用到的权重块中 PE 第 i 行取第 tile_loads[k, i] 拍加载的权重
+        tile_loads = switches[used][:, None] - np.arange(ROWS)[None, :]
+        tile_of = np.full(len(switches) + 1, -1, dtype=np.int64)
+        tile_of[used] = np.arange(len(used))
+        tile = np.where(tile >= 0, tile_of[tile], -1)
+
+        accept, resets, reads, zero_writes = psum_timeline(f["vpu_mode_select"], f["vpu_psum_clear"])
+
+        # 各列接受的结果及其累加位置: 同一 (通道, 复位区间) 内按到达顺序依次为第 0, 1, .. 15 项
+        arrive = inputs[:, None] + ARRAY_LATENCY + np.arange(COLS)[None, :]            # (输入, 列)
+        ok = np.zeros(arrive.shape, dtype=bool)
+        inside = arrive < n
+        ok[inside] = accept[arrive[inside]]
+        lanes = ok[:, None, :] & (np.arange(ARRAYS)[None, :, None] < SIZES[size[inputs]][:, None, None])
+        epoch = np.searchsorted(resets, arrive)                                        # 之前的复位次数, 随输入单调
+        order = np.cumsum(lanes, axis=0) - lanes                                       # 同一通道之前接受的个数
+        start = np.ones(epoch.shape, dtype=bool)
+        start[1:] = epoch[1:] != epoch[:-1]
+        first = np.maximum.accumulate(np.where(start, np.arange(len(inputs))[:, None], 0), axis=0)
+        base = np.take_along_axis(order, first[:, None, :], axis=0)
+        entry = (order - base) % BATCH
+
+        # OUTPUT 读出的第 k 项 = 上次清零 (psum_clear / LOAD 写入) 之后、读出之前到达该项的结果之和:
+        # 被接受的结果按 (通道, 项, 输入) 排序, 每次读出为排序后前缀和上两个位置之差
+        t_idx, a_idx, j_idx = np.nonzero(lanes)                                      # 按 (输入, 阵列, 列) 的行优先顺序
+        span = len(inputs) + 1
+        group = (a_idx * COLS + j_idx) * BATCH + entry[lanes]
+        order = np.argsort(group.astype(np.uint16), kind='stable')                      # nonzero 中输入已递增, 16 位键为基数排序
+        key = (group * span + t_idx + 1)[order]
+
+        read_cycle, read_entry = reads[:, 0], reads[:, 1]
+        zero, read_load = self.last_zero(read_cycle, read_entry, np.flatnonzero(f["vpu_psum_clear"]), zero_writes)
+        lag = ARRAY_LATENCY + np.arange(COLS)[None, :]
+        hi = np.searchsorted(inputs, read_cycle[:, None] - lag, side='left')            # (读出, 列) 的输入个数
+        lo = np.searchsorted(inputs, zero[:, None] - lag, side='right')
+        q_group = (np.arange(ARRAYS)[None, :, None] * COLS + np.arange(COLS)[None, None, :]) * BATCH \
+            + read_entry[:, None, None]
+        hi = np.searchsorted(key, q_group * span + hi[:, None, :], side='right')
+        lo = np.searchsorted(key, q_group * span + lo[:, None, :], side='right')
+
+        # 写回: VPU_en_size 不为 0 的每一拍写入 2 拍前读出的结果 (没有读出时为 0), 展开为逐字节的写入序列
+        vpu_size = f["VPU_en_size"]
+        wb = np.flatnonzero(vpu_size)
+        wb_src = np.searchsorted(read_cycle, wb - PIPE_LATENCY)
+        wb_hit = wb_src < len(read_cycle)
+        wb_hit[wb_hit] = read_cycle[wb_src[wb_hit]] == wb[wb_hit] - PIPE_LATENCY
+        wb_keep = np.arange(ARRAYS * COLS)[None, :] < 16 * SIZES[vpu_size[wb]][:, None]
+        wb_cycle = np.repeat(wb, 16 * SIZES[vpu_size[wb]])
+        wb_rows, wb_cols = self.write_bytes(f["VPU_wr_addr"][wb], vpu_size[wb])
+        wb_pos = wb_rows * INPUT_BYTES + wb_cols
+        wb_last = len(wb_pos) - 1 - np.unique(wb_pos[::-1], return_index=True)[1]  # 每个字节最后一次写入
+
+        # 写回的字节被之后的输入读到时 (层间串联) 需要迭代: 每个输入字节取读出之前最后一次写入的值
+        in_rows, in_cols = self.input_bytes(f["input_rd_addr"][inputs])
+        in_flat = in_rows * INPUT_BYTES + in_cols
+        in_src = last_before(wb_pos, wb_cycle, in_flat.ravel(), np.repeat(inputs, ROWS), n + 1).reshape(in_flat.shape)
+        hazard = bool((in_src >= 0).any())
+
+        # psum 区: 每次加载读到的是之前最后一次存回同一行的读出 (load_src, -1 时为运行前的内容)
+        store = f["vpu_mode_select"][read_cycle] == MODE_OUTPUT
+        stores = np.flatnonzero(store)
+        store_row = f["VPU_wr_addr"][read_cycle] & 0xFF
+        load_cycle = zero_writes[:, 0]
+        load_row = f["VPU_wr_addr"][load_cycle] & 0xFF
+        load_src = last_before(store_row[stores], read_cycle[stores], load_row, load_cycle, n + 1)
+        load_src = np.append(stores, -1)[load_src]     # 换算为读出的下标, -1 保持不变
+        store_last = stores[len(stores) - 1 - np.unique(store_row[stores][::-1], return_index=True)[1]]
+
+        # 连续使用同一权重块的输入区间 (按块做 GEMV), 等长的区间合并为一次批量矩阵乘 (行下标, 权重块);
+        # 被接受的结果按前缀和的顺序在 y 中的位置
+        tile_start = np.flatnonzero(np.diff(tile, prepend=-2))
+        tile_len = np.diff(np.append(tile_start, len(inputs)))
+        tile_id = tile[tile_start]
+        tile_groups = []
+        for length in np.unique(tile_len[tile_id >= 0]).tolist():
+            sel = (tile_id >= 0) & (tile_len == length)
+            tile_groups.append((tile_start[sel][:, None] + np.arange(length), tile_id[sel]))
+        gather = np.flatnonzero(lanes)[order]
+
+        # 权重与输入按展平后的字节下标读取, 未使能阵列的权重取 -1 (读取时在存储末尾补的 0)
+        loads = tile_loads.reshape(-1)
+        w_rows, w_idx, w_enabled = self.weight_bytes(f["weight_rd_addr"][loads], f["sa_en_size"][loads])
+        w_flat = np.where(np.repeat(w_enabled, COLS, axis=1), w_rows[:, None] * WEIGHT_BYTES + w_idx, -1)
+
+        return {
+            "inputs": inputs, "tile": tile, "tile_loads": tile_loads,
+            "tile_groups": tile_groups, "in_flat": in_flat, "in_src": in_src,
+            "w_flat": w_flat.reshape(*tile_loads.shape, -1),
+            "gather": gather, "read_cycle": read_cycle, "hi": hi, "lo": lo,
+            "writes": wb, "wb_src": wb_src[wb_hit], "wb_hit": wb_hit, "wb_keep": wb_keep, "wb_cycle": wb_cycle,
+            "wb_rows": wb_rows, "wb_cols": wb_cols, "wb_last": wb_last, "hazard": hazard,
+            # psum 区: 每次读出的基值来自第 read_load 次加载 (-1 为 0), store 的读出存回 store_row 行
+            "read_load": read_load, "load_row": load_row, "load_src": load_src,
+            "store": store, "store_row": store_row, "store_last": store_last,
+        }
+
+    def weight_tiles(self):
+        """tiles[k, i, a * COLS + j]: 第 k 个权重块中第 a 个阵列 PE(i, j) 的权重 (float32, 供 GEMV 使用)"""
+        return np.take(np.append(self.weight_memory, np.uint8(0)), self.plan["w_flat"]).view(np.int8).astype(np.float32)
+
+    @staticmethod
+    def weight_bytes(addr, size):
+        """按 size 读权重: 返回 (行, (.., a * COLS + j) 的字节索引, (.., a) 阵列是否使能)"""
+        arrays = SIZES[size]
+        start = INPUT_BYTES - 16 * arrays * ((addr & 3) // np.maximum(arrays, 1) + 1)
+        idx = start[:, None] + np.arange(ARRAYS * COLS)[None, :]
+        return (addr >> 2) & 0x3FF, np.clip(idx, 0, INPUT_BYTES - 1), np.arange(ARRAYS)[None, :] < arrays[:, None]
+
+    @staticmethod
+    def input_bytes(addr):
+        """输入读地址 -> 16 个字节的 (行, 列) 索引"""
+        start = INPUT_BYTES - 16 * ((addr & 3) + 1)
+        return ((addr >> 2) & 0xFF)[:, None].repeat(ROWS, axis=1), start[:, None] + np.arange(ROWS)
+
+    @staticmethod
+    def write_bytes(addr, size):
+        """VPU 写回 -> 展开后的 (行, 列) 字节索引, 按写回顺序排列"""
+        arrays = SIZES[size]
+        start = INPUT_BYTES - 16 * arrays * ((addr & 3) // arrays + 1)
+        count = 16 * arrays
+        rows = np.repeat((addr >> 2) & 0xFF, count)
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        return rows, np.repeat(start, count) + offset
+
+    # ------------------------------------------------------------------ 执行
+    def read_inputs(self, initial, writes):
+        """每行输入读到的 16 个 int8 (float32); writes 为上一轮写回的字节序列, 用于层间串联"""
+        p = self.plan
+        x = np.take(initial, p["in_flat"])
+        if writes is not None and p["hazard"]:
+            # 读出之前被写回过的字节取最后一次写入的值
+            x = np.where(p["in_src"] >= 0, writes[p["in_src"]], x)
+        return x.view(np.int8).astype(np.float32)
+
+    def execute(self, x, tiles):
+        """由输入算出全部写回: 返回按写入顺序排列的字节 (位置见 plan 的 wb_rows / wb_cols)"""
+        p = self.plan
+        n = len(self.fields["finish"])
+
+        # 每行输入的 GEMV 结果 y[t, a * COLS + j], 按连续使用同一权重块的区间计算 (tile 为 -1 时权重为 0);
+        # 16 个 int8 乘积之和的绝对值不超过 2^18, float32 运算没有舍入
+        y = np.zeros((len(x), ARRAYS * COLS), dtype=np.float32)
+        for rows, ks in p["tile_groups"]:
+            y[rows] = np.matmul(x[rows], tiles[ks])
+
+        prefix = np.concatenate(([0], np.cumsum(y.reshape(-1)[p["gather"]].astype(np.int64))))
+        read_cycle = p["read_cycle"]
+        stream = int32_wrap(prefix[p["hi"]] - prefix[p["lo"]])
+        if len(p["load_row"]) or p["store"].any():
+            stream = self.psum_transfers(stream)
+
+        # vpe: bias / relu 同拍, dequant 晚 1 拍, 再晚 1 拍写回
+        out = self.postprocess(read_cycle, stream, n)
+
+        # 写回: VPU_en_size 不为 0 的每一拍写入 vpu_out (2 拍前无读出时为 0)
+        data = np.zeros((len(p["writes"]), ARRAYS, COLS), dtype=np.int8)
+        data[p["wb_hit"]] = out[p["wb_src"]]
+        chunks = np.ascontiguousarray(data[:, :, ::-1]).view(np.uint8).reshape(len(data), -1)
+        return chunks[p["wb_keep"]]
+
+    def psum_transfers(self, stream):
+        """
+        psum 区的加载与存回: 读出值加上该项最后一次加载的值, 加载的值为之前最后一次存回同一行的读出;
+        存回与加载交替的链 (K 分段) 按链长迭代, 每次迭代对全部读出 / 加载向量化计算
+        """
+        p = self.plan
+        self.psum_memory = self.psum_initial.copy()
+        has_load = p["read_load"] >= 0
+        from_store = p["load_src"] >= 0
+        loaded = self.read_psum(p["load_row"]).astype(np.int64)
+        for _ in range(len(loaded) + 1):
+            total = stream.copy()
+            total[has_load] = int32_wrap(stream[has_load] + loaded[p["read_load"][has_load]])
+            new_loaded = loaded.copy()
+            new_loaded[from_store] = total[p["load_src"][from_store]]
+            if np.array_equal(new_loaded, loaded):
+                break
+            loaded = new_loaded
+        last = p["store_last"]
+        self.write_psum(p["store_row"][last], total[last])
+        return total
+
+    @staticmethod
+    def last_zero(cycle, entry, clears, loads):
+        """
+        每次读出之前该项最后一次被清零 (psum_clear 或 LOAD 写入) 的拍, 没有时为 -1;
+        同时返回该拍为 LOAD 时在 loads 中的下标, 否则为 -1
+        """
+        zero = np.concatenate(([-1], clears))[np.searchsorted(clears, cycle)]
+        source = np.full(len(cycle), -1, dtype=np.int64)
+        for e in np.unique(loads[:, 1]):
+            idx = np.flatnonzero(loads[:, 1] == e)
+            w = loads[idx, 0]
+            sel = np.flatnonzero(entry == e)
+            k = np.searchsorted(w, cycle[sel]) - 1
+            hit = k >= 0
+            hit[hit] = w[k[hit]] > zero[sel[hit]]
+            zero[sel[hit]] = w[k[hit]]
+            source[sel[hit]] = idx[k[hit]]
+        return zero, source
+
+    def postprocess(self, read_cycle, stream, n):
+        """第 r 拍读出的 int32 -> 第 r + 2 拍的 vpu_out (int8)"""
+        f = self.fields
+        out = np.zeros(stream.shape, dtype=np.int8)
+        if len(read_cycle) == 0:
+            return out
+        value = stream.astype(np.int64)
+        bias_on = f["vpu_bias_en"][read_cycle] == 1
+        if bias_on.any():
+            # 每个不同的 (地址, size) 只读一次 bias, 再按读出展开
+            pairs = np.stack((f["bias_rd_addr"][read_cycle][bias_on], f["VPU_en_size"][read_cycle][bias_on]), axis=1)
+            pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+            table = np.stack([self.read_bias(size, addr) for addr, size in pairs.tolist()])
+            value[bias_on] += table[inverse.reshape(-1)]
+        value = int32_wrap(value).astype(np.int64)
+        relu = f["vpu_relu_en"][read_cycle] == 1
+        value[relu] = np.maximum(value[relu], 0)
+
+        nxt = np.minimum(read_cycle + 1, n - 1)
+        dequant = f["vpu_dequant_en"][nxt] == 1
+        scale_addr = f["scale_rd_addr"][nxt]
+        out[~dequant] = clip(value[~dequant])
+        for addr in np.unique(scale_addr[dequant]):
+            sel = dequant & (scale_addr == addr)
+            out[sel] = requant(value[sel], self.read_scale(int(addr)))
+        return out
+
+    def apply_writes(self, writes):
+        """按时间顺序写回 input_bank 选中的 bank, 同一字节以最后一次写入为准"""
+        p = self.plan
+        last = p["wb_last"]
+        self.bank_memory()[p["wb_rows"][last], p["wb_cols"][last]] = writes[last]
+
+def main():
+    parser = argparse.ArgumentParser(description="TPU 事务级快速模型")
+    parser.add_argument('--input', help="input_memory 镜像 ($readmemh)")
+    parser.add_argument('--weight', help="weight_memory 镜像 ($readmemh)")
+    parser.add_argument('--misc', help="misc_memory 镜像 ($readmemh)")
+    parser.add_argument('--ins', help="指令文件 ($readmemb / $readmemh / .bin)")
+    parser.add_argument('--ins-hex', help="$readmemh 格式的指令文件")
+    parser.add_argument('--dump', help="以 $writememh 格式导出 input_memory")
+    parser.add_argument('--expect', help="与 regress.py 相同格式的 expect 文件")
+    parser.add_argument('--max-cycles', type=int, default=200000)
+    parser.add_argument('--fallback', action='store_true', help="超出约定时改用逐拍模型")
+    args = parser.parse_args()
+
+    start = time.time()
+    try:
+        model, cycles = run_images(args.input, args.weight, args.misc, args.ins or args.ins_hex, args.max_cycles,
+                                   model_cls=TransactionModel)
+        mode = "transaction"
+    except UnsupportedProgram as e:
+        if not args.fallback:
+            raise SystemExit(f"unsupported program: {e}")
+        print(f"unsupported program ({e}), falling back to the cycle model")
+        model, cycles = run_images(args.input, args.weight, args.misc, args.ins or args.ins_hex, args.max_cycles)
+        mode = "cycle"
+    elapsed = time.time() - start
+    print(f"finished at cycle {cycles} ({mode}, {elapsed * 1000:.2f} ms)")
+    if mode == "transaction":
+        print(", ".join(f"{k}={v}" for k, v in model.stats.items()))
+
+    if args.dump:
+        model.dump_input_memory(args.dump)
+    if args.expect:
+        if args.dump:
+            mismatches = compare_memh(args.dump, args.expect)
+        else:
+            # 未给出 --dump 时在临时目录中导出后比对, 不在源码目录留下文件
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                dump_file = os.path.join(tmp_dir, 'imem_dump.txt')
+                model.dump_input_memory(dump_file)
+                mismatches = compare_memh(dump_file, args.expect)
+        if mismatches:
+            addr, expect, actual = mismatches[0]
+            print(f"FAIL: {len(mismatches)} row(s) mismatch, first @{addr:x}: expect {expect:x}, got {actual:x}")
+            sys.exit(1)
+        print("PASS")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,27 @@
 // =============================================
+// 突发传输 (INCR): axi_req 拍给出首地址与 axi_len (拍数 - 1, 0 为单拍), 之后每拍内部地址自动加 1 (8 字节),
+// 写突发在连续的 axi_len + 1 拍给出 axi_wdata (首拍与地址同拍); 读数据比对应拍晚 1 拍, 以 axi_rvalid 标记;
+// 突发期间 axi_ready 为 0, 不接受新请求; 最后一拍的下一拍即可发出下一个请求, 此时上一突发的读数据仍在返回
+// 宽写入: axi_wide 为 1 的写请求每拍给出 AXI_WR_WIDTH 位的 axi_wdata 与字节写使能 axi_wstrb,
+// 一拍写入 unified_buffer 一行中对齐的 AXI_WR_WIDTH / 64 个字, 突发内每拍地址加 AXI_WR_WIDTH / 64;
+// 宽写入只用于 ubuf, 读与 icache / status 仍为 64 位
+// 写反压: 写入 input bank 的一拍与 VPU 写回同一 bank 冲突 (或写入 psum 区与 psum 存回同拍) 时 axi_wready 为 0, 该拍未写入,
+// 主机保持 axi_wdata / axi_wstrb 不变直到 axi_wready 为 1 的拍; 首拍被反压时请求已被接收 (axi_ready 随即为 0),
+// 之后的拍由内部地址继续, 主机不需要重新给出 axi_req
+// =============================================
 // AXI - ubuf_memory
 //         - data_memory
 //         - weight_memory
 //         - misc_memory
+//         - data_memory bank 1 (0x3000 ~ 0x37FF)
+//         - psum_memory (0x4000 ~ 0x5FFF)
 //     - icache_memory
 //     - status_register
 // =============================================
 
-module axi_interface (
+module axi_interface #(
+    parameter AXI_WR_WIDTH = 512    // 宽写入位宽: 128 / 256 / 512
+) (
     // 时钟及复位
     input  logic       clk,
     input  logic       rst,
@@ -16,15 +30,24 @@ module axi_interface (
     input  logic        axi_req,        // AXI请求信号
     input  logic        axi_we,         // 写使能 (1=写, 0=读)
     input  logic [63:0] axi_addr,       // 地址
-    input  logic [63:0] axi_wdata,      // 写数据
+    input  logic [AXI_WR_WIDTH-1:0]   axi_wdata,  // 写数据, 窄写入只使用低 64 位
+    input  logic [AXI_WR_WIDTH/8-1:0] axi_wstrb,  // 宽写入的字节写使能
+    input  logic        axi_wide,       // 宽写入
+    input  logic [7:0]  axi_len,        // 突发拍数 - 1
     output logic [63:0] axi_rdata,      // 读数据
+    output logic        axi_rvalid,     // 读数据有效
+    output logic        axi_ready,      // 可以接受新请求
+    output logic        axi_wready,     // 当拍的写数据被接收
     
     // 内部接口
     output logic        ubuf_en,
     output logic        ubuf_we,
     output logic [15:0] ubuf_addr,
-    output logic [63:0] ubuf_wdata,
+    output logic [AXI_WR_WIDTH-1:0]   ubuf_wdata,
+    output logic                      ubuf_wide,
+    output logic [AXI_WR_WIDTH/8-1:0] ubuf_wstrb,
     input  logic [63:0] ubuf_rdata,
+    input  logic        ubuf_wr_stall,  // 当拍的 ubuf 写入与 VPU 写回冲突
 
     output logic        icache_en,
     output logic        icache_we,
@@ -45,7 +68,13 @@ module axi_interface (
     localparam ICACHE_BASE  = 16'h2A00;
     localparam ICACHE_END   = 16'h2DFF;
     localparam STATUS_BASE  = 16'h2E00;
-    localparam STATUS_END   = 16'h2E01;
+    localparam STATUS_END   = 16'h2E12;
+    localparam IMEM1_BASE   = 16'h3000;     // input bank 1, 同样交给 ubuf
+    localparam IMEM1_END    = 16'h37FF;
+    localparam PMEM_BASE    = 16'h4000;     // psum 区, 同样交给 ubuf
+    localparam PMEM_END     = 16'h5FFF;
+
+    localparam WIDE_STEP    = AXI_WR_WIDTH / 64;    // 宽写入每拍的字数
 
     localparam TPU_BASE     = 64'h4000_0000;
     localparam TPU_END      = 64'h8000_0000;
@@ -62,18 +91,82 @@ module axi_interface (
         end
     end
 
+    // 突发控制: 首拍直接使用总线上的地址, 其余拍由 burst_addr 产生
+    logic        burst_active;
+    logic [8:0]  burst_left;    // 包括当前拍在内剩余的拍数
+    logic [15:0] burst_addr;    // 当前拍的内部地址
+    logic        burst_we;
+    logic        burst_wide;
+
+    logic        beat_req;      // 当前拍的访问
+    logic        beat_we;
+    logic        beat_wide;
+    logic [15:0] beat_addr;
+    logic        beat_stall;    // 当前拍的写入被反压
+
+    always_comb begin
+        if (burst_active) begin
+            beat_req  = 1'b1;
+            beat_we   = burst_we;
+            beat_wide = burst_wide;
+            beat_addr = burst_addr;
+        end else begin
+            beat_req  = axi_req;
+            beat_we   = axi_we;
+            beat_wide = axi_we && axi_wide;
+            beat_addr = addr_in_TPU;
+        end
+    end
+
+    always_ff @(posedge clk or posedge rst) begin
+        if (rst) begin
+            burst_active <= 1'b0;
+            burst_left   <= 9'b0;
+            burst_addr   <= 16'b0;
+            burst_we     <= 1'b0;
+            burst_wide   <= 1'b0;
+        end else if (burst_active) begin
+            if (!beat_stall) begin
+                burst_addr <= burst_addr + (burst_wide ? 16'(WIDE_STEP) : 16'd1);
+                burst_left <= burst_left - 9'd1;
+                if (burst_left == 9'd1) begin
+                    burst_active <= 1'b0;
+                end
+            end
+        end else if (axi_req && ((axi_len != 8'd0) || beat_stall) && (addr_in_TPU != 16'hFFFF)) begin
+            // 首拍被反压时从首拍重新开始
+            burst_active <= 1'b1;
+            burst_left   <= beat_stall ? 9'(axi_len) + 9'd1 : 9'(axi_len);
+            burst_addr   <= beat_stall ? addr_in_TPU : addr_in_TPU + (beat_wide ? 16'(WIDE_STEP) : 16'd1);
+            burst_we     <= axi_we;
+            burst_wide   <= beat_wide;
+        end
+    end
+
+    assign axi_ready = !burst_active;
+
+    // 写反压: 只有 ubuf 的 input bank / psum 区写入会与 VPU 写回冲突
+    assign beat_stall = beat_req && beat_we && ubuf_wr_stall;
+    assign axi_wready = !beat_stall;
+
     // 写控制
     always_comb begin  // UBUF
         ubuf_en     = 1'b0;
         ubuf_we     = 1'b0;
         ubuf_addr   = 16'b0;
-        ubuf_wdata  = 64'b0;
-        if (axi_req && (addr_in_TPU >= UBUF_BASE) && (addr_in_TPU <= UBUF_END)) begin
+        ubuf_wdata  = '0;
+        ubuf_wide   = 1'b0;
+        ubuf_wstrb  = '0;
+        if (beat_req && (((beat_addr >= UBUF_BASE) && (beat_addr <= UBUF_END)) ||
+                         ((beat_addr >= IMEM1_BASE) && (beat_addr <= IMEM1_END)) ||
+                         ((beat_addr >= PMEM_BASE) && (beat_addr <= PMEM_END)))) begin
             ubuf_en = 1'b1;
-            ubuf_addr = addr_in_TPU - UBUF_BASE;
-            if (axi_we) begin
-                ubuf_we = axi_we;
+            ubuf_addr = beat_addr - UBUF_BASE;
+            if (beat_we) begin
+                ubuf_we = beat_we;
                 ubuf_wdata = axi_wdata;
+                ubuf_wide = beat_wide;
+                ubuf_wstrb = axi_wstrb;
             end
         end
     end
@@ -83,12 +176,12 @@ module axi_interface (
         icache_we       = 1'b0;
         icache_addr     = 16'b0;
         icache_wdata    = 64'b0;
-        if (axi_req && (addr_in_TPU >= ICACHE_BASE) && (addr_in_TPU <= ICACHE_END)) begin
+        if (beat_req && (beat_addr >= ICACHE_BASE) && (beat_addr <= ICACHE_END)) begin
             icache_en = 1'b1;
-            icache_addr = addr_in_TPU - ICACHE_BASE;
-            if (axi_we) begin
-                icache_we = axi_we;
-                icache_wdata = axi_wdata;
+            icache_addr = beat_addr - ICACHE_BASE;
+            if (beat_we) begin
+                icache_we = beat_we;
+                icache_wdata = axi_wdata[63:0];
             end
         end
     end
@@ -99,12 +192,12 @@ module axi_interface (
         status_addr     = 16'b0;
         status_wdata    = 64'b0;
 
-        if (axi_req && (addr_in_TPU >= STATUS_BASE) && (addr_in_TPU <= STATUS_END)) begin
+        if (beat_req && (beat_addr >= STATUS_BASE) && (beat_addr <= STATUS_END)) begin
             status_en = 1'b1;
-            status_addr = addr_in_TPU - STATUS_BASE;
-            if (axi_we) begin
-                status_we = axi_we;
-                status_wdata = axi_wdata;
+            status_addr = beat_addr - STATUS_BASE;
+            if (beat_we) begin
+                status_we = beat_we;
+                status_wdata = axi_wdata[63:0];
             end
         end
     end
@@ -117,16 +210,20 @@ module axi_interface (
     end
 
     always_comb begin
-        axi_req_d = axi_req;
-        axi_we_d = axi_we;
-        addr_in_TPU_d = addr_in_TPU;
+        axi_req_d = beat_req;
+        axi_we_d = beat_we;
+        addr_in_TPU_d = beat_addr;
     end
 
+    assign axi_rvalid = axi_req_q && !axi_we_q;
+
     // 读数据多路选择
     always_comb begin
         axi_rdata = 64'hCA11AB1EBADCAB1E;
         if (axi_req_q && !axi_we_q) begin
-            if ((addr_in_TPU_q >= UBUF_BASE) && (addr_in_TPU_q <= UBUF_END)) begin
+            if (((addr_in_TPU_q >= UBUF_BASE) && (addr_in_TPU_q <= UBUF_END)) ||
+                ((addr_in_TPU_q >= IMEM1_BASE) && (addr_in_TPU_q <= IMEM1_END)) ||
+                ((addr_in_TPU_q >= PMEM_BASE) && (addr_in_TPU_q <= PMEM_END))) begin
                 axi_rdata = ubuf_rdata;
             end
             else if ((addr_in_TPU_q >= STATUS_BASE) && (addr_in_TPU_q <= STATUS_END)) begin
@@ -4,9 +4,12 @@ module control_unit (
     
     input  logic            global_en,
     input  logic            finish_flag,
+    input  logic            job_restart,        // 重新开始作业: PC 回到复位状态
+    input  logic            job_launch,         // 启动作业队列中的作业: 同 job_restart, PC 回到 job_start_pc
+    input  logic  [9:0]     job_start_pc,
     output logic [9:0]      icache_rd_ctrl_addr,
     output logic            icache_rd_ctrl_en,
-    input  logic [53:0]     icache_rd_ctrl_data,
+    input  logic [54:0]     icache_rd_ctrl_data,            // [54] 为循环指令标志
 
     // To UB
     output logic            ub_wr_VPU_en,                   // VPU写入使能
@@ -20,6 +23,8 @@ module control_unit (
     output logic  [3:0]     ub_rd_scale_addr_in,        // VPU scale 读地址
     output logic  [3:0]     ub_rd_bias_addr_in,             // VPU bias 读地址
     output logic  [1:0]     ub_rd_bias_size_in,             // VPU bias 读尺寸
+    output logic  [7:0]     ub_psum_addr_in,                // psum 区的行地址 (存回与加载共用)
+    output logic            ub_wr_psum_en,                  // 请求把 psum cache 的读出存回 psum 区
 
     // To input and weight rearranger
     output logic            sa_input_shift_en,
@@ -42,15 +47,70 @@ module control_unit (
     output logic            ctrl_finish_in
 );
 
+// 循环指令 (icache 读出的 [54] 为 1): 连续发出 [41:32] + 1 条指令, 每条为 [45:42] + 1 拍之前发出的指令
+// 在三个地址字段上加步长 (按字段位宽回绕), 窗口为 1 时即重复上一条, 为 16 时重复最近 16 拍的指令块
+//   [9:0]   input_rd_addr 的步长
+//   [19:10] VPU_wr_addr 的步长
+//   [31:20] weight_rd_addr 的步长
+// 发出期间 PC 保持, 最后一条发出后 PC 加 1; 不占额外的拍, 连续的循环指令接着前面发出的指令继续
+localparam LOOP_WINDOW = 16;
+
+logic           fetch_loop;
+logic [9:0]     loop_last;          // 发出条数 - 1
+logic [3:0]     loop_window;        // 窗口 - 1
+logic [9:0]     loop_iter;          // 当前循环指令已发出的条数
+logic           pc_advance;
+logic [53:0]    history [LOOP_WINDOW-1:0];  // 最近发出的指令, 复位 / 重新开始作业时为 NOP
+logic [3:0]     history_ptr;                // 下一条发出的指令写入的位置, history[history_ptr - 1] 为上一拍发出的
+logic [53:0]    loop_source;
+logic [53:0]    issue_instruction;          // 当拍发出的指令
+
+assign fetch_loop   = icache_rd_ctrl_data[54];
+assign loop_last    = icache_rd_ctrl_data[41:32];
+assign loop_window  = icache_rd_ctrl_data[45:42];
+assign pc_advance   = !fetch_loop || (loop_iter == loop_last);
+assign loop_source  = history[history_ptr - loop_window - 4'h1];
+
+always_comb begin
+    if (fetch_loop) begin
+        issue_instruction           = loop_source;
+        issue_instruction[9:0]      = loop_source[9:0]   + icache_rd_ctrl_data[9:0];
+        issue_instruction[19:10]    = loop_source[19:10] + icache_rd_ctrl_data[19:10];
+        issue_instruction[31:20]    = loop_source[31:20] + icache_rd_ctrl_data[31:20];
+    end else begin
+        issue_instruction           = icache_rd_ctrl_data[53:0];
+    end
+end
+
 // 指令缓存控制
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         icache_rd_ctrl_addr     <= 10'b0;
         icache_rd_ctrl_en       <= 1'b0;
+        loop_iter               <= 10'b0;
+        history_ptr             <= 4'b0;
+        for (int i = 0; i < LOOP_WINDOW; i = i + 1) begin
+            history[i]          <= 54'b0;
+        end
     end else begin
-        if (global_en && !ctrl_finish_in) begin
-            icache_rd_ctrl_addr <= icache_rd_ctrl_addr + 10'h1;
+        if (job_restart || job_launch) begin
+            icache_rd_ctrl_addr <= job_launch ? job_start_pc : 10'b0;
+            icache_rd_ctrl_en   <= 1'b0;
+            loop_iter           <= 10'b0;
+            history_ptr         <= 4'b0;
+            for (int i = 0; i < LOOP_WINDOW; i = i + 1) begin
+                history[i]      <= 54'b0;
+            end
+        end else if (global_en && !ctrl_finish_in) begin
+            if (pc_advance) begin
+                icache_rd_ctrl_addr <= icache_rd_ctrl_addr + 10'h1;
+                loop_iter           <= 10'b0;
+            end else begin
+                loop_iter           <= loop_iter + 10'h1;
+            end
             icache_rd_ctrl_en   <= 1'b1;
+            history[history_ptr] <= issue_instruction;
+            history_ptr         <= history_ptr + 4'h1;
         end
     end
 end
@@ -58,7 +118,7 @@ end
 // 指令 decode
 logic [53:0] tpu_instrcuction;
 
-assign tpu_instrcuction = (finish_flag) ? 54'h20_0000_0000_0000 : icache_rd_ctrl_data;
+assign tpu_instrcuction = (finish_flag) ? 54'h20_0000_0000_0000 : issue_instruction;
 
 logic [9:0]     ins_input_rd_addr;
 logic [9:0]     ins_VPU_wr_addr;
@@ -107,6 +167,10 @@ assign ub_rd_bias_size_in   = ins_VPU_en_size;
 assign ub_wr_VPU_en         = (ins_VPU_en_size != 2'b00);
 assign ub_wr_VPU_addr_in    = ins_VPU_wr_addr;
 assign ub_wr_VPU_size_in    = ins_VPU_en_size;
+// psum 区: 地址复用 VPU 写回地址的低 8 位 (存回 / 加载的拍不写回 input);
+// MODE_OUTPUT 逐项输出期间 mode_select 保持为 MODE_OUTPUT 时存回, MODE_LOAD 期间按该地址加载
+assign ub_psum_addr_in      = ins_VPU_wr_addr[7:0];
+assign ub_wr_psum_en        = (ins_vpu_mode_select == 2'b11) && !ins_vpu_psum_clear;
 
 // SA 输入重组控制
 assign sa_input_shift_en    = (ins_sa_en_size != 2'b00);
@@ -1,5 +1,5 @@
 module instruction_cache #(
-    parameter INS_LEN   = 54
+    parameter INS_LEN   = 55
 ) (
     // AXI 端口
     input  logic        clk,
@@ -18,11 +18,11 @@ module instruction_cache #(
 
 
 // ============================================================================
-// Instruction存储阵列 : 1024 × 54bit, 1个写入端口(AXI), 1个读出端口(ctrl)
+// Instruction存储阵列 : 1024 × 55bit, 1个写入端口(AXI), 1个读出端口(ctrl)
 // ============================================================================
 // AXI 总线的写入位宽: 64 bits/cycle
-// Ctrl 读出位宽: 54bit(暂定)
-// 故采用每行 54 bit 存储
+// Ctrl 读出位宽: 55bit (54 位指令 + 第 54 位的循环指令标志)
+// 故采用每行 55 bit 存储; 54 位的 ins.txt 仍可直接 $readmemb, 高位为 0
 logic [INS_LEN-1:0] ins_memory [1023:0];
 
     
@@ -31,11 +31,24 @@ logic [INS_LEN-1:0] ins_memory [1023:0];
 logic [9:0]    axi_insmem_wr_row;
 
 assign axi_insmem_wr_row = axi_icache_addr[9:0];
-            
+
+`ifdef LOAD_TXT
+// +INS_BIN=<path> 指定 $readmemb 格式的指令文件, +INS_HEX=<path> 指定 $readmemh 格式的指令文件
+// 均未指定时使用 ../instruction/ins.txt
+string          ins_file;
+`endif
+
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         `ifdef LOAD_TXT
-            $readmemb("../instruction/ins.txt", ins_memory);
+            if ($value$plusargs("INS_HEX=%s", ins_file)) begin
+                $readmemh(ins_file, ins_memory);
+            end else begin
+                if (!$value$plusargs("INS_BIN=%s", ins_file)) begin
+                    ins_file = "../instruction/ins.txt";
+                end
+                $readmemb(ins_file, ins_memory);
+            end
         `else
             for (int i = 0; i < 1024; i = i + 1) begin
                 ins_memory[i] <= 'b0;
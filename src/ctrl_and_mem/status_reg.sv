@@ -13,27 +13,239 @@ module status_reg (
 	// ==================== 控制接口 ====================
 	input  logic		ctrl_finish_in,
 
+	// ==================== 性能计数事件 ====================
+	input  logic		perf_sa_valid_in,		// 阵列输入有效
+	input  logic		perf_sa_enable [3:0],	// 各阵列使能
+	input  logic		perf_weight_load,		// 权重加载
+	input  logic		perf_vpu_wr,			// VPU 写回
+	input  logic		perf_axi_rd,			// AXI 读 (TPU 地址范围内)
+	input  logic		perf_axi_wr,			// AXI 写 (TPU 地址范围内)
+	input  logic		perf_ub_conflict,		// AXI 写入与 VPU 写回冲突 (AXI 被反压)
+
 	// ==================== 输出接口 ====================
     output logic 		global_en,
-	output logic 		finish_flag
+	output logic 		finish_flag,
+	output logic 		finish_irq,		// finish 中断, 与 finish_flag 同拍置位
+	output logic		job_restart,	// finish 后再次写 EN = 1: 清除 finish, control_unit 从第 0 条指令重新执行
+	output logic		job_launch,		// 从作业队列启动作业: control_unit 从 job_start_pc 开始执行
+	output logic [9:0]	job_start_pc,
+	output logic		input_bank		// 阵列读出与 VPU 写入使用的 input bank
 );
 
 localparam ADDR_REG_EN    	= 16'h0000;
 localparam ADDR_REG_FINISH	= 16'h0001;
+localparam ADDR_REG_IRQ		= 16'h0002;	// bit0: finish 中断挂起, 写 1 清零 (W1C)
+localparam ADDR_REG_IRQ_CTRL	= 16'h0003;	// bit0: 中断使能 (复位为 1), bit1: 0 电平 / 1 单拍脉冲
+localparam ADDR_REG_PERF_CTRL	= 16'h0004;	// 写 bit0: 快照, bit1: 计数清零 (同时写时先快照后清零)
+localparam ADDR_REG_BANK		= 16'h0005;	// bit0: 作业使用的 input bank, 作业运行期间 (EN 且未 finish) 写入无效
+localparam ADDR_REG_QUEUE	= 16'h0006;	// 写: 作业入队, [9:0] 入口 PC, [31:16] job_id, [32] input bank; 队列满时写入被丢弃
+										// 读: [7:0] 待执行的作业数, [15:8] 完成队列中的条目数, [16] 作业队列满
+localparam ADDR_REG_DONE		= 16'h0007;	// 读出并弹出完成队列的队首: [15:0] job_id, [47:16] 作业的拍数, [63] 有效
+localparam QUEUE_DEPTH		= 8;
+localparam ADDR_REG_PERF_BASE	= 16'h0008;	// 64 位计数器快照, 只读, 依次为:
+// 0 busy     使能且未 finish 的拍数
+// 1 sa_valid 阵列输入有效的拍数
+// 2~5 sa_enable[0]~[3] 各阵列使能的拍数
+// 6 weight   权重加载的拍数
+// 7 vpu_wr   VPU 写回的拍数
+// 8 axi_rd   AXI 读次数
+// 9 axi_wr   AXI 写次数 (被反压的拍不计)
+// 10 ub_conflict  AXI 写入 input bank 与 VPU 写回冲突、AXI 被反压的拍数
+localparam PERF_NUM			= 11;
 
 logic reg_global_en;	// AXI 只写寄存器
 logic reg_finish;		// AXI 只读寄存器
+logic reg_irq_pending;	// AXI 读 / 写 1 清零
+logic reg_irq_en;		// AXI 读写寄存器
+logic reg_irq_edge;		// AXI 读写寄存器
+logic reg_input_bank;	// AXI 读写寄存器
+logic irq_pulse;
+
+logic job_done;
+logic finish_rise;
+logic irq_clear;
+logic en_write;
+
+// 作业的 finish 指令: 队列中还有作业时直接启动下一个 (finish 不置位), 否则 finish 置位
+assign job_done		= ctrl_finish_in && !reg_finish;
+assign finish_rise	= job_done && !job_launch;
+assign irq_clear	= axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_IRQ) && axi_status_wdata[0];
+assign en_write		= axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_EN);
+assign job_restart	= en_write && axi_status_wdata[0] && reg_finish;
+
+// ============================================================================
+// 作业队列: 主机写 ADDR_REG_QUEUE 入队 (入口 PC, job_id, input bank), TPU 空闲 (未启动过或已 finish) 时
+// 或当前作业 finish 的同拍取出队首启动, control_unit 从入口 PC 开始执行 (与从第 0 条开始时相同, 第一拍为 NOP),
+// 连续的作业之间只有这一拍的开销; 队列中启动的作业结束时把 (job_id, 拍数) 写入完成队列, 由主机读 ADDR_REG_DONE 取回
+// 完成队列为每个启动的作业预留一项, 完成队列满时不再启动新作业 (finish 置位, 主机取走完成项后继续)
+// ============================================================================
+logic [9:0]		cmd_pc   [QUEUE_DEPTH-1:0];
+logic [15:0]	cmd_id   [QUEUE_DEPTH-1:0];
+logic			cmd_bank [QUEUE_DEPTH-1:0];
+logic [2:0]		cmd_rd_ptr, cmd_wr_ptr;
+logic [3:0]		cmd_count;
+logic			cmd_push;
+
+logic [15:0]	done_id     [QUEUE_DEPTH-1:0];
+logic [31:0]	done_cycles [QUEUE_DEPTH-1:0];
+logic [2:0]		done_rd_ptr, done_wr_ptr;
+logic [3:0]		done_count;
+logic			done_push;
+logic			done_pop;
+logic [63:0]	done_rdata_q;
+
+logic			reg_started;	// 复位后是否启动过作业
+logic			reg_job_queued;	// 当前作业由队列启动
+logic [15:0]	reg_job_id;
+logic [31:0]	reg_job_cycles;	// 当前作业已运行的拍数
+
+assign cmd_push		= axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_QUEUE) && (cmd_count != QUEUE_DEPTH);
+assign done_push	= job_done && reg_job_queued;
+assign done_pop		= axi_status_en && !axi_status_we && (axi_status_addr == ADDR_REG_DONE) && (done_count != 0);
+assign job_launch	= (cmd_count != 0) && (done_count + 4'(done_push) < QUEUE_DEPTH) && !en_write &&
+					  (!reg_started || reg_finish || job_done);
+assign job_start_pc	= cmd_pc[cmd_rd_ptr];
+
+always_ff @(posedge clk or posedge rst) begin
+	if (rst) begin
+		for (int i = 0; i < QUEUE_DEPTH; i++) begin
+			cmd_pc[i]		<= 10'b0;
+			cmd_id[i]		<= 16'b0;
+			cmd_bank[i]		<= 1'b0;
+			done_id[i]		<= 16'b0;
+			done_cycles[i]	<= 32'b0;
+		end
+		cmd_rd_ptr		<= 3'b0;
+		cmd_wr_ptr		<= 3'b0;
+		cmd_count		<= 4'b0;
+		done_rd_ptr		<= 3'b0;
+		done_wr_ptr		<= 3'b0;
+		done_count		<= 4'b0;
+		done_rdata_q	<= 64'b0;
+		reg_started		<= 1'b0;
+		reg_job_queued	<= 1'b0;
+		reg_job_id		<= 16'b0;
+		reg_job_cycles	<= 32'b0;
+	end else begin
+		if (cmd_push) begin
+			cmd_pc[cmd_wr_ptr]		<= axi_status_wdata[9:0];
+			cmd_id[cmd_wr_ptr]		<= axi_status_wdata[31:16];
+			cmd_bank[cmd_wr_ptr]	<= axi_status_wdata[32];
+			cmd_wr_ptr				<= cmd_wr_ptr + 3'h1;
+		end
+		if (job_launch) begin
+			cmd_rd_ptr		<= cmd_rd_ptr + 3'h1;
+		end
+		cmd_count		<= cmd_count + 4'(cmd_push) - 4'(job_launch);
+
+		if (done_push) begin
+			done_id[done_wr_ptr]		<= reg_job_id;
+			done_cycles[done_wr_ptr]	<= reg_job_cycles + 32'h1;
+			done_wr_ptr					<= done_wr_ptr + 3'h1;
+		end
+		if (done_pop) begin
+			done_rd_ptr		<= done_rd_ptr + 3'h1;
+		end
+		done_count		<= done_count + 4'(done_push) - 4'(done_pop);
+		// 读出与弹出同拍, 读数据在下一拍给出
+		done_rdata_q	<= done_pop ? {1'b1, 15'b0, done_cycles[done_rd_ptr], done_id[done_rd_ptr]} : 64'b0;
+
+		if (job_launch) begin
+			reg_started		<= 1'b1;
+			reg_job_queued	<= 1'b1;
+			reg_job_id		<= cmd_id[cmd_rd_ptr];
+			reg_job_cycles	<= 32'b0;
+		end else begin
+			if (en_write && axi_status_wdata[0]) begin
+				reg_started		<= 1'b1;
+			end
+			if (job_restart) begin
+				reg_job_queued	<= 1'b0;
+			end
+			if (reg_global_en && !reg_finish) begin
+				reg_job_cycles	<= reg_job_cycles + 32'h1;
+			end
+		end
+	end
+end
 
 always_ff @(posedge clk or posedge rst) begin
 	if (rst) begin
 		reg_global_en	<= 1'b0;
 		reg_finish		<= 1'b0;
+		reg_irq_pending	<= 1'b0;
+		reg_irq_en		<= 1'b1;
+		reg_irq_edge	<= 1'b0;
+		reg_input_bank	<= 1'b0;
+		irq_pulse		<= 1'b0;
 	end else begin
-		if(axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_EN)) begin
+		if(en_write) begin
 			reg_global_en	<= axi_status_wdata[0];
+		end else if (job_launch) begin
+			reg_global_en	<= 1'b1;
+		end
+		if(axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_IRQ_CTRL)) begin
+			reg_irq_en		<= axi_status_wdata[0];
+			reg_irq_edge	<= axi_status_wdata[1];
 		end
+		if (job_launch) begin
+			reg_input_bank	<= cmd_bank[cmd_rd_ptr];
+		end else if(axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_BANK) && !(reg_global_en && !reg_finish)) begin
+			reg_input_bank	<= axi_status_wdata[0];
+		end
+
+		reg_finish		<= (job_restart || job_launch) ? 1'b0 : ctrl_finish_in;
+
+		// finish 上升沿置位挂起, 同拍的清零请求让位于置位
+		if (finish_rise) begin
+			reg_irq_pending	<= 1'b1;
+		end else if (irq_clear) begin
+			reg_irq_pending	<= 1'b0;
+		end
+		irq_pulse		<= finish_rise && reg_irq_en;
+	end
+end
 
-		reg_finish		<= ctrl_finish_in;
+assign finish_irq = reg_irq_edge ? irq_pulse : (reg_irq_pending && reg_irq_en);
+
+// ============================================================================
+// 性能计数器: 计数器持续累加, AXI 读出的是快照; finish 上升沿自动快照, 使每个作业的计数一致
+// ============================================================================
+logic			perf_event [PERF_NUM-1:0];
+logic [63:0]	perf_cnt [PERF_NUM-1:0];
+logic [63:0]	perf_snap [PERF_NUM-1:0];
+logic			perf_snapshot;
+logic			perf_clear;
+
+assign perf_event[0] = reg_global_en && !reg_finish;
+assign perf_event[1] = perf_sa_valid_in;
+assign perf_event[2] = perf_sa_enable[0];
+assign perf_event[3] = perf_sa_enable[1];
+assign perf_event[4] = perf_sa_enable[2];
+assign perf_event[5] = perf_sa_enable[3];
+assign perf_event[6] = perf_weight_load;
+assign perf_event[7] = perf_vpu_wr;
+assign perf_event[8] = perf_axi_rd;
+assign perf_event[9] = perf_axi_wr;
+assign perf_event[10] = perf_ub_conflict;
+
+assign perf_snapshot = finish_rise ||
+	(axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_PERF_CTRL) && axi_status_wdata[0]);
+assign perf_clear = axi_status_en && axi_status_we && (axi_status_addr == ADDR_REG_PERF_CTRL) && axi_status_wdata[1];
+
+always_ff @(posedge clk or posedge rst) begin
+	if (rst) begin
+		for (int i = 0; i < PERF_NUM; i++) begin
+			perf_cnt[i]		<= 64'b0;
+			perf_snap[i]	<= 64'b0;
+		end
+	end else begin
+		for (int i = 0; i < PERF_NUM; i++) begin
+			if (perf_snapshot) begin
+				perf_snap[i]	<= perf_cnt[i] + 64'(perf_event[i]);
+			end
+			perf_cnt[i]		<= perf_clear ? 64'b0 : perf_cnt[i] + 64'(perf_event[i]);
+		end
 	end
 end
 
@@ -61,7 +273,18 @@ always_comb begin
         case (axi_status_addr_q)
             ADDR_REG_EN:     axi_status_rdata = {63'b0, reg_global_en};
             ADDR_REG_FINISH: axi_status_rdata = {63'b0, reg_finish};
-            default:         axi_status_rdata = 64'b0;
+            ADDR_REG_IRQ:    axi_status_rdata = {63'b0, reg_irq_pending};
+            ADDR_REG_IRQ_CTRL: axi_status_rdata = {62'b0, reg_irq_edge, reg_irq_en};
+            ADDR_REG_BANK:   axi_status_rdata = {63'b0, reg_input_bank};
+            ADDR_REG_QUEUE:  axi_status_rdata = {47'b0, cmd_count == QUEUE_DEPTH, 4'b0, done_count, 4'b0, cmd_count};
+            ADDR_REG_DONE:   axi_status_rdata = done_rdata_q;
+            default: begin
+                if ((axi_status_addr_q >= ADDR_REG_PERF_BASE) && (axi_status_addr_q < ADDR_REG_PERF_BASE + PERF_NUM)) begin
+                    axi_status_rdata = perf_snap[axi_status_addr_q - ADDR_REG_PERF_BASE];
+                end else begin
+                    axi_status_rdata = 64'b0;
+                end
+            end
         endcase
     end else begin
         axi_status_rdata = 64'b0;
@@ -69,5 +292,6 @@ always_comb begin
 end
 
 assign finish_flag = reg_finish;
+assign input_bank = reg_input_bank;
 
 endmodule
\ No newline at end of file
@@ -1,4 +1,6 @@
-module unified_buffer (
+module unified_buffer #(
+    parameter AXI_WR_WIDTH = 512        // AXI 宽写入端口位宽: 128 / 256 / 512
+) (
     // 时钟和复位
     input  logic        clk,
     input  logic        rst,
@@ -7,10 +9,14 @@ module unified_buffer (
     input  logic        axi_ubuf_en,
     input  logic        axi_ubuf_we,
     input  logic [15:0] axi_ubuf_addr,
-    input  logic [63:0] axi_ubuf_wdata,
+    input  logic [AXI_WR_WIDTH-1:0]   axi_ubuf_wdata,   // 窄写入只使用低 64 位
+    input  logic                      axi_ubuf_wide,    // 1: 宽写入, 一拍写 AXI_WR_WIDTH 位
+    input  logic [AXI_WR_WIDTH/8-1:0] axi_ubuf_wstrb,   // 宽写入的字节写使能
     output logic [63:0] axi_ubuf_rdata,
+    output logic        axi_ubuf_wr_stall,                // AXI 写入与 VPU 写回同拍访问同一 input bank, 本拍 AXI 写入未完成
     
     // ==================== Input存储接口 ====================
+    input  logic        input_bank,                     // 阵列读出与 VPU 写入使用的 bank (0: input_memory, 1: input_memory_b1)
     // 额外写入端口
     input  logic        ub_wr_VPU_en,                   // VPU写入使能
     input  logic [9:0]  ub_wr_VPU_addr_in,              // VPU写入地址
@@ -35,7 +41,13 @@ module unified_buffer (
     output logic [31:0] ub_rd_scale_data_out,   // VPU scale 读数据
     input  logic [3:0]  ub_rd_bias_addr_in,             // VPU bias 读地址
     input  logic [1:0]  ub_rd_bias_size_in,             // VPU bias 尺寸
-    output logic [31:0] ub_rd_bias_data_out[3:0][15:0]  // VPU bias 读数据
+    output logic [31:0] ub_rd_bias_data_out[3:0][15:0], // VPU bias 读数据
+
+    // ==================== Psum存储接口 ====================
+    input  logic        ub_wr_psum_en,                      // psum cache 读出存回使能
+    input  logic [7:0]  ub_psum_addr_in,                    // psum 区行地址 (存回与加载共用)
+    input  logic [31:0] ub_wr_psum_data_in  [3:0][15:0],    // psum cache 的逐项读出
+    output logic [31:0] ub_rd_psum_data_out [3:0][15:0]     // 加载到 psum cache 的数据
 );
 
 
@@ -48,6 +60,36 @@ localparam IMEM_BASE    = 20'h2000;
 localparam IMEM_END     = 20'h27FF;
 localparam MMEM_BASE    = 20'h2800;
 localparam MMEM_END     = 20'h29FF;
+localparam IMEM1_BASE   = 20'h3000;     // input bank 1
+localparam IMEM1_END    = 20'h37FF;
+localparam PMEM_BASE    = 20'h4000;     // psum 区
+localparam PMEM_END     = 20'h5FFF;
+
+// ============================================================================
+// AXI 写入数据对齐: 窄写入 (64 bit) 与宽写入统一为一个 AXI_WR_WIDTH 位的写入槽与字节写使能
+// 槽 s 覆盖行内第 s*LANES ~ s*LANES+LANES-1 个 64 位字, 第 l 个字位于槽内 [l*64 +: 64]
+// ============================================================================
+localparam AXI_WR_LANES = AXI_WR_WIDTH / 64;
+localparam AXI_WR_BYTES = AXI_WR_WIDTH / 8;
+localparam AXI_LANE_BITS = $clog2(AXI_WR_LANES);
+// 槽号为行内字偏移去掉低 AXI_LANE_BITS 位: input / weight 每行 8 个字, misc / psum 每行 32 个字
+// 512 bit 宽写入时 input / weight 每行只有一个槽, 槽号恒为 0 (槽号位宽至少取 1 位)
+localparam ROW_SLOT_BITS  = 3 - AXI_LANE_BITS;     // input / weight: 512 / 256 / 128 bit 时为 0 / 1 / 2
+localparam ROW_SLOT_W     = (ROW_SLOT_BITS > 0) ? ROW_SLOT_BITS : 1;
+localparam WIDE_SLOT_BITS = 5 - AXI_LANE_BITS;     // misc / psum:    512 / 256 / 128 bit 时为 2 / 3 / 4
+
+logic [AXI_WR_WIDTH-1:0]    axi_wr_data;
+logic [AXI_WR_BYTES-1:0]    axi_wr_strb;
+
+always_comb begin
+    if (axi_ubuf_wide) begin
+        axi_wr_data = axi_ubuf_wdata;
+        axi_wr_strb = axi_ubuf_wstrb;
+    end else begin
+        axi_wr_data = {AXI_WR_LANES{axi_ubuf_wdata[63:0]}};
+        axi_wr_strb = {{(AXI_WR_BYTES-8){1'b0}}, 8'hFF} << (axi_ubuf_addr[AXI_LANE_BITS-1:0] * 8);
+    end
+end
 
 // ============================================================================
 // AXI 地址转为三块存储阵列内部地址
@@ -58,6 +100,8 @@ logic [12:0]    axi_wmem_wr_addr;
 logic [12:0]    axi_wmem_rd_addr;
 logic [8:0]     axi_mmem_wr_addr;
 logic [8:0]     axi_mmem_rd_addr;
+logic [12:0]    axi_pmem_wr_addr;
+logic [12:0]    axi_pmem_rd_addr;
 
 assign axi_imem_wr_addr = axi_ubuf_addr[10:0];
 assign axi_imem_rd_addr = axi_ubuf_addr[10:0];
@@ -65,6 +109,8 @@ assign axi_wmem_wr_addr = axi_ubuf_addr[12:0];
 assign axi_wmem_rd_addr = axi_ubuf_addr[12:0];
 assign axi_mmem_wr_addr = axi_ubuf_addr[8:0];
 assign axi_mmem_rd_addr = axi_ubuf_addr[8:0];
+assign axi_pmem_wr_addr = axi_ubuf_addr[12:0];
+assign axi_pmem_rd_addr = axi_ubuf_addr[12:0];
 
 logic axi_imem_wr_en;
 logic axi_imem_rd_en_d, axi_imem_rd_en_q;
@@ -72,6 +118,10 @@ logic axi_wmem_wr_en;
 logic axi_wmem_rd_en_d, axi_wmem_rd_en_q;
 logic axi_mmem_wr_en;
 logic axi_mmem_rd_en_d, axi_mmem_rd_en_q;
+logic axi_imem1_wr_en;
+logic axi_imem1_rd_en_d, axi_imem1_rd_en_q;
+logic axi_pmem_wr_en;
+logic axi_pmem_rd_en_d, axi_pmem_rd_en_q;
 
 assign axi_imem_wr_en = ((axi_ubuf_addr >= IMEM_BASE) && (axi_ubuf_addr <= IMEM_END)) && axi_ubuf_en && axi_ubuf_we;
 assign axi_imem_rd_en_d = ((axi_ubuf_addr >= IMEM_BASE) && (axi_ubuf_addr <= IMEM_END)) && axi_ubuf_en && (!axi_ubuf_we);
@@ -79,16 +129,24 @@ assign axi_wmem_wr_en = ((axi_ubuf_addr >= WMEM_BASE) && (axi_ubuf_addr <= WMEM_
 assign axi_wmem_rd_en_d = ((axi_ubuf_addr >= WMEM_BASE) && (axi_ubuf_addr <= WMEM_END)) && axi_ubuf_en && (!axi_ubuf_we);
 assign axi_mmem_wr_en = ((axi_ubuf_addr >= MMEM_BASE) && (axi_ubuf_addr <= MMEM_END)) && axi_ubuf_en && axi_ubuf_we;
 assign axi_mmem_rd_en_d = ((axi_ubuf_addr >= MMEM_BASE) && (axi_ubuf_addr <= MMEM_END)) && axi_ubuf_en && (!axi_ubuf_we);
+assign axi_imem1_wr_en = ((axi_ubuf_addr >= IMEM1_BASE) && (axi_ubuf_addr <= IMEM1_END)) && axi_ubuf_en && axi_ubuf_we;
+assign axi_imem1_rd_en_d = ((axi_ubuf_addr >= IMEM1_BASE) && (axi_ubuf_addr <= IMEM1_END)) && axi_ubuf_en && (!axi_ubuf_we);
+assign axi_pmem_wr_en = ((axi_ubuf_addr >= PMEM_BASE) && (axi_ubuf_addr <= PMEM_END)) && axi_ubuf_en && axi_ubuf_we;
+assign axi_pmem_rd_en_d = ((axi_ubuf_addr >= PMEM_BASE) && (axi_ubuf_addr <= PMEM_END)) && axi_ubuf_en && (!axi_ubuf_we);
 
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         axi_imem_rd_en_q <= 1'b0;
         axi_wmem_rd_en_q <= 1'b0;
         axi_mmem_rd_en_q <= 1'b0;
+        axi_imem1_rd_en_q <= 1'b0;
+        axi_pmem_rd_en_q <= 1'b0;
     end else begin
         axi_imem_rd_en_q <= axi_imem_rd_en_d;
         axi_wmem_rd_en_q <= axi_wmem_rd_en_d;
         axi_mmem_rd_en_q <= axi_mmem_rd_en_d;
+        axi_imem1_rd_en_q <= axi_imem1_rd_en_d;
+        axi_pmem_rd_en_q <= axi_pmem_rd_en_d;
     end
 end
 
@@ -97,21 +155,44 @@ end
 // ============================================================================
 // Input 存储阵列 : 256 × 512bit, 2个写入端口(AXI,VPU), 2个读出端口(AXI,sa)
 // ============================================================================
-// AXI 总线的写入位宽: 64 bits/cycle
+// AXI 总线的写入位宽: 64 bits/cycle, 宽写入 AXI_WR_WIDTH bits/cycle
 // VPU 的最小写入位宽: 16col × 8bit = 128 bits/cycle
 // VPU 的最大写入位宽: 16col × 8bit × 4array = 512 bits/cycle
 // AXI 总线的读出位宽: 64 bits/cycle
 // SA 的读出位宽: 16col × 8bit = 128 bits/cycle
 // 故采用每行 512 bit 存储
+//
+// 乒乓双缓冲: input_memory (bank 0, AXI 0x2000~0x27FF) 与 input_memory_b1 (bank 1, AXI 0x3000~0x37FF)
+// 阵列读出与 VPU 写入只访问 input_bank 选中的 bank, 主机可以同时经 AXI 读写另一个 bank;
+// 每个 bank 每拍只有一个写入: 同一 bank 上 AXI 写入与 VPU 写回同拍时 VPU 优先 (VPU 流水线不能停顿),
+// AXI 写入不生效并置位 axi_ubuf_wr_stall, 由 axi_interface 反压主机 (axi_wready = 0) 在下一拍重试;
+// psum 区的 AXI 写入与 psum 存回同拍时同样处理
 
 logic [511:0] input_memory [255:0];
+logic [511:0] input_memory_b1 [255:0];
+
+logic           vpu_imem0_wr_en;        // VPU 写回 bank 0 / bank 1
+logic           vpu_imem1_wr_en;
+
+assign vpu_imem0_wr_en   = ub_wr_VPU_en && !input_bank;
+assign vpu_imem1_wr_en   = ub_wr_VPU_en && input_bank;
+assign axi_ubuf_wr_stall = (axi_imem_wr_en && vpu_imem0_wr_en) || (axi_imem1_wr_en && vpu_imem1_wr_en) ||
+                           (axi_pmem_wr_en && ub_wr_psum_en);
 
 // 写入逻辑
 logic [7:0]     axi_imem_wr_row;        // 解析AXI写地址到input存储坐标
 logic [2:0]     axi_imem_wr_inrow_offset;
+logic [ROW_SLOT_W-1:0] axi_imem_wr_slot;    // 行内的宽写入槽
 
 assign axi_imem_wr_row          = axi_imem_wr_addr[10:3];
 assign axi_imem_wr_inrow_offset = axi_imem_wr_addr[2:0];
+generate
+    if (ROW_SLOT_BITS == 0) begin : gen_imem_one_slot
+        assign axi_imem_wr_slot = '0;
+    end else begin : gen_imem_slots
+        assign axi_imem_wr_slot = axi_imem_wr_inrow_offset[2:AXI_LANE_BITS];
+    end
+endgenerate
 
 logic [7:0]     vpu_imem_wr_row;        // 解析VPU写地址到input存储坐标
 logic [2:0]     vpu_imem_wr_inrow_offset_128;
@@ -150,20 +231,25 @@ generate
     end
 endgenerate
 
-            
+
+`ifdef LOAD_TXT
+string          input_hex_file;     // +INPUT_HEX=<path> 指定 input_memory 镜像, 缺省为 ../data/input_hex.txt
+`endif
+
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         `ifdef LOAD_TXT
-            $readmemh("../data/input_hex.txt", input_memory);
+            if (!$value$plusargs("INPUT_HEX=%s", input_hex_file)) begin
+                input_hex_file = "../data/input_hex.txt";
+            end
+            $readmemh(input_hex_file, input_memory);
         `else
             for (int i= 0; i < 256; i=i+1) begin
                 input_memory[i] <= 512'b0;
             end
         `endif
     end else begin
-        if (axi_imem_wr_en) begin       // AXI 写入逻辑
-            input_memory[axi_imem_wr_row][axi_imem_wr_inrow_offset*64 +: 64] <= axi_ubuf_wdata;
-        end else if(ub_wr_VPU_en) begin      // VPU 写入逻辑
+        if (vpu_imem0_wr_en) begin      // VPU 写入逻辑
             case (ub_wr_VPU_size_in)
                 2'b01: begin
                     input_memory[vpu_imem_wr_row][vpu_imem_wr_inrow_offset_128*128 +: 128] <= ub_wr_VPU_data_in_128_temp;
@@ -177,6 +263,43 @@ always_ff @(posedge clk or posedge rst) begin
                     input_memory[vpu_imem_wr_row] <= ub_wr_VPU_data_in_512_temp;
                 end
             endcase
+        end else if (axi_imem_wr_en) begin       // AXI 写入逻辑
+            for (int b = 0; b < AXI_WR_BYTES; b++) begin
+                if (axi_wr_strb[b]) begin
+                    input_memory[axi_imem_wr_row][axi_imem_wr_slot*AXI_WR_WIDTH + b*8 +: 8] <= axi_wr_data[b*8 +: 8];
+                end
+            end
+        end
+    end
+end
+
+// bank 1: 写入逻辑与 bank 0 相同, 复位后为 0
+always_ff @(posedge clk or posedge rst) begin
+    if (rst) begin
+        for (int i= 0; i < 256; i=i+1) begin
+            input_memory_b1[i] <= 512'b0;
+        end
+    end else begin
+        if (vpu_imem1_wr_en) begin
+            case (ub_wr_VPU_size_in)
+                2'b01: begin
+                    input_memory_b1[vpu_imem_wr_row][vpu_imem_wr_inrow_offset_128*128 +: 128] <= ub_wr_VPU_data_in_128_temp;
+                end
+
+                2'b10: begin
+                    input_memory_b1[vpu_imem_wr_row][vpu_imem_wr_inrow_offset_256*256 +: 256] <= ub_wr_VPU_data_in_256_temp;
+                end
+
+                2'b11: begin
+                    input_memory_b1[vpu_imem_wr_row] <= ub_wr_VPU_data_in_512_temp;
+                end
+            endcase
+        end else if (axi_imem1_wr_en) begin
+            for (int b = 0; b < AXI_WR_BYTES; b++) begin
+                if (axi_wr_strb[b]) begin
+                    input_memory_b1[axi_imem_wr_row][axi_imem_wr_slot*AXI_WR_WIDTH + b*8 +: 8] <= axi_wr_data[b*8 +: 8];
+                end
+            end
         end
     end
 end
@@ -192,7 +315,9 @@ assign sa_imem_rd_inrow_offset  = ub_rd_input_addr_in[1:0];
 logic [127:0]   ub_rd_input_data_out_temp;   // 用于格式转换
 
 always_comb begin
-    if (ub_rd_input_en) begin
+    if (ub_rd_input_en && input_bank) begin
+        ub_rd_input_data_out_temp = input_memory_b1[sa_imem_rd_row][sa_imem_rd_inrow_offset*128 +: 128];
+    end else if (ub_rd_input_en) begin
         ub_rd_input_data_out_temp = input_memory[sa_imem_rd_row][sa_imem_rd_inrow_offset*128 +: 128];
     end else begin
         ub_rd_input_data_out_temp = 128'b0;
@@ -245,15 +370,14 @@ always_ff @(posedge clk or posedge rst) begin
     end
 end
 
-// VPU 读出逻辑
-// TODO
+// VPU 读出逻辑: psum 的存回与加载使用下文独立的 psum 存储阵列, 不占用 input 的端口
 
 
 
 // ============================================================================
 // Weight存储阵列 : 1024 × 512bit, 1个写入端口(AXI), 1个读出端口(sa)
 // ============================================================================
-// AXI 总线的写入位宽: 64 bits/cycle
+// AXI 总线的写入位宽: 64 bits/cycle, 宽写入 AXI_WR_WIDTH bits/cycle
 // Weight 读出的最小位宽: 16col × 8bit =  128 bits/cycle
 // Weight 读出的最大位宽: 16col × 8bit × 4array = 512 bits/cycle
 // 故采用每行 512 bit 存储
@@ -264,14 +388,29 @@ logic [511:0] weight_memory [1023:0];
 // 解析AXI地址到weight存储坐标
 logic [9:0]     axi_wmem_wr_row;
 logic [2:0]     axi_wmem_inrow_offset;
+logic [ROW_SLOT_W-1:0] axi_wmem_wr_slot;
 
 assign axi_wmem_wr_row          = axi_wmem_wr_addr[12:3];
 assign axi_wmem_inrow_offset    = axi_wmem_wr_addr[2:0];
-            
+generate
+    if (ROW_SLOT_BITS == 0) begin : gen_wmem_one_slot
+        assign axi_wmem_wr_slot = '0;
+    end else begin : gen_wmem_slots
+        assign axi_wmem_wr_slot = axi_wmem_inrow_offset[2:AXI_LANE_BITS];
+    end
+endgenerate
+
+`ifdef LOAD_TXT
+string          weight_hex_file;    // +WEIGHT_HEX=<path> 指定 weight_memory 镜像, 缺省为 ../data/weight_hex.txt
+`endif
+
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         `ifdef LOAD_TXT
-            $readmemh("../data/weight_hex.txt", weight_memory);
+            if (!$value$plusargs("WEIGHT_HEX=%s", weight_hex_file)) begin
+                weight_hex_file = "../data/weight_hex.txt";
+            end
+            $readmemh(weight_hex_file, weight_memory);
         `else
             for (int i= 0; i < 1024; i=i+1) begin
                 weight_memory[i] <= 512'b0;
@@ -279,7 +418,11 @@ always_ff @(posedge clk or posedge rst) begin
         `endif
     end else begin
         if (axi_ubuf_en && axi_ubuf_we && axi_wmem_wr_en) begin
-            weight_memory[axi_wmem_wr_row][axi_wmem_inrow_offset*64 +: 64] <= axi_ubuf_wdata;
+            for (int b = 0; b < AXI_WR_BYTES; b++) begin
+                if (axi_wr_strb[b]) begin
+                    weight_memory[axi_wmem_wr_row][axi_wmem_wr_slot*AXI_WR_WIDTH + b*8 +: 8] <= axi_wr_data[b*8 +: 8];
+                end
+            end
         end
     end
 end
@@ -346,13 +489,22 @@ logic [2047:0] misc_memory [15:0];
 // 解析AXI地址到weight存储坐标
 logic [3:0]     axi_mmem_wr_row;
 logic [4:0]     axi_mmem_inrow_offset;
+logic [WIDE_SLOT_BITS-1:0] axi_mmem_wr_slot;
 
 assign axi_mmem_wr_row          = axi_mmem_wr_addr[8:5];
 assign axi_mmem_inrow_offset    = axi_mmem_wr_addr[4:0];
-            
+assign axi_mmem_wr_slot         = axi_mmem_inrow_offset[4:AXI_LANE_BITS];
+
+`ifdef LOAD_TXT
+string          misc_hex_file;      // +MISC_HEX=<path> 指定 misc_memory 镜像 (由 data/convert_misc.py 生成)
+`endif
+
 always_ff @(posedge clk or posedge rst) begin
     if (rst) begin
         `ifdef LOAD_TXT
+        if ($value$plusargs("MISC_HEX=%s", misc_hex_file)) begin
+            $readmemh(misc_hex_file, misc_memory);
+        end else begin
             // misc_memory[0] <= {
             //     32'sd-112, 32'sd222,   32'sd147,  32'sd1439, 32'sd1406, 32'sd1535, 32'sd1490, 32'sd1498,
             //     32'sd-401, 32'sd2347,  32'sd-16,  32'sd-187, 32'sd2549, 32'sd-176, 32'sd-90,  32'sd64,
@@ -374,16 +526,24 @@ always_ff @(posedge clk or posedge rst) begin
                 32'hfffffe6f, 32'h0000092b, 32'hfffffff0, 32'hffffff45, 32'h000009f5, 32'hffffff50, 32'hffffffa6, 32'h00000040
             };
             misc_memory[1]<={{63{32'b0}},{32'b00111010100101110011110001110101}};
+            for (int i= 2; i < 16; i=i+1) begin
+                misc_memory[i] <= {64{32'b0}};
+            end
+        end
         `else
             misc_memory[0]<=2048'b0;
             misc_memory[1]<={{63{32'b0}},{32'b00111010100101110011110001110101}};
+            for (int i= 2; i < 16; i=i+1) begin
+                misc_memory[i] <= {64{32'b0}};
+            end
         `endif
-        for (int i= 2; i < 16; i=i+1) begin
-            misc_memory[i] <= {64{32'b0}};
-        end
     end else begin
         if (axi_mmem_wr_en) begin
-            misc_memory[axi_mmem_wr_row][axi_mmem_inrow_offset*64 +: 64] <= axi_ubuf_wdata;
+            for (int b = 0; b < AXI_WR_BYTES; b++) begin
+                if (axi_wr_strb[b]) begin
+                    misc_memory[axi_mmem_wr_row][axi_mmem_wr_slot*AXI_WR_WIDTH + b*8 +: 8] <= axi_wr_data[b*8 +: 8];
+                end
+            end
         end
     end
 end
@@ -437,13 +597,90 @@ generate
     end
 endgenerate
 
+// ============================================================================
+// Psum存储阵列 : 256 × 2048bit, 2个写入端口(AXI,VPU), 2个读出端口(AXI,VPU)
+// ============================================================================
+// 用于 psum 的溢出 (spill) 与重新加载: K 方向分段累加时, 一段结束后把 psum cache 存回, 下一段开始前再加载
+// VPU 存回 / 加载的位宽: 4channel × 16col × 32bit = 2048 bits/cycle, 一行对应 psum cache 的一项 (所有 vpe)
+// 行内布局与 misc_memory 的 x4 bias 相同: channel c 位于 [(3-c)*512 +: 512], 列 j 位于其中 [j*32 +: 32]
+// MODE_OUTPUT 逐项输出且 ub_wr_psum_en 时写入 ub_psum_addr_in 行; MODE_LOAD 期间 vpe 读入同一地址的行
+// AXI 总线的写入位宽: 64 bits/cycle, 宽写入 AXI_WR_WIDTH bits/cycle; 复位后为 0, 作业之间保持
+
+logic [2047:0] psum_memory [255:0];
+
+// AXI 写入逻辑
+logic [7:0]     axi_pmem_wr_row;
+logic [4:0]     axi_pmem_inrow_offset;
+logic [WIDE_SLOT_BITS-1:0] axi_pmem_wr_slot;
+
+assign axi_pmem_wr_row          = axi_pmem_wr_addr[12:5];
+assign axi_pmem_inrow_offset    = axi_pmem_wr_addr[4:0];
+assign axi_pmem_wr_slot         = axi_pmem_inrow_offset[4:AXI_LANE_BITS];
+
+logic [2047:0]  ub_wr_psum_data_in_temp;    // 用于格式转换
+
+genvar i_wr_psum, j_wr_psum;
+generate
+    for (i_wr_psum = 0; i_wr_psum < 4; i_wr_psum = i_wr_psum+1) begin
+        for (j_wr_psum = 0; j_wr_psum < 16; j_wr_psum = j_wr_psum+1) begin
+            assign ub_wr_psum_data_in_temp[(3-i_wr_psum)*512 + j_wr_psum*32 +: 32] = ub_wr_psum_data_in[i_wr_psum][j_wr_psum];
+        end
+    end
+endgenerate
+
+always_ff @(posedge clk or posedge rst) begin
+    if (rst) begin
+        for (int i= 0; i < 256; i=i+1) begin
+            psum_memory[i] <= 2048'b0;
+        end
+    end else begin
+        if (ub_wr_psum_en) begin        // VPU 存回优先
+            psum_memory[ub_psum_addr_in] <= ub_wr_psum_data_in_temp;
+        end else if (axi_pmem_wr_en) begin
+            for (int b = 0; b < AXI_WR_BYTES; b++) begin
+                if (axi_wr_strb[b]) begin
+                    psum_memory[axi_pmem_wr_row][axi_pmem_wr_slot*AXI_WR_WIDTH + b*8 +: 8] <= axi_wr_data[b*8 +: 8];
+                end
+            end
+        end
+    end
+end
+
+// 加载读出逻辑
+genvar i_rd_psum, j_rd_psum;
+generate
+    for (i_rd_psum = 0; i_rd_psum < 4; i_rd_psum = i_rd_psum+1) begin
+        for (j_rd_psum = 0; j_rd_psum < 16; j_rd_psum = j_rd_psum+1) begin
+            assign ub_rd_psum_data_out[i_rd_psum][j_rd_psum] = psum_memory[ub_psum_addr_in][(3-i_rd_psum)*512 + j_rd_psum*32 +: 32];
+        end
+    end
+endgenerate
+
+// AXI 读出逻辑 (Psum)
+logic [7:0]     axi_pmem_rd_row_q;
+logic [4:0]     axi_pmem_rd_inrow_offset_q;
+
+always_ff @(posedge clk or posedge rst) begin
+    if (rst) begin
+        axi_pmem_rd_row_q <= '0;
+        axi_pmem_rd_inrow_offset_q <= '0;
+    end else begin
+        axi_pmem_rd_row_q <= axi_pmem_rd_addr[12:5];
+        axi_pmem_rd_inrow_offset_q <= axi_pmem_rd_addr[4:0];
+    end
+end
+
 always_comb begin
     if (axi_imem_rd_en_q) begin
         axi_ubuf_rdata = input_memory[axi_imem_rd_row_q][axi_imem_rd_inrow_offset_q*64 +: 64];
+    end else if (axi_imem1_rd_en_q) begin
+        axi_ubuf_rdata = input_memory_b1[axi_imem_rd_row_q][axi_imem_rd_inrow_offset_q*64 +: 64];
     end else if (axi_wmem_rd_en_q) begin
         axi_ubuf_rdata = weight_memory[axi_wmem_rd_row_q][axi_wmem_rd_inrow_offset_q*64 +: 64];
     end else if (axi_mmem_rd_en_q) begin
         axi_ubuf_rdata = misc_memory[axi_mmem_rd_row_q][axi_mmem_rd_inrow_offset_q*64 +: 64];
+    end else if (axi_pmem_rd_en_q) begin
+        axi_ubuf_rdata = psum_memory[axi_pmem_rd_row_q][axi_pmem_rd_inrow_offset_q*64 +: 64];
     end else begin
         axi_ubuf_rdata = 64'b0;
     end
@@ -22,7 +22,7 @@ module systolic_array
 );
 
     generate
-        for (genvar i = 0; i < 4; i++) begin
+        for (genvar i = 0; i < 4; i++) begin : gen_array
             logic sys_rst;
             assign sys_rst = rst || !sa_enable[i];
             systolic systolic_inst (
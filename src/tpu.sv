@@ -1,4 +1,6 @@
-module tpu (
+module tpu #(
+    parameter AXI_WR_WIDTH = 512    // 宽写入位宽 (128 / 256 / 512), 512 时一拍写入 unified_buffer 的一行
+) (
     // 时钟和复位
     input  logic        clk,
     input  logic        rst,
@@ -7,8 +9,17 @@ module tpu (
     input  logic        axi_req,
     input  logic        axi_we,
     input  logic [63:0] axi_addr,
-    input  logic [63:0] axi_wdata,
-    output logic [63:0] axi_rdata
+    input  logic [AXI_WR_WIDTH-1:0]   axi_wdata,    // 窄写入只使用低 64 位
+    input  logic [AXI_WR_WIDTH/8-1:0] axi_wstrb,    // 宽写入的字节写使能
+    input  logic        axi_wide,       // 1: 宽写入, 每拍写 AXI_WR_WIDTH 位
+    input  logic [7:0]  axi_len,        // 突发拍数 - 1, 0 为单拍
+    output logic [63:0] axi_rdata,
+    output logic        axi_rvalid,
+    output logic        axi_ready,
+    output logic        axi_wready,     // 写数据被接收, 为 0 时主机保持 axi_wdata 重试
+
+    // ==================== 中断 ====================
+    output logic        finish_irq
 );
 
 logic        axi_icache_en;
@@ -20,8 +31,11 @@ logic [63:0] axi_icache_rdata;
 logic        axi_ubuf_en;
 logic        axi_ubuf_we;
 logic [15:0] axi_ubuf_addr;
-logic [63:0] axi_ubuf_wdata;
+logic [AXI_WR_WIDTH-1:0]   axi_ubuf_wdata;
+logic                      axi_ubuf_wide;
+logic [AXI_WR_WIDTH/8-1:0] axi_ubuf_wstrb;
 logic [63:0] axi_ubuf_rdata;
+logic        axi_ubuf_wr_stall;
 
 logic        axi_status_en;
 logic        axi_status_we;
@@ -29,7 +43,9 @@ logic [15:0] axi_status_addr;
 logic [63:0] axi_status_wdata;
 logic [63:0] axi_status_rdata;
 
-axi_interface u_axi_interface (
+axi_interface #(
+    .AXI_WR_WIDTH   (AXI_WR_WIDTH)
+) u_axi_interface (
     .clk    (clk),
     .rst    (rst),
 
@@ -38,7 +54,13 @@ axi_interface u_axi_interface (
     .axi_we     (axi_we   ),
     .axi_addr   (axi_addr ),
     .axi_wdata  (axi_wdata),
+    .axi_wstrb  (axi_wstrb),
+    .axi_wide   (axi_wide ),
+    .axi_len    (axi_len  ),
     .axi_rdata  (axi_rdata),
+    .axi_rvalid (axi_rvalid),
+    .axi_ready  (axi_ready),
+    .axi_wready (axi_wready),
     
     // 内部接口
     .icache_en      (axi_icache_en   ),
@@ -51,7 +73,10 @@ axi_interface u_axi_interface (
     .ubuf_we        (axi_ubuf_we     ),
     .ubuf_addr      (axi_ubuf_addr   ),
     .ubuf_wdata     (axi_ubuf_wdata  ),
+    .ubuf_wide      (axi_ubuf_wide   ),
+    .ubuf_wstrb     (axi_ubuf_wstrb  ),
     .ubuf_rdata     (axi_ubuf_rdata  ),
+    .ubuf_wr_stall  (axi_ubuf_wr_stall),
     
     .status_en      (axi_status_en   ),
     .status_we      (axi_status_we   ),
@@ -63,6 +88,16 @@ axi_interface u_axi_interface (
 logic global_en;
 logic ctrl_finish_in;
 logic finish_flag;
+logic job_restart;
+logic job_launch;
+logic [9:0] job_start_pc;
+logic input_bank;
+
+// 性能计数事件, 由 control_unit 驱动
+logic           ub_wr_VPU_en;
+logic           sa_enable [3:0];
+logic           sa_valid_in;
+logic           load_en;
 
 status_reg u_status_reg (
     .clk    (clk),
@@ -78,17 +113,31 @@ status_reg u_status_reg (
 	// ==================== 控制接口 ====================
 	.ctrl_finish_in     (ctrl_finish_in),
 
+	// ==================== 性能计数事件 ====================
+	.perf_sa_valid_in   (sa_valid_in),
+	.perf_sa_enable     (sa_enable),
+	.perf_weight_load   (load_en),
+	.perf_vpu_wr        (ub_wr_VPU_en),
+	.perf_axi_rd        ((axi_ubuf_en && !axi_ubuf_we) || (axi_icache_en && !axi_icache_we) || (axi_status_en && !axi_status_we)),
+	.perf_axi_wr        ((axi_ubuf_we && !axi_ubuf_wr_stall) || axi_icache_we || axi_status_we),
+	.perf_ub_conflict   (axi_ubuf_wr_stall),
+
 	// ==================== 输出接口 ====================
     .global_en          (global_en),
-    .finish_flag        (finish_flag)
+    .finish_flag        (finish_flag),
+    .finish_irq         (finish_irq),
+    .job_restart        (job_restart),
+    .job_launch         (job_launch),
+    .job_start_pc       (job_start_pc),
+    .input_bank         (input_bank)
 );
 
 logic               icache_rd_ctrl_en;
 logic [9:0]         icache_rd_ctrl_addr;
-logic [53:0]        icache_rd_ctrl_data;
+logic [54:0]        icache_rd_ctrl_data;        // [54] 为循环指令标志
 
 instruction_cache #(
-    .INS_LEN    (54)
+    .INS_LEN    (55)
 ) u_instruction_cache (
     .clk    (clk),
     .rst    (rst),
@@ -107,7 +156,6 @@ instruction_cache #(
 );
 
 // CTRL unit
-logic           ub_wr_VPU_en;
 logic [9:0]     ub_wr_VPU_addr_in;
 logic [1:0]     ub_wr_VPU_size_in;
 logic           ub_rd_input_en;
@@ -118,12 +166,12 @@ logic [11:0]    ub_rd_weight_addr_in;
 logic [3:0]     ub_rd_scale_addr_in;
 logic [3:0]     ub_rd_bias_addr_in;
 logic [1:0]     ub_rd_bias_size_in;
+logic [7:0]     ub_psum_addr_in;
+logic           ub_wr_psum_en;
 
 logic           sa_input_shift_en;
 logic           sa_weight_shift_en;
 
-logic           sa_enable [3:0];
-logic           sa_valid_in;
 logic           sa_new_weight;
 logic           sa_switch_weight;
 
@@ -132,7 +180,6 @@ logic           vpu_psum_clear;
 logic           vpu_bias_enable;
 logic           vpu_relu_enable;
 logic           vpu_dequant_enable;
-logic           load_en;
 
 control_unit u_control_unit(
     .clk    (clk),
@@ -140,6 +187,9 @@ control_unit u_control_unit(
     
     .global_en              (global_en),
     .finish_flag            (finish_flag),
+    .job_restart            (job_restart),
+    .job_launch             (job_launch),
+    .job_start_pc           (job_start_pc),
     .icache_rd_ctrl_addr    (icache_rd_ctrl_addr),
     .icache_rd_ctrl_en      (icache_rd_ctrl_en),
     .icache_rd_ctrl_data    (icache_rd_ctrl_data),
@@ -156,6 +206,8 @@ control_unit u_control_unit(
     .ub_rd_scale_addr_in    (ub_rd_scale_addr_in    ),
     .ub_rd_bias_addr_in     (ub_rd_bias_addr_in     ),
     .ub_rd_bias_size_in     (ub_rd_bias_size_in     ),
+    .ub_psum_addr_in        (ub_psum_addr_in        ),
+    .ub_wr_psum_en          (ub_wr_psum_en          ),
 
     // To input and weight rearranger
     .sa_input_shift_en      (sa_input_shift_en      ),
@@ -184,8 +236,13 @@ logic [7:0]  ub_rd_input_data_out [15:0];
 logic [7:0]  ub_rd_weight_data_out [3:0][15:0];
 logic [31:0] ub_rd_scale_data_out;
 logic [31:0] ub_rd_bias_data_out [3:0][15:0];
+logic [31:0] ub_rd_psum_data_out [3:0][15:0];
+logic [31:0] vpu_psum_out [3:0][15:0];
+logic        vpu_psum_out_valid;
 
-unified_buffer u_unified_buffer (
+unified_buffer #(
+    .AXI_WR_WIDTH   (AXI_WR_WIDTH)
+) u_unified_buffer (
     .clk    (clk),
     .rst    (rst),
     
@@ -194,9 +251,13 @@ unified_buffer u_unified_buffer (
     .axi_ubuf_we    (axi_ubuf_we   ),
     .axi_ubuf_addr  (axi_ubuf_addr ),
     .axi_ubuf_wdata (axi_ubuf_wdata),
+    .axi_ubuf_wide  (axi_ubuf_wide ),
+    .axi_ubuf_wstrb (axi_ubuf_wstrb),
     .axi_ubuf_rdata (axi_ubuf_rdata),
+    .axi_ubuf_wr_stall (axi_ubuf_wr_stall),
     
     // ==================== Input存储接口 ====================
+    .input_bank             (input_bank       ),
     // 额外写入端口
     .ub_wr_VPU_en           (ub_wr_VPU_en     ),
     .ub_wr_VPU_addr_in      (ub_wr_VPU_addr_in),
@@ -219,7 +280,14 @@ unified_buffer u_unified_buffer (
     .ub_rd_scale_data_out   (ub_rd_scale_data_out),
     .ub_rd_bias_addr_in     (ub_rd_bias_addr_in  ),
     .ub_rd_bias_size_in     (ub_rd_bias_size_in  ),
-    .ub_rd_bias_data_out    (ub_rd_bias_data_out )
+    .ub_rd_bias_data_out    (ub_rd_bias_data_out ),
+
+    // ==================== Psum存储接口 ====================
+    // 存回只在 psum cache 处于 MODE_OUTPUT 的拍生效 (切换到 MODE_OUTPUT 的那一拍没有读出)
+    .ub_wr_psum_en          (ub_wr_psum_en && vpu_psum_out_valid),
+    .ub_psum_addr_in        (ub_psum_addr_in     ),
+    .ub_wr_psum_data_in     (vpu_psum_out        ),
+    .ub_rd_psum_data_out    (ub_rd_psum_data_out )
 );
 
 logic [7:0]  sa_input [15:0];
@@ -337,20 +405,23 @@ vpu #(
 
     .mode_select        (vpu_mode_select),
     .psum_clear         (vpu_psum_clear),
-    .psum_enable        (1'b1),         // TODO：暂时不支持 psum load
+    .psum_enable        (1'b1),
     .bias_enable        (vpu_bias_enable),
     .relu_enable        (vpu_relu_enable),
     .dequant_enable     (vpu_dequant_enable),
     .scale_fp32_in      (ub_rd_scale_data_out),
 
-    .psum_load_in       ('{4{ '{16{ 31'b0 }} }}), // TODO：暂时不支持 psum load
+    .psum_load_in       (ub_rd_psum_data_out),  // MODE_LOAD 时从 UB 的 psum 区加载
     .bias_in            (ub_rd_bias_data_out),
 
     .sa_in_valid        (sa_valid_out),
     .sa_in              (sa_output),
 
     .vpu_out_valid      (),
-    .vpu_out            (ub_wr_VPU_data_in)
+    .vpu_out            (ub_wr_VPU_data_in),
+
+    .psum_out           (vpu_psum_out),
+    .psum_out_valid     (vpu_psum_out_valid)
 );
 
 
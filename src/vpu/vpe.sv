@@ -24,11 +24,11 @@ module vpe #(
     input  logic [I_WIDTH-1         :0] sa_in               ,
     output logic                        vpe_out_valid       ,
     output logic [O_WDITH-1         :0] vpe_out             ,
+    output logic [PSUM_WIDTH-1      :0] psum_out            ,   // psum cache 当前项, MODE_OUTPUT 时为逐项读出的 psum
     output logic [$clog2(BATCH_SIZE)-1:0] psum_idx          ,
     output logic [1:0]                  mode_state          
 );
 
-    logic [PSUM_WIDTH-1:0] psum_out;
     logic cache_stream_valid;
     logic [PSUM_WIDTH-1:0] cache_stream_data;
     
@@ -25,7 +25,11 @@ module vpu #(
     input  logic [I_WIDTH-1:0]      sa_in        [CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0],
 
     output logic                    vpu_out_valid[CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0],
-    output logic [O_WDITH-1:0]      vpu_out      [CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0]
+    output logic [O_WDITH-1:0]      vpu_out      [CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0],
+
+    // psum cache 逐项读出 (MODE_OUTPUT), 用于把 psum 存回 unified_buffer
+    output logic [PSUM_WIDTH-1:0]   psum_out     [CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0],
+    output logic                    psum_out_valid
 );
 
     logic [$clog2(BATCH_SIZE)-1:0] psum_idx_int [CHANNEL_NUM-1:0][CHANNEL_WIDTH-1:0];
@@ -57,10 +61,14 @@ module vpu #(
                 .sa_in          (sa_in[chan]                  ),
                 .vpu_out_valid  (vpu_out_valid[chan]          ),
                 .vpu_out        (vpu_out[chan]                ),
+                .psum_out       (psum_out[chan]               ),
                 .psum_idx       (psum_idx_int[chan]           ),
                 .mode_state     (mode_state_int[chan]         )
             );
         end
     endgenerate
 
+    // 所有 vpe 由同一 mode_select 驱动, 同拍进入 / 离开 MODE_OUTPUT, 取第 0 个 vpe 的状态
+    assign psum_out_valid = (mode_state_int[0][0] == 2'b11);
+
 endmodule
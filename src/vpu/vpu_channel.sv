@@ -24,6 +24,7 @@ module vpu_channel #(
     input  logic [I_WIDTH-1:0]              sa_in          [CHANNEL_WIDTH-1:0]  ,
     output logic                            vpu_out_valid  [CHANNEL_WIDTH-1:0]  ,
     output logic [O_WDITH-1:0]              vpu_out        [CHANNEL_WIDTH-1:0]  ,
+    output logic [PSUM_WIDTH-1:0]           psum_out       [CHANNEL_WIDTH-1:0]  ,
 
     output logic [$clog2(BATCH_SIZE)-1  :0] psum_idx       [CHANNEL_WIDTH-1:0]  ,
     output logic [1:0]                      mode_state     [CHANNEL_WIDTH-1:0]
@@ -54,6 +55,7 @@ module vpu_channel #(
                 .sa_in              (sa_in[i]        ),
                 .vpe_out_valid      (vpu_out_valid[i]),
                 .vpe_out            (vpu_out[i]      ),
+                .psum_out           (psum_out[i]     ),
                 .psum_idx           (psum_idx[i]     ),
                 .mode_state         (mode_state[i]   )
             );
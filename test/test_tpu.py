@@ -1,6 +1,21 @@
+import os
+import sys
+
 import cocotb
+import numpy as np
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import First, RisingEdge, ReadOnly, Timer
+from cocotb.utils import get_sim_time
+
+# 参考模型在 sim/ 下, tpu_model 再把 instruction/ 与 data/ 加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sim'))
+
+from tpu_axi import AxiBurstMaster, pack_words, unpack_rows
+from tpu_backdoor import Backdoor, MEMORIES
+from tpu_model import TPUModel, DEFAULT_MISC, load_words
+from regress import DEFAULT_IMAGES
+from ins_asm import link_programs
+from ins_gemm import plan_layout, compile_gemm, pack_images, golden_output, unpack_output, TILE
 
 # AXI 地址定义 (根据 axi_interface.sv 计算)
 TPU_BASE_ADDR = 0x40000000
@@ -8,8 +23,32 @@ STATUS_BASE_OFFSET = 0x2E00 << 3
 # 寄存器地址
 REG_ENABLE_ADDR  = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x00 # 0x40017000
 REG_FINISH_ADDR  = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x08 # 0x40017008
+REG_IRQ_ADDR     = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x10 # 0x40017010, bit0 finish 中断挂起, 写 1 清零
+REG_IRQ_CTRL_ADDR = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x18 # 0x40017018, bit0 使能, bit1 0 电平 / 1 脉冲
+REG_PERF_CTRL_ADDR = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x20 # 0x40017020, 写 bit0 快照, bit1 清零
+REG_PERF_BASE_ADDR = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x40 # 0x40017040 起, 64 位计数器快照
+REG_BANK_ADDR    = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x28 # 0x40017028, bit0 作业使用的 input bank, 运行期间写入无效
+REG_QUEUE_ADDR   = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x30 # 0x40017030, 写: 作业入队; 读: [7:0] 待执行数, [15:8] 完成数, [16] 满
+REG_DONE_ADDR    = TPU_BASE_ADDR + STATUS_BASE_OFFSET + 0x38 # 0x40017038, 读出并弹出完成队列: [15:0] job_id, [47:16] 拍数, [63] 有效
+QUEUE_DEPTH = 8
+# 性能计数器, 顺序与 status_reg.sv 一致
+PERF_COUNTERS = ["busy", "sa_valid", "sa_enable0", "sa_enable1", "sa_enable2", "sa_enable3",
+                 "weight_load", "vpu_wr", "axi_rd", "axi_wr", "ub_conflict"]
+PERF_SNAPSHOT, PERF_CLEAR = 1, 2
 # 结果读回地址 (Input Memory Base)
 MEM_RESULT_ADDR  = TPU_BASE_ADDR + 0x0000                    # 0x40000000
+# Input Memory 在 UB 内部地址 0x2000 起, 每行 512 bit = 8 个 64 位字
+INPUT_MEM_ADDR   = TPU_BASE_ADDR + (0x2000 << 3)             # 0x40010000
+# Input Memory bank 1 (乒乓缓冲的另一半) 在 UB 内部地址 0x3000 起
+INPUT_MEM1_ADDR  = TPU_BASE_ADDR + (0x3000 << 3)             # 0x40018000
+INPUT_BANK_ADDRS = (INPUT_MEM_ADDR, INPUT_MEM1_ADDR)
+INPUT_ROWS = 256
+# psum 区在 UB 内部地址 0x4000 起, 每行 2048 bit (psum cache 的一项) = 32 个 64 位字
+PSUM_MEM_ADDR    = TPU_BASE_ADDR + (0x4000 << 3)             # 0x40020000
+PSUM_ROWS = 256
+# instruction_cache 在内部地址 0x2A00 起, 每个 64 位字为一条指令
+ICACHE_MEM_ADDR  = TPU_BASE_ADDR + (0x2A00 << 3)             # 0x40015000
+ICACHE_ROWS = 1024
 
 class TPUDriver:
     def __init__(self, dut):
@@ -18,6 +57,8 @@ class TPUDriver:
         self.dut.axi_we.value = 0
         self.dut.axi_addr.value = 0
         self.dut.axi_wdata.value = 0
+        # 有 axi_len 端口时使用突发传输
+        self.bus = AxiBurstMaster(dut) if hasattr(dut, 'axi_len') else None
 
     async def reset(self):
         """复位逻辑"""
@@ -36,7 +77,10 @@ class TPUDriver:
         self.dut.axi_addr.value = addr
         self.dut.axi_wdata.value = data
         
-        await RisingEdge(self.dut.clk)
+        if self.bus:
+            await self.bus.hold_beat()     # 与 VPU 写回冲突时保持写数据直到被接收
+        else:
+            await RisingEdge(self.dut.clk)
         # 单周期请求，下一拍拉低
         self.dut.axi_req.value = 0
         self.dut.axi_we.value = 0
@@ -61,6 +105,216 @@ class TPUDriver:
         await RisingEdge(self.dut.clk) 
         return self.dut.axi_rdata.value.integer
 
+    async def write_block(self, addr, data, burst=True, wide=False):
+        """
+        块写: 从 addr 起每拍写一个 64 位字, 连续不间断 (n 个字共 n + 1 拍, axi_write 为 2n 拍)
+        data 按 pack_words 的规则打包, 例如 (1024, 64) 的 weight 镜像可以一次写入
+        burst=True 且 DUT 支持时使用 INCR 突发 (每 256 拍一个地址), 否则逐拍给出地址
+        wide=True 时使用宽写入突发, 每拍写 AXI_WR_WIDTH / 64 个字 (512 位时一拍一行), addr 须按拍宽对齐
+        """
+        if wide:
+            await self.bus.write_wide(addr, data)
+            return
+        if burst and self.bus:
+            await self.bus.write(addr, pack_words(data))
+            return
+        words = pack_words(data).tolist()
+        await RisingEdge(self.dut.clk)
+        self.dut.axi_we.value = 1
+        for i, word in enumerate(words):
+            self.dut.axi_req.value = 1
+            self.dut.axi_addr.value = addr + i * 8
+            self.dut.axi_wdata.value = word
+            if self.bus:
+                await self.bus.hold_beat()
+            else:
+                await RisingEdge(self.dut.clk)
+        self.dut.axi_req.value = 0
+        self.dut.axi_we.value = 0
+        self.dut.axi_addr.value = 0
+        self.dut.axi_wdata.value = 0
+
+    async def read_block(self, addr, count, burst=True):
+        """
+        块读: 从 addr 起连续读 count 个 64 位字, 返回 np.uint64 数组 (可用 unpack_rows 还原为存储行)
+        每拍发出一个读请求; 读数据比请求晚 1 拍 (axi_req_q), 在请求被采样的那一拍的 ReadOnly 阶段取回,
+        此时下一个请求已经送上总线, 共 count + 2 拍 (axi_read 为 3 拍一个字)
+        burst=True 且 DUT 支持时使用 INCR 突发, 拍数相同
+        """
+        if burst and self.bus:
+            return await self.bus.read(addr, count)
+        words = []
+        await RisingEdge(self.dut.clk)
+        self.dut.axi_req.value = 1
+        self.dut.axi_we.value = 0
+        self.dut.axi_addr.value = addr
+        for i in range(count):
+            await RisingEdge(self.dut.clk)
+            if i + 1 < count:
+                self.dut.axi_addr.value = addr + (i + 1) * 8
+            else:
+                self.dut.axi_req.value = 0
+                self.dut.axi_addr.value = 0
+            await ReadOnly()
+            words.append(self.dut.axi_rdata.value.integer)
+        await RisingEdge(self.dut.clk)
+        return np.array(words, dtype=np.uint64)
+
+    async def wait_done(self, timeout_ns=2_000_000, poll=False, poll_interval=10):
+        """
+        等待 TPU 完成: 直接等待 finish_irq 的上升沿 (与 finish_flag 同拍, 等待期间不产生 AXI 访问),
+        返回时已写 1 清除 REG_IRQ 的挂起位; 电平模式下 finish_irq 已为高时立即返回
+        DUT 没有 finish_irq 端口或 poll=True 时退回到每 poll_interval 拍读一次 REG_FINISH
+        返回完成时的仿真时间 (ns), 超过 timeout_ns 时抛出 TimeoutError
+        """
+        start = get_sim_time(units="ns")
+        if not poll and hasattr(self.dut, 'finish_irq'):
+            if not self.dut.finish_irq.value.integer:
+                fired = await First(RisingEdge(self.dut.finish_irq), Timer(timeout_ns, units="ns"))
+                if not isinstance(fired, RisingEdge):
+                    raise TimeoutError(f"finish_irq not asserted within {timeout_ns} ns")
+            done = get_sim_time(units="ns")
+            await self.axi_write(REG_IRQ_ADDR, 1)
+            return done
+
+        while True:
+            if await self.axi_read(REG_FINISH_ADDR) == 1:
+                return get_sim_time(units="ns")
+            if get_sim_time(units="ns") - start >= timeout_ns:
+                raise TimeoutError(f"finish flag not set within {timeout_ns} ns")
+            for _ in range(poll_interval):
+                await RisingEdge(self.dut.clk)
+
+    async def start_job(self, bank=None):
+        """
+        启动作业: 给出 bank 时先选择 input bank, 再写 EN = 1;
+        上一个作业 finish 后再次写 EN = 1 时 TPU 从第 0 条指令重新执行 (icache 中的程序不变)
+        """
+        if bank is not None:
+            await self.axi_write(REG_BANK_ADDR, bank)
+        await self.axi_write(REG_ENABLE_ADDR, 1)
+
+    async def run_jobs(self, inputs, result_rows=INPUT_ROWS, pingpong=True, wide=None):
+        """
+        依次用 icache 中的程序处理 inputs 中的每个输入镜像 ((行, 64) 的 uint8, 从 bank 第 0 行写入),
+        每个作业结束后读回所在 bank 的前 result_rows 行, 返回读回镜像的列表
+        pingpong=True 时作业交替使用两个 bank: 第 k 个作业运行期间, 主机读回第 k - 1 个作业的结果并写入
+        第 k + 1 个作业的输入, 两者都在另一个 bank 上, 主机传输与计算重叠;
+        pingpong=False 时全部使用 bank 0, 写入 -> 运行 -> 读回依次进行
+        wide 缺省为 DUT 支持宽写入时使用宽写入
+        """
+        wide = bool(self.bus and self.bus.width) if wide is None else wide
+        words = result_rows * 8
+        results = []
+        if not pingpong:
+            for image in inputs:
+                await self.write_block(INPUT_MEM_ADDR, image, wide=wide)
+                await self.start_job(bank=0)
+                await self.wait_done()
+                results.append(unpack_rows(await self.read_block(INPUT_MEM_ADDR, words)))
+            return results
+
+        if len(inputs):
+            await self.write_block(INPUT_BANK_ADDRS[0], inputs[0], wide=wide)
+        for k in range(len(inputs)):
+            bank = k % 2
+            other = INPUT_BANK_ADDRS[1 - bank]
+            await self.start_job(bank=bank)
+            if k > 0:
+                results.append(unpack_rows(await self.read_block(other, words)))
+            if k + 1 < len(inputs):
+                await self.write_block(other, inputs[k + 1], wide=wide)
+            await self.wait_done()
+        if len(inputs):
+            last = INPUT_BANK_ADDRS[(len(inputs) - 1) % 2]
+            results.append(unpack_rows(await self.read_block(last, words)))
+        return results
+
+    async def submit(self, jobs):
+        """
+        作业批量入队: jobs 为 [(入口 PC, job_id[, bank]), ...], 每个作业一次 AXI 写, bank 缺省为 0;
+        TPU 空闲时第一个作业立即启动, 之后每个作业在上一个 finish 的同拍启动, 其间没有主机参与
+        队列中放不下时抛出 ValueError
+        """
+        free = QUEUE_DEPTH - (await self.axi_read(REG_QUEUE_ADDR) & 0xFF)
+        if len(jobs) > free:
+            raise ValueError(f"{len(jobs)} jobs do not fit in the command queue ({free} free)")
+        for start_pc, job_id, *bank in jobs:
+            await self.axi_write(REG_QUEUE_ADDR, (bank[0] if bank else 0) << 32 | job_id << 16 | start_pc)
+
+    async def wait_jobs(self, count, timeout_ns=2_000_000, poll_interval=10):
+        """
+        从完成队列取回 count 个作业的 (job_id, 拍数), 按完成顺序返回; 完成队列为空时每 poll_interval 拍读一次
+        超过 timeout_ns 时抛出 TimeoutError
+        """
+        start = get_sim_time(units="ns")
+        done = []
+        while len(done) < count:
+            entry = await self.axi_read(REG_DONE_ADDR)
+            if entry >> 63:
+                done.append((entry & 0xFFFF, (entry >> 16) & 0xFFFFFFFF))
+                continue
+            if get_sim_time(units="ns") - start >= timeout_ns:
+                raise TimeoutError(f"{len(done)} of {count} jobs completed within {timeout_ns} ns")
+            for _ in range(poll_interval):
+                await RisingEdge(self.dut.clk)
+        return done
+
+    async def run_batch(self, jobs, timeout_ns=2_000_000):
+        """
+        一次提交 jobs (格式同 submit) 并等待全部完成, 返回 [(job_id, 拍数), ...];
+        返回前写 1 清除最后一个作业 finish 时置位的中断挂起位
+        """
+        await self.submit(jobs)
+        done = await self.wait_jobs(len(jobs), timeout_ns)
+        await self.axi_write(REG_IRQ_ADDR, 1)
+        return done
+
+    async def read_counters(self, snapshot=True):
+        """
+        读性能计数器, 返回 {名称: 值}; snapshot=True 时先写快照再读, 否则读最近一次快照 (finish 时自动快照)
+        快照写入与读出本身也计入 axi_wr / axi_rd
+        """
+        if snapshot:
+            await self.axi_write(REG_PERF_CTRL_ADDR, PERF_SNAPSHOT)
+        values = await self.read_block(REG_PERF_BASE_ADDR, len(PERF_COUNTERS))
+        return dict(zip(PERF_COUNTERS, values.tolist()))
+
+    async def clear_counters(self):
+        """清零计数器 (快照保持不变), 用于在作业开始前复位计数"""
+        await self.axi_write(REG_PERF_CTRL_ADDR, PERF_CLEAR)
+
+async def preload_default_program(dut):
+    """
+    后门加载缺省程序 (instruction/ins.txt) 及其 input / weight / misc 镜像, 与 +define+LOAD_TXT 的缺省相同,
+    不依赖编译选项; 返回加载了同一组镜像并已复位的逐拍模型
+    """
+    model = TPUModel()
+    model.load_images(DEFAULT_IMAGES['input'], DEFAULT_IMAGES['weight'], DEFAULT_MISC)
+    model.load_instructions(load_words(DEFAULT_IMAGES['ins']))
+    model.reset()
+    await Backdoor(dut).load(input=model.input_memory, weight=model.weight_memory, misc=model.misc_memory,
+                             ins=model.ins_memory)
+    return model
+
+def reference_model(words, input=None, weight=None, misc=None, input1=None):
+    """加载指令与镜像 (只覆盖镜像的行数) 并已复位的逐拍模型; input1 在复位之后写入 bank 1 (复位会清零 bank 1)"""
+    model = TPUModel()
+    for memory, image in ((model.input_memory, input), (model.weight_memory, weight), (model.misc_memory, misc)):
+        if image is not None:
+            memory[:len(image)] = image
+    model.load_instructions(words)
+    model.reset()
+    if input1 is not None:
+        model.input_memory_b1[:len(input1)] = input1
+    return model
+
+def assert_gemm_output(memory, a, w, bias, layout, what):
+    """memory 为 input_memory 的 (行, 字节) 镜像, 其中 layout 的输出区与 relu(a @ w.T + bias) 的 golden 一致"""
+    rows = {r: int.from_bytes(memory[r].tobytes(), 'big') for r in range(len(memory))}
+    expect = golden_output(a, w, layout, bias, relu=True)[:layout["m"]]
+    assert np.array_equal(unpack_output(rows, layout), expect), f"{what} differs from golden"
+
 @cocotb.test()
 async def tpu_top_test(dut):
     """TPU 顶层验证流程"""
@@ -78,23 +332,17 @@ async def tpu_top_test(dut):
     dut._log.info(f"Writing Enable to addr 0x{REG_ENABLE_ADDR:X}...")
     await driver.axi_write(REG_ENABLE_ADDR, 1)
     
-    # 4. 轮询直到完成 (Poll Finish Flag)
-    dut._log.info("Polling Finish Flag...")
-    max_cycles = 5000 # 防止死循环的超时设置
-    cycles = 0
-    while True:
-        finish_flag = await driver.axi_read(REG_FINISH_ADDR)
-        if finish_flag == 1:
-            dut._log.info(f"TPU Finished after approx {cycles} polling cycles!")
-            break
-        
-        cycles += 1
-        if cycles >= max_cycles:
-            raise TimeoutError("TPU execution timed out! Finish flag never asserted.")
-        
-        # 等待几个时钟周期再查询
-        for _ in range(10): 
-            await RisingEdge(dut.clk)
+    # 4. 等待完成 (finish_irq)
+    dut._log.info("Waiting for finish_irq...")
+    done = await driver.wait_done()
+    dut._log.info(f"TPU Finished at {done:.0f} ns")
+
+    # finish 时的计数器快照: 利用率与带宽
+    counters = await driver.read_counters(snapshot=False)
+    busy = max(counters["busy"], 1)
+    dut._log.info(f"Counters: {counters}")
+    dut._log.info(f"Input-valid {counters['sa_valid'] / busy:.1%} of {counters['busy']} busy cycles, "
+                  f"weight load {counters['weight_load'] / busy:.1%}, VPU writeback {counters['vpu_wr']} beats")
 
     # 5. (可选) 读回结果进行验证
     # 假设结果被写回到了 Input Memory 的起始地址 (0x40000000)
@@ -108,4 +356,378 @@ async def tpu_top_test(dut):
         result = await driver.axi_read(addr)
         dut._log.info(f"Result at Address 0x{addr:X}: 0x{result:016X}")
 
-    dut._log.info("Testbench completed successfully.")
\ No newline at end of file
+    dut._log.info("Testbench completed successfully.")
+
+@cocotb.test()
+async def burst_transfer_test(dut):
+    """write_block / read_block 与逐字 axi_write / axi_read 的结果一致, 且仿真时间更短"""
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, 256, size=(16, 64), dtype=np.uint8)
+    words = pack_words(rows)
+    assert np.array_equal(unpack_rows(words), rows)
+
+    # 突发写入 input memory 的前 16 行, 再突发读回
+    start = get_sim_time(units="ns")
+    await driver.write_block(INPUT_MEM_ADDR, rows)
+    mid = get_sim_time(units="ns")
+    burst = await driver.read_block(INPUT_MEM_ADDR, len(words))
+    burst_time = (mid - start, get_sim_time(units="ns") - mid)
+    assert np.array_equal(unpack_rows(burst), rows), "burst readback differs from the written rows"
+
+    # 逐字写入另一组数据, 逐字读回, 再用突发读核对
+    other = words ^ np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+    start = get_sim_time(units="ns")
+    for i, word in enumerate(other.tolist()):
+        await driver.axi_write(INPUT_MEM_ADDR + i * 8, word)
+    mid = get_sim_time(units="ns")
+    single = [await driver.axi_read(INPUT_MEM_ADDR + i * 8) for i in range(len(words))]
+    single_time = (mid - start, get_sim_time(units="ns") - mid)
+    assert np.array_equal(np.array(single, dtype=np.uint64), other), "single-beat readback differs"
+    assert np.array_equal(await driver.read_block(INPUT_MEM_ADDR, len(words)), other), \
+        "burst read differs from single-beat writes"
+
+    dut._log.info(f"{len(words)} words: write {single_time[0]:.0f} -> {burst_time[0]:.0f} ns, "
+                  f"read {single_time[1]:.0f} -> {burst_time[1]:.0f} ns")
+    assert burst_time[0] * 1.9 < single_time[0] and burst_time[1] * 2.5 < single_time[1]
+
+
+@cocotb.test()
+async def backdoor_preload_test(dut):
+    """后门写入四块存储, 前门抽查, 后门读回与写入一致, 且不占用仿真时间"""
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    backdoor = Backdoor(dut)
+
+    rng = np.random.default_rng(1)
+    images = {name: rng.integers(0, 256, size=(depth, line_bytes), dtype=np.uint8)
+              for name, (_, line_bytes, depth, _, _) in MEMORIES.items() if name != 'ins'}
+    images['ins'] = rng.integers(0, 1 << 55, size=100, dtype=np.uint64)
+
+    start = get_sim_time(units="ns")
+    await backdoor.load(**images)
+    assert get_sim_time(units="ns") == start, "backdoor load should not advance simulation time"
+    for name, image in images.items():
+        await backdoor.verify(driver, name, image, samples=32)
+        assert np.array_equal(backdoor.read(name, count=len(image)), image), f"{name} backdoor readback differs"
+    dut._log.info(f"backdoor preload of {', '.join(images)} verified through the front door")
+
+
+@cocotb.test()
+async def axi_bandwidth_test(dut):
+    """主机 <-> UB 带宽: 单拍 axi_write / axi_read, 逐拍给地址的块传输, INCR 突发, 单位为字 / 拍"""
+    period_ns = 10
+    cocotb.start_soon(Clock(dut.clk, period_ns, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    assert driver.bus is not None, "DUT has no axi_len port"
+
+    rng = np.random.default_rng(2)
+    weights = rng.integers(0, 256, size=(1024, 64), dtype=np.uint8)     # 整块 weight memory, 64 KB
+    words = pack_words(weights)
+    single_words = 1024                                                 # 单拍模式只测前 1024 个字
+
+    async def timed(coro):
+        start = get_sim_time(units="ns")
+        result = await coro
+        return result, (get_sim_time(units="ns") - start) / period_ns
+
+    async def single_write():
+        for i, word in enumerate(words[:single_words].tolist()):
+            await driver.axi_write(MEM_RESULT_ADDR + i * 8, word)
+
+    async def single_read():
+        return [await driver.axi_read(MEM_RESULT_ADDR + i * 8) for i in range(single_words)]
+
+    rates = {}
+    _, cycles = await timed(single_write())
+    rates["single write"] = single_words / cycles
+    data, cycles = await timed(single_read())
+    rates["single read"] = single_words / cycles
+    assert np.array_equal(np.array(data, dtype=np.uint64), words[:single_words])
+
+    for burst in (False, True):
+        mode = "burst" if burst else "block"
+        _, cycles = await timed(driver.write_block(MEM_RESULT_ADDR, weights, burst=burst))
+        rates[f"{mode} write"] = len(words) / cycles
+        data, cycles = await timed(driver.read_block(MEM_RESULT_ADDR, len(words), burst=burst))
+        rates[f"{mode} read"] = len(words) / cycles
+        assert np.array_equal(unpack_rows(data), weights), f"{mode} readback differs"
+
+    for name, rate in rates.items():
+        dut._log.info(f"{name:<12} {rate:.3f} words/cycle ({rate * 8 * 1000 / period_ns:.0f} MB/s at {1000 // period_ns} MHz)")
+    assert rates["burst write"] > 0.99 and rates["burst read"] > 0.99
+
+@cocotb.test()
+async def wide_write_bandwidth_test(dut):
+    """UB 加载带宽: 64 位 INCR 突发与宽写入突发分别写满 weight memory, 比较拍数并经前门读回校验"""
+    period_ns = 10
+    cocotb.start_soon(Clock(dut.clk, period_ns, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    assert driver.bus is not None and driver.bus.width, "DUT has no axi_wide port"
+    lanes = driver.bus.width // 64
+
+    rng = np.random.default_rng(3)
+    cycles = {}
+    for mode in ("burst", "wide"):
+        weights = rng.integers(0, 256, size=(1024, 64), dtype=np.uint8)    # 整块 weight memory, 64 KB
+        start = get_sim_time(units="ns")
+        await driver.write_block(MEM_RESULT_ADDR, weights, wide=(mode == "wide"))
+        cycles[mode] = (get_sim_time(units="ns") - start) / period_ns
+        data = await driver.read_block(MEM_RESULT_ADDR, weights.size // 8)
+        assert np.array_equal(unpack_rows(data), weights), f"{mode} write readback differs"
+
+    # 字节写使能: 只写一拍中的部分字节, 其余字节保持
+    row = rng.integers(0, 256, size=(1, 64), dtype=np.uint8)
+    await driver.write_block(MEM_RESULT_ADDR, weights[:1], wide=True)
+    await driver.write_block(MEM_RESULT_ADDR, pack_words(row)[:lanes - 1], wide=True)
+    expect = pack_words(weights[:1]).copy()
+    expect[:lanes - 1] = pack_words(row)[:lanes - 1]
+    data = await driver.read_block(MEM_RESULT_ADDR, 8)
+    assert np.array_equal(data, expect), "partial wide beat wrote bytes outside its strobe"
+
+    rows = 1024
+    for mode, n in cycles.items():
+        dut._log.info(f"{mode:<6} {n:.0f} cycles, {rows / n:.3f} rows/cycle "
+                      f"({rows * 64 * 1000 / (n * period_ns):.0f} MB/s at {1000 // period_ns} MHz)")
+    speedup = cycles["burst"] / cycles["wide"]
+    dut._log.info(f"wide write ({driver.bus.width} bit) speedup {speedup:.2f}x")
+    assert speedup > lanes * 0.95
+
+@cocotb.test()
+async def pingpong_stream_test(dut):
+    """
+    同一程序连续处理多组输入: 乒乓交替两个 input bank 与只用 bank 0 逐个处理的结果都与逐拍模型
+    在对应 bank 上运行的结果一致, 且乒乓的总时间更短
+    """
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    model = await preload_default_program(dut)
+
+    # 以缺省程序的原始输入为基础, 每个作业换掉一部分字节
+    base = model.input_memory.copy()
+    rng = np.random.default_rng(4)
+    inputs = []
+    for _ in range(4):
+        image = base.copy()
+        changed = rng.random(image.shape) < 0.1
+        image[changed] = rng.integers(0, 256, size=int(changed.sum()), dtype=np.uint8)
+        inputs.append(image)
+
+    elapsed = {}
+    results = {}
+    for pingpong in (False, True):
+        start = get_sim_time(units="ns")
+        results[pingpong] = await driver.run_jobs(inputs, pingpong=pingpong)
+        elapsed[pingpong] = get_sim_time(units="ns") - start
+
+    for k, (image, serial, overlapped) in enumerate(zip(inputs, results[False], results[True])):
+        for mode, bank, result in (("serial", 0, serial), ("ping-pong", k % 2, overlapped)):
+            model.reset()
+            model.input_bank = bank
+            model.bank_memory()[:] = image
+            model.run()
+            assert np.array_equal(result, model.bank_memory()), \
+                f"job {k}: {mode} result on bank {bank} differs from the cycle model"
+    assert await driver.axi_read(REG_BANK_ADDR) == (len(inputs) - 1) % 2
+    dut._log.info(f"{len(inputs)} jobs: serial {elapsed[False]:.0f} ns, ping-pong {elapsed[True]:.0f} ns "
+                  f"({elapsed[False] / elapsed[True]:.2f}x)")
+    assert elapsed[True] < elapsed[False]
+
+@cocotb.test()
+async def concurrent_host_write_test(dut):
+    """
+    作业运行期间向同一 input bank 的空闲行流式写入: 与 VPU 写回冲突的拍被反压, 数据不丢失,
+    冲突拍数与逐拍模型一致; 与先计算后传输相比总时间更短. 写入另一个 bank 时没有冲突, 同样与模型一致
+    """
+    period_ns = 10
+    cocotb.start_soon(Clock(dut.clk, period_ns, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    assert driver.bus is not None and driver.bus.backpressure, "DUT has no axi_wready port"
+    model = await preload_default_program(dut)
+
+    # 缺省程序读第 0 ~ 63 行、写回第 64 ~ 67 行, 主机写第 128 ~ 255 行
+    host_row = 128
+    host_addr = INPUT_MEM_ADDR + host_row * 64
+    rng = np.random.default_rng(5)
+    images = [rng.integers(0, 256, size=(INPUT_ROWS - host_row, 64), dtype=np.uint8) for _ in range(2)]
+
+    # 先计算, 结束后再传输
+    start = get_sim_time(units="ns")
+    await driver.start_job(bank=0)
+    await driver.wait_done()
+    await driver.write_block(host_addr, images[0])
+    serial = get_sim_time(units="ns") - start
+    expect = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, host_row * 8))
+
+    # 计算与传输同时进行 (同一程序重新执行, 输入行未改变, 写回的结果相同)
+    await driver.clear_counters()
+    stalls = driver.bus.stalls
+    start = get_sim_time(units="ns")
+    await driver.start_job()
+    await driver.write_block(host_addr, images[1])
+    await driver.wait_done()
+    overlapped = get_sim_time(units="ns") - start
+    stalls = driver.bus.stalls - stalls
+
+    data = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, INPUT_ROWS * 8))
+    assert np.array_equal(data[:host_row], expect), "VPU writeback lost or changed by concurrent host writes"
+    assert np.array_equal(data[host_row:], images[1]), "host writes lost while the VPU was writing back"
+
+    counters = await driver.read_counters(snapshot=False)
+    words = pack_words(images[1]).tolist()
+    model.reset()
+    model.run_with_host_writes([(host_row * 8 + i, word, 0) for i, word in enumerate(words)])
+    dut._log.info(f"serial {serial:.0f} ns, concurrent {overlapped:.0f} ns ({serial / overlapped:.2f}x), "
+                  f"{counters['ub_conflict']} conflict cycles (model {model.ub_conflicts}, BFM stalls {stalls})")
+    assert counters["ub_conflict"] == stalls == model.ub_conflicts
+    assert overlapped < serial
+
+    # 作业在 bank 0 上运行时写 bank 1 的同一范围 (乒乓的情形): 两个 bank 各自只有一个写入, 不反压
+    await driver.clear_counters()
+    stalls = driver.bus.stalls
+    await driver.start_job(bank=0)
+    await driver.write_block(INPUT_MEM1_ADDR + host_row * 64, images[0])
+    await driver.wait_done()
+    stalls = driver.bus.stalls - stalls
+    data = unpack_rows(await driver.read_block(INPUT_MEM1_ADDR + host_row * 64, (INPUT_ROWS - host_row) * 8))
+    assert np.array_equal(data, images[0]), "host writes to bank 1 lost"
+    counters = await driver.read_counters(snapshot=False)
+    words = pack_words(images[0]).tolist()
+    model.reset()
+    model.run_with_host_writes([(host_row * 8 + i, word, 1) for i, word in enumerate(words)])
+    dut._log.info(f"writes to bank 1: {counters['ub_conflict']} conflict cycles "
+                  f"(model {model.ub_conflicts}, BFM stalls {stalls})")
+    assert counters["ub_conflict"] == stalls == model.ub_conflicts == 0
+
+@cocotb.test()
+async def psum_spill_reload_test(dut):
+    """
+    K 分两段的 GEMM: 第一段的 psum 经 MODE_OUTPUT 存回 psum 区, 第二段开始前以 MODE_LOAD 加载后继续累加;
+    输出与 golden 一致, 经 AXI 读回的 psum 区与逐拍模型一致
+    """
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+
+    rng = np.random.default_rng(6)
+    m, k, n = 16, 64, 64
+    a = rng.integers(-128, 128, (m, k))
+    w = rng.integers(-128, 128, (n, k))
+    bias = rng.integers(-4096, 4096, n)
+    layout = plan_layout(m, k, n, k_split=2, psum_base=2 * TILE)
+    words, stats = compile_gemm(layout, bias=True, relu=True, dequant=False)
+    input_image, weight_image, misc_image = pack_images(a, w, layout, bias)
+    await Backdoor(dut).load(input=input_image, weight=weight_image, misc=misc_image, ins=words)
+
+    await driver.start_job(bank=0)
+    await driver.wait_done()
+    out_rows = layout["out_base"] // 4 + layout["out_lines"]
+    data = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, out_rows * 8))
+    assert_gemm_output(data, a, w, bias, layout, "K-split GEMM result")
+
+    model = reference_model(words, input_image, weight_image, misc_image)
+    model.run()
+    psum = unpack_rows(await driver.read_block(PSUM_MEM_ADDR, PSUM_ROWS * 32), row_bytes=256)
+    spilled = slice(layout["psum_base"], layout["psum_base"] + TILE)
+    assert psum[spilled].any(), "no partial sums were spilled"
+    assert np.array_equal(psum, model.psum_memory), "psum region differs from the cycle model"
+    dut._log.info(f"K split in {layout['k_split']}: {stats['psum_spills']} spill(s), "
+                  f"{stats['instructions']} instructions, psum rows {spilled.start}..{spilled.stop - 1} match the model")
+
+@cocotb.test()
+async def loop_program_test(dut):
+    """
+    循环指令: 按拍展开超出 instruction_cache 深度的 GEMM 压缩后经 AXI 上传, 运行结果与 golden 一致,
+    结束后的 input_memory 与逐拍模型一致
+    """
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+
+    rng = np.random.default_rng(7)
+    m, k, n = 32, 256, 128
+    a = rng.integers(-128, 128, (m, k))
+    w = rng.integers(-128, 128, (n, k))
+    bias = rng.integers(-4096, 4096, n)
+    layout = plan_layout(m, k, n)
+    words, stats = compile_gemm(layout, bias=True, relu=True, dequant=False, loop=True)
+    assert stats["cycles"] > ICACHE_ROWS, "the unrolled program should not fit in the instruction cache"
+    input_image, weight_image, misc_image = pack_images(a, w, layout, bias)
+    await Backdoor(dut).load(input=input_image, weight=weight_image, misc=misc_image)
+    await driver.write_block(ICACHE_MEM_ADDR, words)
+    assert np.array_equal(await driver.read_block(ICACHE_MEM_ADDR, len(words)), words), "icache readback differs"
+
+    await driver.start_job(bank=0)
+    await driver.wait_done()
+    out_rows = layout["out_base"] // 4 + layout["out_lines"]
+    data = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, out_rows * 8))
+    assert_gemm_output(data, a, w, bias, layout, "looped GEMM result")
+
+    model = reference_model(words, input_image, weight_image, misc_image)
+    model.run()
+    memory = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, len(model.input_memory) * 8))
+    assert np.array_equal(memory, model.input_memory), "input_memory differs from the cycle model"
+    dut._log.info(f"{stats['cycles']} cycles from {stats['instructions']} instructions "
+                  f"({stats['cycles'] / stats['instructions']:.1f}x), finished at model cycle {model.cycle}")
+
+@cocotb.test()
+async def job_queue_test(dut):
+    """
+    作业队列: 三个不同形状的 GEMM 放在 UB 的不同区域, 程序链接到同一个 icache 镜像后一次提交,
+    最后再在 input bank 1 上重复第一个作业; 各作业结果与 golden 一致, 完成队列按提交顺序给出 job_id,
+    每个作业的拍数与两个 bank 的内容与逐拍模型一致
+    """
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+
+    rng = np.random.default_rng(8)
+    shapes = [(16, 64, 64), (32, 32, 16), (16, 128, 48)]
+    images = {name: np.zeros((MEMORIES[name][2], MEMORIES[name][1]), dtype=np.uint8)
+              for name in ('input', 'weight', 'misc')}
+    in_base = w_base = bias_row = 0
+    requests, programs = [], []
+    for idx, (m, k, n) in enumerate(shapes):
+        a = rng.integers(-128, 128, (m, k))
+        w = rng.integers(-128, 128, (n, k))
+        bias = rng.integers(-4096, 4096, n)
+        layout = plan_layout(m, k, n, in_base=in_base, w_base=w_base, bias_row=bias_row)
+        words, _ = compile_gemm(layout, bias=True, relu=True, dequant=False, loop=idx == 2)
+        # 各作业的区域互不重叠, 镜像中非零的行即该作业的数据
+        for name, image in zip(('input', 'weight', 'misc'), pack_images(a, w, layout, bias)):
+            used = image.any(axis=1)
+            images[name][:len(image)][used] = image[used]
+        requests.append((a, w, bias, layout))
+        programs.append(words)
+        in_base = layout["out_base"] + layout["out_lines"] * 4
+        w_base += layout["w_lines"] * 4
+        bias_row = layout["scale_row"] + 1
+    ins, entries = link_programs(programs)
+    await Backdoor(dut).load(input1=images['input'], **images)
+    await driver.write_block(ICACHE_MEM_ADDR, ins)
+
+    jobs = [(pc, 0x100 + idx) for idx, pc in enumerate(entries)] + [(entries[0], 0x100 + len(entries), 1)]
+    done = await driver.run_batch(jobs)
+    assert [job_id for job_id, _ in done] == [job[1] for job in jobs], f"completion order {done}"
+    assert await driver.axi_read(REG_QUEUE_ADDR) == 0, "queues not drained"
+
+    memory = unpack_rows(await driver.read_block(INPUT_MEM_ADDR, INPUT_ROWS * 8))
+    memory1 = unpack_rows(await driver.read_block(INPUT_MEM1_ADDR, INPUT_ROWS * 8))
+    for (_, job_id, *bank), (a, w, bias, layout) in zip(jobs, requests + requests[:1]):
+        assert_gemm_output(memory1 if bank and bank[0] else memory, a, w, bias, layout, f"job {job_id:#x} result")
+
+    model = reference_model(ins, images['input'], images['weight'], images['misc'], input1=images['input'])
+    expect_done = model.run_queue(jobs)
+    assert done == expect_done, f"completions {done}, model {expect_done}"
+    assert np.array_equal(memory, model.input_memory), "input_memory differs from the cycle model"
+    assert np.array_equal(memory1, model.input_memory_b1), "input_memory_b1 differs from the cycle model"
+    dut._log.info(f"{len(jobs)} jobs from entries {entries} in one submission, cycles "
+                  f"{[cycles for _, cycles in done]} ({model.cycle} in total)")
@@ -0,0 +1,208 @@
+'''
+tpu 顶层与 sim/tpu_model.py 逐拍模型的锁步对比 (differential co-simulation)
+
+DUT 以 +define+LOAD_TXT 编译, 存储镜像由 plusarg 选择, 模型读取同一组文件;
+写入 EN 寄存器后, 每个时钟沿 DUT 与模型各走一拍, 在采样拍比较所选的状态, 第一处不一致时报告拍数与信号并失败
+
+plusargs (均可省略):
+    +INPUT_HEX / +WEIGHT_HEX / +MISC_HEX / +INS_BIN / +INS_HEX   同 RTL, 缺省与 RTL 相同
+    +COSIM_SAMPLE=cycle | every:N | boundary
+        cycle    每拍比较 (缺省)
+        every:N  每 N 拍比较一次
+        boundary 只在指令的控制字段 (除地址外的字段) 变化的拍比较, 如开始 / 结束加载权重、切换 psum 模式
+    +COSIM_SIGNALS=pc,pe_psum,psum_cache,vpu_out   比较的状态, 缺省为全部
+    +COSIM_MAX_CYCLES=N                             超过 N 拍未 finish 时失败, 缺省 200000
+    +COSIM_NO_IMEM                                  结束时不比较 input_memory
+
+    例: make test_tpu_cosim COSIM_ARGS="+COSIM_SAMPLE=every:16 +COSIM_SIGNALS=pc,vpu_out"
+'''
+
+import os
+import sys
+
+import cocotb
+import numpy as np
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, ReadOnly
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sim'))
+
+from tpu_model import TPUModel, DEFAULT_MISC, ARRAYS, COLS, INPUT_DEPTH, INPUT_BYTES, load_words
+from ins_disasm import FIELD_INDEX
+from test_tpu import TPUDriver, REG_ENABLE_ADDR
+
+# RTL 在未给出 plusarg 时使用的缺省路径 (相对于仿真运行目录)
+RTL_DEFAULT_IMAGES = {
+    'INPUT_HEX':  '../data/input_hex.txt',
+    'WEIGHT_HEX': '../data/weight_hex.txt',
+    'INS_BIN':    '../instruction/ins.txt',
+}
+
+SIGNALS = ["pc", "pe_psum", "psum_cache", "vpu_out"]
+
+# 除地址外的控制字段, boundary 采样时这些字段变化的拍为指令边界
+CONTROL_FIELDS = [FIELD_INDEX[name] for name in (
+    "sa_en_size", "VPU_en_size", "sa_weight_valid", "sa_switch_weight", "sa_input_valid", "vpu_mode_select",
+    "vpu_psum_clear", "vpu_bias_en", "vpu_relu_en", "vpu_dequant_en", "finish")]
+
+class CosimMismatch(AssertionError):
+    """DUT 与模型在某一拍的状态不一致"""
+
+UNKNOWN = np.iinfo(np.int64).min     # 含 x / z 的元素, 不会与任何合法值相等
+
+def read_array(handle, bits, signed=False):
+    """
+    一次读取整个 unpacked 数组 (可多维) 为 numpy 数组, 下标与 RTL 声明一致 ([15:0] 声明时第 i 项即 [i])
+    handle.value 按各维的声明从左到右排列, 这里把降序的维翻转
+    """
+    data = np.array(_to_ints(handle.value, bits, signed), dtype=np.int64)
+    sub = handle
+    for axis in range(data.ndim):
+        bounds = list(sub._range)
+        if bounds[0] > bounds[-1]:
+            data = np.flip(data, axis)
+        if axis + 1 < data.ndim:
+            sub = sub[bounds[0]]
+    return data
+
+def _to_ints(value, bits, signed):
+    if isinstance(value, list):
+        return [_to_ints(v, bits, signed) for v in value]
+    return _to_int(value, bits, signed)
+
+def _to_int(value, bits, signed):
+    if not value.is_resolvable:
+        return UNKNOWN
+    v = value.integer & ((1 << bits) - 1)
+    if signed and v >> (bits - 1):
+        v -= 1 << bits
+    return v
+
+class Sampler:
+    """由 +COSIM_SAMPLE 决定哪些拍需要比较"""
+
+    def __init__(self, spec):
+        self.mode, _, n = (spec or "cycle").partition(':')
+        if self.mode not in ("cycle", "every", "boundary"):
+            raise ValueError(f"unknown COSIM_SAMPLE {spec!r}")
+        self.every = int(n) if self.mode == "every" else 1
+        self.last_control = None
+
+    def __call__(self, cycle, fields, finish):
+        if finish:
+            return True
+        if self.mode == "boundary":
+            control = tuple(int(fields[i]) for i in CONTROL_FIELDS)
+            changed = control != self.last_control
+            self.last_control = control
+            return changed
+        return cycle % self.every == 0
+
+class LockstepChecker:
+    """持有所比较信号的句柄, 由模型状态给出期望值"""
+
+    def __init__(self, dut, model, signals):
+        self.dut = dut
+        self.model = model
+        self.signals = signals
+        self.arrays = [dut.u_systolic_array.gen_array[a].systolic_inst for a in range(ARRAYS)]
+        self.vpes = [[dut.u_vpu.gen_vpu_channel[a].u_vpu_channel.gen_vpe[j].u_vpe.u_vpe_psum_cache
+                      for j in range(COLS)] for a in range(ARRAYS)]
+        self.compared = 0
+
+    def expected(self, name):
+        m = self.model
+        if name == "pc":
+            return np.array([m.pc, m.icache_en, m.finish_flag], dtype=np.int64)
+        if name == "pe_psum":
+            return m.pe_psum.astype(np.int64)
+        if name == "psum_cache":
+            return m.psum_cache.astype(np.int64)
+        return m.pipe2.astype(np.int64)
+
+    def actual(self, name):
+        dut = self.dut
+        if name == "pc":
+            return np.array([_to_int(dut.icache_rd_ctrl_addr.value, 10, False),
+                             _to_int(dut.icache_rd_ctrl_en.value, 1, False),
+                             _to_int(dut.finish_flag.value, 1, False)], dtype=np.int64)
+        if name == "pe_psum":
+            return np.stack([read_array(sa.pe_psum_out, 32, signed=True) for sa in self.arrays])
+        if name == "psum_cache":
+            return np.array([[read_array(vpe.psum_cache, 32, signed=True) for vpe in row] for row in self.vpes])
+        return read_array(dut.ub_wr_VPU_data_in, 8, signed=True)
+
+    def check(self, cycle):
+        """比较所选信号, 不一致时抛出 CosimMismatch, 信息中给出前几处不一致的位置"""
+        self.compared += 1
+        for name in self.signals:
+            expect, actual = self.expected(name), self.actual(name)
+            diff = np.argwhere(expect != actual)
+            if len(diff):
+                where = "; ".join(f"{name}{list(idx)}: expect {expect[tuple(idx)]}, got {_fmt(actual[tuple(idx)])}"
+                                  for idx in diff[:4])
+                raise CosimMismatch(f"cycle {cycle}: {len(diff)} mismatch(es) in {name} - {where}")
+
+    def check_input_memory(self):
+        """结束后一次性比较 input_memory 全部 256 行"""
+        actual = read_array(self.dut.u_unified_buffer.input_memory, INPUT_BYTES * 8)
+        for row in range(INPUT_DEPTH):
+            expect = int.from_bytes(self.model.input_memory[row].tobytes(), 'big')
+            if actual[row] == UNKNOWN or int(actual[row]) != expect:
+                raise CosimMismatch(f"input_memory[{row}] differs after finish: expect {expect:x}, "
+                                    f"got {_fmt(actual[row], hex_fmt=True)}")
+
+def _fmt(value, hex_fmt=False):
+    if value == UNKNOWN:
+        return "x"
+    return f"{int(value):x}" if hex_fmt else str(int(value))
+
+def load_model(plusargs):
+    """按与 RTL 相同的 plusarg 规则加载模型的存储与指令"""
+    model = TPUModel()
+    model.load_images(plusargs.get('INPUT_HEX', RTL_DEFAULT_IMAGES['INPUT_HEX']),
+                      plusargs.get('WEIGHT_HEX', RTL_DEFAULT_IMAGES['WEIGHT_HEX']),
+                      plusargs.get('MISC_HEX', DEFAULT_MISC))
+    model.load_instructions(load_words(plusargs.get('INS_HEX') or plusargs.get('INS_BIN', RTL_DEFAULT_IMAGES['INS_BIN'])))
+    model.reset()
+    return model
+
+@cocotb.test()
+async def tpu_cosim_test(dut):
+    """DUT 与逐拍模型锁步运行到 finish, 在采样拍比较状态"""
+    plusargs = cocotb.plusargs
+    sampler = Sampler(plusargs.get('COSIM_SAMPLE'))
+    signals = plusargs.get('COSIM_SIGNALS', ",".join(SIGNALS)).split(',')
+    unknown = [name for name in signals if name not in SIGNALS]
+    if unknown:
+        raise ValueError(f"unknown COSIM_SIGNALS {unknown}, choose from {SIGNALS}")
+    max_cycles = int(plusargs.get('COSIM_MAX_CYCLES', 200000))
+
+    cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+    driver = TPUDriver(dut)
+    await driver.reset()
+    model = load_model(plusargs)
+    checker = LockstepChecker(dut, model, signals)
+
+    # EN 写入后 global_en 置位, 之后的第一个时钟沿对应模型的第 0 拍
+    await driver.axi_write(REG_ENABLE_ADDR, 1)
+    await ReadOnly()
+    while not int(dut.global_en.value):
+        await RisingEdge(dut.clk)
+        await ReadOnly()
+    checker.check(-1)
+
+    while not model.finish_flag:
+        if model.cycle >= max_cycles:
+            raise TimeoutError(f"finish not reached in {max_cycles} cycles")
+        await RisingEdge(dut.clk)
+        await ReadOnly()
+        cycle = model.cycle
+        fields = model.step()
+        if sampler(cycle, fields, model.finish_flag):
+            checker.check(cycle)
+
+    if 'COSIM_NO_IMEM' not in plusargs:
+        checker.check_input_memory()
+    dut._log.info(f"co-simulation matched for {model.cycle} cycles ({checker.compared} sampled, "
+                  f"sample={sampler.mode}, signals={','.join(signals)})")
@@ -0,0 +1,182 @@
+'''
+tpu AXI 接口的突发传输总线功能模型 (BFM) 与数据打包
+
+axi_interface 的突发 (INCR) 时序:
+    - axi_req 拍给出首地址、axi_we 与 axi_len (拍数 - 1), 写突发的首个数据与地址同拍
+    - 之后每拍内部地址加 1 (AXI 地址加 8), 写数据逐拍给出, 这期间 axi_req 保持为 0, axi_ready 为 0
+    - 读数据比对应的拍晚 1 拍, axi_rvalid 为 1 时 axi_rdata 有效
+    - 最后一拍的下一拍即可发出下一个突发, 上一突发的最后一个读数据在这一拍返回
+因此连续的突发之间没有空拍, 带宽为每拍一个 64 位字
+
+宽写入 (DUT 有 axi_wide 端口时): axi_wide 为 1 的写突发每拍给出 AXI_WR_WIDTH 位的 axi_wdata 与字节写使能 axi_wstrb,
+一拍写入 UB 一行中对齐的 AXI_WR_WIDTH / 64 个字 (低位为地址低的字), 每拍 AXI 地址加 AXI_WR_WIDTH / 8;
+512 位时一拍写满一行, 写带宽为 64 位突发的 8 倍. 读仍为 64 位
+
+写反压 (DUT 有 axi_wready 端口时): 写入 input bank 的一拍与 VPU 写回冲突时 axi_wready 为 0, 该拍未写入,
+主机保持 axi_wdata / axi_wstrb 直到 axi_wready 为 1; axi_req 只在首拍给出 (首拍被反压时请求已被接收)
+'''
+
+import numpy as np
+from cocotb.triggers import RisingEdge, ReadOnly
+
+AXI_MAX_LEN = 256       # axi_len 为 8 位, 一次突发至多 256 拍
+AXI_WR_WIDTH = 512      # tpu 的 AXI_WR_WIDTH 缺省值
+
+def pack_words(data):
+    """
+    NumPy 数组 -> 按 AXI 地址递增顺序排列的 64 位字 (np.uint64), 一次向量化完成
+    - (行, 字节) 的 uint8 数组视为 $readmemh 的存储行 (每行第 0 个字节为最高位, 行宽为 8 字节的整数倍),
+      行内最低的 64 位对应地址最低的字, 与 unified_buffer 的 [offset*64 +: 64] 一致
+    - 其余整数数组逐元素作为一个 64 位字 (负数按补码)
+    """
+    data = np.asarray(data)
+    if data.dtype == np.uint8 and data.ndim == 2:
+        if data.shape[1] % 8:
+            raise ValueError(f"row width {data.shape[1]} bytes is not a multiple of 64 bits")
+        return np.ascontiguousarray(data[:, ::-1]).view('<u8').reshape(-1)
+    return data.astype(np.uint64).reshape(-1)
+
+def unpack_rows(words, row_bytes=64):
+    """pack_words 的逆: 64 位字 -> (行, 字节) 的 uint8 数组, 字节序同 $readmemh"""
+    words = np.asarray(words, dtype='<u8')
+    return words.view(np.uint8).reshape(-1, row_bytes)[:, ::-1].copy()
+
+def pack_beats(data, width=AXI_WR_WIDTH):
+    """
+    pack_words 的输出按宽写入分拍: 返回 (beats, strobes) 两个 Python 整数列表,
+    每拍 width / 64 个字, 第 0 个字在最低位; 字数不是整拍时最后一拍只置位有数据的字节写使能
+    """
+    if width % 64 or width < 128:
+        raise ValueError(f"wide write width {width} must be a multiple of 64, at least 128")
+    lanes = width // 64
+    words = pack_words(data)
+    tail = -len(words) % lanes
+    padded = np.concatenate((words, np.zeros(tail, dtype=np.uint64))).reshape(-1, lanes)
+    beats = [int.from_bytes(row.astype('<u8').tobytes(), 'little') for row in padded]
+    strobes = [(1 << (width // 8)) - 1] * len(beats)
+    if tail:
+        strobes[-1] = (1 << ((lanes - tail) * 8)) - 1
+    return beats, strobes
+
+class AxiBurstMaster:
+    """驱动 axi_req / axi_we / axi_addr / axi_wdata / axi_len (及 axi_wide / axi_wstrb), 监视 axi_rvalid / axi_rdata"""
+
+    def __init__(self, dut, max_len=AXI_MAX_LEN):
+        if not 1 <= max_len <= AXI_MAX_LEN:
+            raise ValueError(f"max_len must be in 1..{AXI_MAX_LEN}")
+        self.dut = dut
+        self.max_len = max_len
+        dut.axi_len.value = 0
+        self.backpressure = hasattr(dut, 'axi_wready')
+        self.stalls = 0         # 被反压的写拍数
+        # 有 axi_wide 端口时支持宽写入, 位宽取 axi_wdata 的端口宽度
+        self.width = len(dut.axi_wdata) if hasattr(dut, 'axi_wide') else None
+        if self.width:
+            dut.axi_wide.value = 0
+            dut.axi_wstrb.value = 0
+
+    def split(self, addr, count, step=8):
+        """把 count 拍拆成若干突发: [(AXI 地址, 拍数), ...], 每拍地址加 step 字节"""
+        return [(addr + start * step, min(self.max_len, count - start)) for start in range(0, count, self.max_len)]
+
+    def _issue(self, addr, beats, we):
+        self.dut.axi_req.value = 1
+        self.dut.axi_we.value = we
+        self.dut.axi_addr.value = addr
+        self.dut.axi_len.value = beats - 1
+
+    def _idle(self):
+        self.dut.axi_req.value = 0
+        self.dut.axi_we.value = 0
+        self.dut.axi_addr.value = 0
+        self.dut.axi_wdata.value = 0
+        self.dut.axi_len.value = 0
+        if self.width:
+            self.dut.axi_wide.value = 0
+            self.dut.axi_wstrb.value = 0
+
+    async def hold_beat(self):
+        """
+        等待当拍的写数据被接收: 在时钟沿之前采样 axi_wready, 被反压时撤销 axi_req 并保持写数据,
+        返回时已过接收该拍的时钟沿
+        """
+        while True:
+            await ReadOnly()
+            ready = not self.backpressure or self.dut.axi_wready.value.integer
+            await RisingEdge(self.dut.clk)
+            if ready:
+                return
+            self.stalls += 1
+            self.dut.axi_req.value = 0
+            self.dut.axi_len.value = 0
+
+    async def write(self, addr, words):
+        """从 addr 起突发写入 64 位字 (np.uint64 或整数序列), n 个字共 n + 1 拍 (另加被反压的拍)"""
+        words = np.asarray(words, dtype=np.uint64).tolist()
+        await RisingEdge(self.dut.clk)
+        for burst_addr, beats in self.split(addr, len(words)):
+            start = (burst_addr - addr) // 8
+            self._issue(burst_addr, beats, 1)
+            for k in range(beats):
+                self.dut.axi_wdata.value = words[start + k]
+                await self.hold_beat()
+                if k == 0:
+                    self.dut.axi_req.value = 0
+                    self.dut.axi_len.value = 0
+        self._idle()
+
+    async def write_wide(self, addr, data):
+        """
+        宽写入: data 按 pack_words 打包后每拍写 width / 64 个字, n 个字共 ceil(n / (width / 64)) + 1 拍
+        addr 须按 width / 8 字节对齐 (即 UB 行内的宽写入槽)
+        """
+        if not self.width:
+            raise RuntimeError("DUT has no axi_wide port")
+        step = self.width // 8
+        if addr % step:
+            raise ValueError(f"wide write address 0x{addr:X} is not aligned to {step} bytes")
+        beats, strobes = pack_beats(data, self.width)
+        await RisingEdge(self.dut.clk)
+        for burst_addr, count in self.split(addr, len(beats), step):
+            start = (burst_addr - addr) // step
+            self._issue(burst_addr, count, 1)
+            self.dut.axi_wide.value = 1
+            for k in range(count):
+                self.dut.axi_wdata.value = beats[start + k]
+                self.dut.axi_wstrb.value = strobes[start + k]
+                await self.hold_beat()
+                if k == 0:
+                    self.dut.axi_req.value = 0
+                    self.dut.axi_len.value = 0
+        self._idle()
+
+    async def read(self, addr, count):
+        """
+        从 addr 起突发读 count 个 64 位字, 返回 np.uint64 数组, 共 count + 2 拍
+        下一个突发在上一突发最后一拍的下一拍发出, 与仍在返回的读数据重叠
+        """
+        # 每拍要发出的突发 (None 为该拍不发请求)
+        schedule = []
+        for burst_addr, beats in self.split(addr, count):
+            schedule.append((burst_addr, beats))
+            schedule.extend([None] * (beats - 1))
+
+        words = []
+        await RisingEdge(self.dut.clk)
+        cycle = 0
+        if schedule:
+            self._issue(*schedule[0], 0)
+        while len(words) < count:
+            await RisingEdge(self.dut.clk)
+            cycle += 1
+            if cycle < len(schedule) and schedule[cycle] is not None:
+                self._issue(*schedule[cycle], 0)
+            else:
+                self._idle()
+            await ReadOnly()
+            if self.dut.axi_rvalid.value.integer:
+                words.append(self.dut.axi_rdata.value.integer)
+            if cycle > len(schedule) + 2:
+                raise TimeoutError(f"burst read from 0x{addr:X}: {len(words)} of {count} beats returned")
+        await RisingEdge(self.dut.clk)
+        return np.array(words, dtype=np.uint64)
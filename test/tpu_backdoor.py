@@ -0,0 +1,132 @@
+'''
+tpu 存储的后门 (backdoor) 加载与导出: 通过仿真器句柄直接读写 input / input1 / weight / misc / psum / ins 六块存储,
+不经过 AXI, 用于只关心计算的测试, 省去上万拍的 AXI 写入
+
+镜像格式与打包脚本一致:
+    input / input1 / weight / misc / psum
+                            (行, 字节) 的 uint8 数组, 字节顺序同 $readmemh (每行第 0 个字节为最高位),
+                            即 pack_input_memory / pack_weight_memory / pack_misc_memory 的输出
+    ins                     55 位指令字 (np.uint64, 第 54 位为循环指令标志), 即 ins_asm / ins_gemm 的输出
+
+用法 (复位之后、EN 置位之前调用, 复位会重新初始化这些存储):
+    backdoor = Backdoor(dut)
+    await backdoor.load(input=image, weight=weights, ins=words, driver=driver, verify=16)
+    result = backdoor.read('input')
+verify 为每块存储随机抽取的 64 位字数, 经 AXI 前门读出并与镜像比对, 用于确认后门路径与地址映射
+'''
+
+import os
+import sys
+
+import numpy as np
+from cocotb.triggers import ReadWrite
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'instruction'))
+
+from ins_asm import TPU_BASE_ADDR
+from tpu_axi import pack_words
+
+# 各存储: (句柄路径, 每行字节数, 深度, 前门内部字地址基址, 每行 64 位字数)
+# 内部字地址即 axi_interface 中的 addr_in_TPU = axi_addr[18:3]
+MEMORIES = {
+    'weight': ('u_unified_buffer.weight_memory',       64,  1024, 0x0000, 8),
+    'input':  ('u_unified_buffer.input_memory',        64,  256,  0x2000, 8),
+    'input1': ('u_unified_buffer.input_memory_b1',     64,  256,  0x3000, 8),     # input bank 1
+    'misc':   ('u_unified_buffer.misc_memory',         256, 16,   0x2800, 32),
+    'psum':   ('u_unified_buffer.psum_memory',         256, 256,  0x4000, 32),    # psum 区
+    'ins':    ('u_instruction_cache.ins_memory',       8,   1024, 0x2A00, 1),
+}
+INS_MASK = (1 << 55) - 1
+
+class BackdoorMismatch(AssertionError):
+    """后门写入的内容与前门读出不一致"""
+
+class Backdoor:
+    def __init__(self, dut):
+        self.dut = dut
+        self.handles = {}
+        for name, (path, *_) in MEMORIES.items():
+            handle = dut
+            for part in path.split('.'):
+                handle = getattr(handle, part)
+            self.handles[name] = handle
+
+    def write(self, name, image, start=0):
+        """把镜像写入存储的第 start 行起; 覆盖整块存储时一次赋值整个数组"""
+        handle = self.handles[name]
+        _, line_bytes, depth, _, _ = MEMORIES[name]
+        values = _to_ints(name, image)
+        if start < 0 or start + len(values) > depth:
+            raise ValueError(f"{name}: {len(values)} lines from {start} exceed depth {depth}")
+        if start == 0 and len(values) == depth:
+            # handle.value 按声明的左右边界排列 ([1023:0] 时第 0 项为 [1023])
+            handle.value = [values[i] for i in handle._range]
+        else:
+            for i, value in enumerate(values):
+                handle[start + i].value = value
+
+    def read(self, name, start=0, count=None):
+        """读出存储的第 start 行起 count 行 (缺省到末尾), 格式同 write 的输入; 含 x / z 的行抛出 ValueError"""
+        handle = self.handles[name]
+        _, line_bytes, depth, _, _ = MEMORIES[name]
+        count = depth - start if count is None else count
+        values = dict(zip(handle._range, handle.value))
+        lines = []
+        for row in range(start, start + count):
+            value = values[row]
+            if not value.is_resolvable:
+                raise ValueError(f"{name}[{row}] contains x / z: {value.binstr}")
+            lines.append(value.integer)
+        if name == 'ins':
+            return np.array(lines, dtype=np.uint64)
+        return np.frombuffer(b''.join(v.to_bytes(line_bytes, 'big') for v in lines),
+                             dtype=np.uint8).reshape(count, line_bytes).copy()
+
+    async def verify(self, driver, name, image, start=0, samples=16, seed=0):
+        """从写入的范围中随机抽取 samples 个 64 位字, 经 AXI 前门逐个读出并与镜像比对"""
+        _, _, _, base, words_per_line = MEMORIES[name]
+        words = _to_words(name, image)
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(words), size=min(samples, len(words)), replace=False)
+        for k in sorted(picks.tolist()):
+            addr = TPU_BASE_ADDR + ((base + start * words_per_line + k) << 3)
+            actual = await driver.axi_read(addr)
+            if actual != int(words[k]):
+                raise BackdoorMismatch(f"{name} word {k} (AXI 0x{addr:X}): backdoor wrote "
+                                       f"0x{int(words[k]):016X}, front door read 0x{actual:016X}")
+
+    async def load(self, input=None, weight=None, misc=None, ins=None, input1=None, psum=None, driver=None, verify=0):
+        """
+        一次后门写入给出的镜像 (均从第 0 行起), 等待写入在当拍生效;
+        verify > 0 时需要 driver (TPUDriver), 每块存储抽查 verify 个字
+        """
+        images = {'input': input, 'input1': input1, 'weight': weight, 'misc': misc, 'psum': psum, 'ins': ins}
+        images = {name: image for name, image in images.items() if image is not None}
+        for name, image in images.items():
+            self.write(name, image)
+        await ReadWrite()
+        if verify:
+            if driver is None:
+                raise ValueError("front-door verification needs a TPUDriver")
+            for name, image in images.items():
+                await self.verify(driver, name, image, samples=verify)
+
+def _to_ints(name, image):
+    """镜像 -> 每行一个 Python 整数"""
+    if name == 'ins':
+        return [v & INS_MASK for v in np.asarray(image, dtype=np.uint64).reshape(-1).tolist()]
+    image = _check_image(name, image)
+    return [int.from_bytes(row.tobytes(), 'big') for row in image]
+
+def _to_words(name, image):
+    """镜像 -> 按 AXI 地址递增排列的 64 位字"""
+    if name == 'ins':
+        return np.asarray(image, dtype=np.uint64).reshape(-1) & np.uint64(INS_MASK)
+    return pack_words(_check_image(name, image))
+
+def _check_image(name, image):
+    line_bytes = MEMORIES[name][1]
+    image = np.asarray(image, dtype=np.uint8)
+    if image.ndim != 2 or image.shape[1] != line_bytes:
+        raise ValueError(f"{name} image must be (lines, {line_bytes}) uint8, got {image.shape}")
+    return image
@@ -14,6 +14,8 @@ module tb_tpu;
     logic [63:0] axi_addr;
     logic [63:0] axi_wdata;
     logic [63:0] axi_rdata;
+    logic        axi_rvalid;
+    logic        axi_ready;
 
     // =========================================================================
     // 参数与地址映射 (基于 axi_interface.sv 分析)
@@ -41,8 +43,13 @@ module tb_tpu;
         .axi_req    (axi_req),
         .axi_we     (axi_we),
         .axi_addr   (axi_addr),
-        .axi_wdata  (axi_wdata),
-        .axi_rdata  (axi_rdata)
+        .axi_wdata  (512'(axi_wdata)),   // 只使用窄写入
+        .axi_wstrb  ('0),
+        .axi_wide   (1'b0),
+        .axi_len    (8'd0),
+        .axi_rdata  (axi_rdata),
+        .axi_rvalid (axi_rvalid),
+        .axi_ready  (axi_ready)
     );
 
     // =========================================================================
@@ -99,6 +106,7 @@ module tb_tpu;
     // =========================================================================
     logic [63:0] read_val;
     integer timeout_counter;
+    string  dump_imem_file;     // +DUMP_IMEM=<path>: 结束后将 input_memory 以 $writememh 格式导出, 供回归脚本比对
 
     initial begin
         // 0. 初始化信号
@@ -139,6 +147,11 @@ module tb_tpu;
             repeat(10) @(posedge clk); // 每隔 10 个周期查询一次
         end
 
+        if ($value$plusargs("DUMP_IMEM=%s", dump_imem_file)) begin
+            $writememh(dump_imem_file, u_tpu.u_unified_buffer.input_memory);
+            $display("[TB] Input Memory dumped to %s", dump_imem_file);
+        end
+
         // 4. (可选) 读回部分结果
         // 假设结果写回到了 Input Memory 的起始位置
         $display("[TB] Reading Result Memory...");
@@ -154,15 +167,19 @@ module tb_tpu;
     end
 
     // =========================================================================
-    // Verdi 波形 Dump (FSDB)
+    // Verdi 波形 Dump (FSDB), 批量回归时用 +NO_WAVE 关闭
     // =========================================================================
     initial begin
-        // 指定输出波形文件名
-        $fsdbDumpfile("tpu_wave.fsdb");
-        // 0 表示 dump 所有层次，tb_top 是顶层模块名
-        $fsdbDumpvars("+all");
-        // 如果想 dump 数组（Unified Buffer需要），需要加上这个
-        $fsdbDumpMDA(); 
+        if ($test$plusargs("NO_WAVE")) begin
+            $display("[TB] +NO_WAVE: skip fsdb dump");
+        end else begin
+            // 指定输出波形文件名
+            $fsdbDumpfile("tpu_wave.fsdb");
+            // 0 表示 dump 所有层次，tb_top 是顶层模块名
+            $fsdbDumpvars("+all");
+            // 如果想 dump 数组（Unified Buffer需要），需要加上这个
+            $fsdbDumpMDA(); 
+        end
     end
 
 endmodule
\ No newline at end of file